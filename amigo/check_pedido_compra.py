@@ -1,10 +1,19 @@
+"""
+Investiga em que camada (bronze/silver/gold) um pedido de compra está.
+Uso: python check_pedido_compra.py [PEDIDO_ID] [RAIZ_DO_LAKE]
+RAIZ_DO_LAKE: diretório local ou gs://bucket/prefixo (padrão: bucket do novo_projeto.config).
+"""
 import pandas as pd
-from google.cloud import storage
-from novo_projeto.config import GCS_BUCKET_NAME, GCS_PROJECT_ID, GCS_CREDENTIALS_PATH
 import os
 import sys
 
-PEDIDO_ID = '23498'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.lake.lookup import find
+from src.lake.silver import SILVER_PREFIX
+from src.lake.storage import GCSObjectStore, open_store
+
+PEDIDO_ID = sys.argv[1] if len(sys.argv) > 1 else '23498'
 
 print("="*60, flush=True)
 print(f"BUSCANDO PEDIDO DE COMPRA {PEDIDO_ID}", flush=True)
@@ -12,14 +21,13 @@ print("="*60, flush=True)
 sys.stdout.flush()
 
 try:
-    # Conectar ao GCS
-    print("\n[INFO] Conectando ao GCS...", flush=True)
-    client = storage.Client.from_service_account_json(
-        json_credentials_path=GCS_CREDENTIALS_PATH,
-        project=GCS_PROJECT_ID
-    )
-    bucket = client.bucket(GCS_BUCKET_NAME)
-    print(f"[INFO] Conectado ao bucket: {GCS_BUCKET_NAME}", flush=True)
+    # Lake: diretório local (testes offline) ou bucket GCS
+    if len(sys.argv) > 2:
+        store = open_store(sys.argv[2])
+    else:
+        from novo_projeto.config import GCS_BUCKET_NAME, GCS_PROJECT_ID, GCS_CREDENTIALS_PATH
+        store = GCSObjectStore(GCS_BUCKET_NAME, project=GCS_PROJECT_ID, credentials_path=GCS_CREDENTIALS_PATH)
+    print(f"\n[INFO] Lake: {store!r}", flush=True)
     sys.stdout.flush()
     
     # 1. VERIFICAR BRONZE
@@ -28,76 +36,20 @@ try:
     print("="*60, flush=True)
     sys.stdout.flush()
     
-    # Listar arquivos bronze
-    print("[INFO] Listando arquivos bronze/pedido_compra/...", flush=True)
+    # Poda pelo manifesto das partições (src.lake.manifest): lê só os _manifest.json e,
+    # nos Parquet cuja faixa/Bloom admite o pedido, só o rodapé e os row groups da chave
+    linhas = find(store, PEDIDO_ID)
+    encontrado_bronze = bool(linhas)
+    arquivo_encontrado_bronze = linhas[0]['_arquivo'] if linhas else None
+    for pedido in linhas:
+        print(f"\n  *** [ENCONTRADO NO BRONZE] ***", flush=True)
+        print(f"  Arquivo: {pedido['_arquivo']}", flush=True)
+        print(f"  Coluna: {pedido['_coluna']}", flush=True)
+        print(f"\n  [DADOS DO PEDIDO NO BRONZE]:", flush=True)
+        for col_info, valor in pedido.items():
+            if not col_info.startswith('_'):
+                print(f"    {col_info}: {valor}", flush=True)
     sys.stdout.flush()
-    blobs = list(bucket.list_blobs(prefix='bronze/pedido_compra/'))
-    arquivos_parquet = [b.name for b in blobs if b.name.endswith('.parquet')]
-    print(f"[INFO] Total de arquivos .parquet encontrados: {len(arquivos_parquet)}", flush=True)
-    sys.stdout.flush()
-    
-    # Mostrar alguns arquivos
-    if len(arquivos_parquet) > 0:
-        print(f"\n[INFO] Primeiros 5 arquivos:", flush=True)
-        for arq in arquivos_parquet[:5]:
-            print(f"  - {arq}", flush=True)
-        sys.stdout.flush()
-    
-    encontrado_bronze = False
-    arquivo_encontrado_bronze = None
-    
-    for i, arquivo_gcs in enumerate(arquivos_parquet):
-        print(f"\n[{i+1}/{len(arquivos_parquet)}] Verificando: {arquivo_gcs}", flush=True)
-        sys.stdout.flush()
-        
-        try:
-            # Baixar arquivo temporário
-            arquivo_local = f'temp_bronze_compra_{i}.parquet'
-            blob = bucket.blob(arquivo_gcs)
-            blob.download_to_filename(arquivo_local)
-            
-            # Carregar e verificar
-            df = pd.read_parquet(arquivo_local)
-            print(f"  Registros: {len(df)}", flush=True)
-            sys.stdout.flush()
-            
-            # Tentar várias colunas que podem conter o ID do pedido
-            colunas_id = ['cNumero', 'nr_pedido', 'nCodPed', 'codigo_pedido', 'cCodIntPed']
-            
-            for col in colunas_id:
-                if col in df.columns:
-                    # Verificar se o pedido está neste arquivo
-                    mask = df[col].astype(str) == PEDIDO_ID
-                    if mask.any():
-                        print(f"\n  *** [ENCONTRADO NO BRONZE] ***", flush=True)
-                        print(f"  Arquivo: {arquivo_gcs}", flush=True)
-                        print(f"  Coluna: {col}", flush=True)
-                        sys.stdout.flush()
-                        
-                        # Mostrar informações do pedido
-                        pedido = df[mask].iloc[0]
-                        print(f"\n  [DADOS DO PEDIDO NO BRONZE]:", flush=True)
-                        colunas_importantes = ['cNumero', 'nCodPed', 'dIncData', 'fl_encerrado_cancelado', 'cEtapa', 'nCodFor']
-                        for col_info in colunas_importantes:
-                            if col_info in pedido.index:
-                                print(f"    {col_info}: {pedido[col_info]}", flush=True)
-                        sys.stdout.flush()
-                        
-                        encontrado_bronze = True
-                        arquivo_encontrado_bronze = arquivo_gcs
-                        break
-            
-            # Limpar arquivo temporário
-            os.unlink(arquivo_local)
-            
-            if encontrado_bronze:
-                break
-                
-        except Exception as e:
-            print(f"  [ERRO]: {e}", flush=True)
-            sys.stdout.flush()
-            if os.path.exists(arquivo_local):
-                os.unlink(arquivo_local)
     
     if not encontrado_bronze:
         print(f"\n[RESULTADO] Pedido {PEDIDO_ID} NÃO encontrado na camada Bronze", flush=True)
@@ -109,47 +61,27 @@ try:
     print("="*60, flush=True)
     sys.stdout.flush()
     
-    arquivo_silver = 'silver/pedidos_compras/pedidos_compras.parquet'
-    arquivo_local = 'temp_silver_compra.parquet'
+    # Silver particionado por mês de inclusão (src.lake.silver), com manifesto como o bronze;
+    # o Parquet único antigo (silver/pedidos_compras/pedidos_compras.parquet), se existir, também é lido
     encontrado_silver = False
     
     try:
-        print(f"[INFO] Baixando: {arquivo_silver}", flush=True)
+        linhas_silver = find(store, PEDIDO_ID, prefix=SILVER_PREFIX)
+        encontrado_silver = bool(linhas_silver)
+        for pedido in linhas_silver:
+            print(f"\n  *** [ENCONTRADO NO SILVER] ***", flush=True)
+            print(f"  Arquivo: {pedido['_arquivo']}", flush=True)
+            print(f"  Coluna: {pedido['_coluna']}", flush=True)
+            print(f"  fl_encerrado_cancelado: {pedido.get('fl_encerrado_cancelado')}", flush=True)
         sys.stdout.flush()
-        blob = bucket.blob(arquivo_silver)
-        blob.download_to_filename(arquivo_local)
-        
-        df = pd.read_parquet(arquivo_local)
-        print(f"[INFO] Arquivo carregado: {len(df)} registros, {len(df.columns)} colunas", flush=True)
-        sys.stdout.flush()
-        
-        # Verificar colunas
-        colunas_id = ['nr_pedido', 'codigo_pedido', 'cNumero', 'nCodPed']
-        
-        for col in colunas_id:
-            if col in df.columns:
-                mask = df[col].astype(str) == PEDIDO_ID
-                if mask.any():
-                    print(f"\n  *** [ENCONTRADO NO SILVER] ***", flush=True)
-                    print(f"  Coluna: {col}", flush=True)
-                    print(f"  Total de linhas: {mask.sum()}", flush=True)
-                    sys.stdout.flush()
-                    
-                    encontrado_silver = True
-                    break
         
         if not encontrado_silver:
             print(f"\n[RESULTADO] Pedido {PEDIDO_ID} NÃO encontrado na camada Silver", flush=True)
-            print(f"[DEBUG] Colunas disponíveis: {df.columns.tolist()[:15]}", flush=True)
             sys.stdout.flush()
         
-        os.unlink(arquivo_local)
-        
     except Exception as e:
         print(f"[ERRO] Erro ao verificar Silver: {e}", flush=True)
         sys.stdout.flush()
-        if os.path.exists(arquivo_local):
-            os.unlink(arquivo_local)
     
     # 3. VERIFICAR GOLD
     print("\n" + "="*60, flush=True)
@@ -158,16 +90,13 @@ try:
     sys.stdout.flush()
     
     arquivo_gold = 'gold/pedidos/gold_pedido_compra_fato.parquet'
-    arquivo_local = 'temp_gold_compra.parquet'
     encontrado_gold = False
     
     try:
-        print(f"[INFO] Baixando: {arquivo_gold}", flush=True)
+        print(f"[INFO] Lendo: {arquivo_gold}", flush=True)
         sys.stdout.flush()
-        blob = bucket.blob(arquivo_gold)
-        blob.download_to_filename(arquivo_local)
-        
-        df = pd.read_parquet(arquivo_local)
+        with store.open_reader(arquivo_gold) as f:
+            df = pd.read_parquet(f)
         print(f"[INFO] Arquivo carregado: {len(df)} registros, {len(df.columns)} colunas", flush=True)
         sys.stdout.flush()
         
@@ -190,13 +119,9 @@ try:
             print(f"\n[RESULTADO] Pedido {PEDIDO_ID} NÃO encontrado na camada Gold", flush=True)
             sys.stdout.flush()
         
-        os.unlink(arquivo_local)
-        
     except Exception as e:
         print(f"[ERRO] Erro ao verificar Gold: {e}", flush=True)
         sys.stdout.flush()
-        if os.path.exists(arquivo_local):
-            os.unlink(arquivo_local)
     
     # RESUMO FINAL
     print("\n" + "="*80, flush=True)
@@ -212,10 +137,10 @@ try:
     if encontrado_bronze and not encontrado_silver:
         print("→ O pedido está no Bronze mas NÃO passou para o Silver.", flush=True)
         print("  Possíveis causas:", flush=True)
-        print("    1. O script nsilver_pedido_compra_stg.py não foi executado após a última coleta", flush=True)
+        print("    1. O silver não foi atualizado após a última coleta", flush=True)
         print("    2. O pedido pode ter sido filtrado durante o processamento", flush=True)
         print("  Solução:", flush=True)
-        print("    Execute: python nsilver_pedido_compra_stg.py", flush=True)
+        print("    Execute: python -m src.lake.silver (só processa as partições bronze alteradas)", flush=True)
     elif encontrado_bronze and encontrado_silver and not encontrado_gold:
         print("→ O pedido está no Bronze e Silver mas NÃO chegou ao Gold.", flush=True)
         print("  Possíveis causas:", flush=True)
@@ -236,9 +161,8 @@ try:
         print(f"    - Verifique o status do pedido (encerrado/cancelado?)", flush=True)
         print(f"    - Verifique a data do pedido e o período de coleta configurado", flush=True)
         print("  Solução:", flush=True)
-        print("    Se o pedido estiver encerrado/cancelado, ajuste o script nbronze_pedido_compra.py:", flush=True)
-        print("    - Linha 42: lExibirPedidosCancelados: 'T'", flush=True)
-        print("    - Linha 43: lExibirPedidosEncerrados: 'T'", flush=True)
+        print("    Confira LAKE_PEDIDO_COMPRA_STATUS (padrão: ativo,cancelado,encerrado) e o período", flush=True)
+        print("    e rode de novo: python -m src.lake.pedido_compra --inicio YYYY-MM-DD --fim YYYY-MM-DD", flush=True)
         
     sys.stdout.flush()
     
@@ -4,6 +4,7 @@ Substitui o fluxo MySQL quando GOOGLE_APPLICATION_CREDENTIALS + GCP_PROJECT_ID +
 Suporta credenciais inline (GOOGLE_APPLICATION_CREDENTIALS_JSON) para Vercel/serverless.
 """
 import os
+import itertools
 import tempfile
 import logging
 import json
@@ -11,11 +12,17 @@ import re
 import uuid
 from datetime import datetime, date
 from decimal import Decimal
-from typing import Dict, List, Any, Optional
+from typing import Container, Dict, List, Any, Iterable, Iterator, Optional
 
 from google.cloud import bigquery
 from google.cloud.bigquery import SchemaField
 
+from src.pipeline.columnar import write_parquet
+from src.utils import json_codec
+from src.utils.row_hash import (
+    DELETED_AT_COLUMN, DELETED_AT_SQL_TYPE, ROW_HASH_COLUMN, ChangeSet, classify_changes, content_columns, normalize_key, row_hash,
+)
+
 logger = logging.getLogger(__name__)
 
 # Tamanho do lote para inserção (BigQuery recomenda até 500 por streaming insert)
@@ -79,6 +86,9 @@ def _resolve_credentials_path(gcp_settings) -> Optional[str]:
 
 
 class BigQueryManager:
+    # Detecção de mudanças no pipeline: acumula as linhas da coleta e grava num único
+    # staging + MERGE no fim (MERGEs concorrentes na mesma tabela abortam e cada um tem custo fixo)
+    buffer_changes = True
     """
     Gerencia dataset e tabelas no BigQuery; insere dados em lote.
     Interface compatível com o uso no orquestrador (create_table, insert_batch).
@@ -100,6 +110,8 @@ class BigQueryManager:
         self._project = project
         self._dataset_id = dataset_id
         self._dataset_ref = f"{project}.{dataset_id}"
+        # Colunas de conteúdo (hash) por tabela, lidas uma vez por carga em get_row_hashes
+        self._change_columns: Dict[str, List[str]] = {}
 
     def create_database_if_not_exists(self):
         """Cria o dataset no BigQuery se não existir (equivalente ao banco MySQL)."""
@@ -112,10 +124,12 @@ class BigQueryManager:
             logger.error(f"Erro ao criar dataset BigQuery: {str(e)}")
             raise
 
-    def create_table(self, table_name: str, schema: Dict[str, str]) -> bool:
+    def create_table(self, table_name: str, schema: Dict[str, str],
+                     indexes: Optional[Dict[str, List[str]]] = None) -> bool:
         """
         Cria tabela no BigQuery a partir do schema (coluna -> tipo MySQL).
-        Converte tipos MySQL para BigQuery.
+        Converte tipos MySQL para BigQuery. BigQuery não tem índices: as colunas dos
+        indexes (na ordem, sem repetir, até 4) viram os campos de clustering da tabela.
         """
         try:
             table_id = f"{self._dataset_ref}.{table_name}"
@@ -131,6 +145,9 @@ class BigQueryManager:
                 bq_type = _mysql_type_to_bigquery(type_def)
                 fields.append(SchemaField(col, bq_type, mode="NULLABLE"))
             table = bigquery.Table(table_id, schema=fields)
+            clustering = list(dict.fromkeys(c for cols in (indexes or {}).values() for c in cols))[:4]
+            if clustering:
+                table.clustering_fields = clustering
             self._client.create_table(table, exists_ok=True)
             logger.info(f"Tabela BigQuery '{table_id}' criada/verificada")
             return True
@@ -138,16 +155,20 @@ class BigQueryManager:
             logger.error(f"Erro ao criar tabela BigQuery '{table_name}': {str(e)}")
             return False
 
-    def _flatten_dict(self, d: Dict[str, Any], parent_key: str = "", sep: str = "_") -> Dict[str, Any]:
+    def _flatten_dict(
+        self, d: Dict[str, Any], parent_key: str = "", sep: str = "_", columns: Optional[Container[str]] = None
+    ) -> Dict[str, Any]:
+        """Achata dict aninhado; listas sem coluna de destino (columns) não são serializadas."""
         if not isinstance(d, dict):
             return d
         items = []
         for k, v in d.items():
             new_key = f"{parent_key}{sep}{k}" if parent_key else k
             if isinstance(v, dict):
-                items.extend(self._flatten_dict(v, new_key, sep).items())
+                items.extend(self._flatten_dict(v, new_key, sep, columns).items())
             elif isinstance(v, list):
-                items.append((new_key, json.dumps(v, ensure_ascii=False) if v else None))
+                if columns is None or new_key in columns:
+                    items.append((new_key, json_codec.dumps(v) if v else None))
             else:
                 items.append((new_key, v))
         return dict(items)
@@ -183,7 +204,7 @@ class BigQueryManager:
         if v is None:
             return None
         if isinstance(v, (dict, list)):
-            return json.dumps(v, ensure_ascii=False)
+            return json_codec.dumps(v)
         if isinstance(v, Decimal):
             return float(v)
         if isinstance(v, (datetime, date)):
@@ -198,7 +219,7 @@ class BigQueryManager:
         return v
 
     def _prepare_row(self, record: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
-        flat = self._flatten_dict(record)
+        flat = self._flatten_dict(record, columns=columns)
         row = {}
         for col in columns:
             v = flat.get(col)
@@ -223,7 +244,8 @@ class BigQueryManager:
         for i in range(0, len(data), INSERT_BATCH_SIZE):
             chunk = data[i : i + INSERT_BATCH_SIZE]
             rows = []
-            id_col = next((c for c in columns if c.lower() == "id"), None)
+            # id gerado só em coluna STRING (UUID); id INTEGER fica nulo em vez de rejeitar a linha
+            id_col = next((f.name for f in table.schema if f.name.lower() == "id" and f.field_type == "STRING"), None)
             for record in chunk:
                 row = self._prepare_row(record, columns)
                 row = {k: v for k, v in row.items() if k in columns}
@@ -279,16 +301,263 @@ class BigQueryManager:
             logger.warning(f"Erro ao buscar chaves existentes em '{table_name}': {e}")
             return set()
 
+    def iter_keys(self, table_name: str, key_columns: List[str], batch_size: int = 50000) -> Iterator[List[Any]]:
+        """Lê as chaves normalizadas da tabela em lotes (páginas do resultado da query)."""
+        cols = ", ".join(key_columns)
+        rows = self._client.query(f"SELECT {cols} FROM {self.table_ref(table_name)}").result(page_size=batch_size)
+        for page in rows.pages:
+            keys = (normalize_key([self._serialize_value(v) for v in row.values()]) for row in page)
+            yield [k for k in keys if k is not None]
+
+    def table_token(self, table_name: str, key_columns: List[str]) -> Optional[str]:
+        """
+        Token barato do conteúdo da tabela (contagem + maior valor de cada coluna da chave) para
+        validar o índice local de chaves; muda se a tabela for esvaziada ou recarregada. None se falhar.
+        """
+        maxes = ", ".join(f"MAX({c})" for c in key_columns)
+        try:
+            row = next(iter(self._client.query(f"SELECT COUNT(*), {maxes} FROM {self.table_ref(table_name)}").result()))
+            return "|".join(str(v) for v in row.values())
+        except Exception as e:
+            logger.warning(f"Não foi possível ler o token de '{table_name}': {e}")
+            return None
+
     def get_key_from_record(self, record: Dict[str, Any], key_columns: List[str]) -> Any:
         """Extrai a chave do registro (mesmo flatten que o insert usa). Para comparar com get_existing_keys."""
         if not key_columns:
             return None
-        flat = self._flatten_dict(record)
+        flat = self._flatten_dict(record, columns=key_columns)
         vals = [self._serialize_value(flat.get(c)) for c in key_columns]
         if len(key_columns) == 1:
             return vals[0]
         return tuple(vals)
 
+    def _ensure_column(self, table_name: str, column: str, bq_type: str) -> bool:
+        """Adiciona a coluna (NULLABLE) se a tabela foi criada antes dela existir no schema."""
+        table_id = f"{self._dataset_ref}.{table_name}"
+        try:
+            table = self._client.get_table(table_id)
+            if any(f.name == column for f in table.schema):
+                return True
+            table.schema = list(table.schema) + [SchemaField(column, bq_type, mode="NULLABLE")]
+            self._client.update_table(table, ["schema"])
+            logger.info(f"Coluna '{column}' adicionada à tabela BigQuery '{table_name}'")
+            return True
+        except Exception as e:
+            logger.warning(f"Não foi possível adicionar '{column}' em '{table_name}': {e}")
+            return False
+
+    def ensure_row_hash_column(self, table_name: str) -> bool:
+        """Adiciona a coluna _row_hash (STRING) em tabelas criadas antes da detecção de mudanças."""
+        return self._ensure_column(table_name, ROW_HASH_COLUMN, "STRING")
+
+    def ensure_deleted_at_column(self, table_name: str) -> bool:
+        """Adiciona a coluna deleted_at (exclusão lógica) em tabelas criadas antes dela."""
+        return self._ensure_column(table_name, DELETED_AT_COLUMN, _mysql_type_to_bigquery(DELETED_AT_SQL_TYPE))
+
+    def get_row_hashes(self, table_name: str, key_columns: List[str]) -> Dict[Any, Optional[str]]:
+        """
+        Retorna chave -> _row_hash de todas as linhas da tabela.
+        Linhas ainda sem hash ou marcadas como excluídas (deleted_at) vêm com None (serão reativadas).
+        """
+        if not key_columns or not self.ensure_row_hash_column(table_name):
+            return {}
+        table_columns = [f.name for f in self._client.get_table(f"{self._dataset_ref}.{table_name}").schema]
+        self._change_columns[table_name] = content_columns(table_columns)
+        cols = ", ".join(key_columns)
+        hash_expr = ROW_HASH_COLUMN
+        if DELETED_AT_COLUMN in table_columns:
+            hash_expr = f"IF({DELETED_AT_COLUMN} IS NULL, {ROW_HASH_COLUMN}, NULL) AS {ROW_HASH_COLUMN}"
+        rows = self.execute_query(f"SELECT {cols}, {hash_expr} FROM {self.table_ref(table_name)}")
+        hashes = {}
+        for r in rows:
+            key = normalize_key([self._serialize_value(r.get(c)) for c in key_columns])
+            if key is not None:
+                hashes[key] = r.get(ROW_HASH_COLUMN)
+        return hashes
+
+    def get_active_keys(self, table_name: str, key_columns: List[str]) -> List[Any]:
+        """Chaves normalizadas das linhas não excluídas (deleted_at IS NULL)."""
+        if not key_columns or not self.ensure_deleted_at_column(table_name):
+            return []
+        cols = ", ".join(key_columns)
+        rows = self.execute_query(
+            f"SELECT {cols} FROM {self.table_ref(table_name)} WHERE {DELETED_AT_COLUMN} IS NULL"
+        )
+        keys = (normalize_key([self._serialize_value(r.get(c)) for c in key_columns]) for r in rows)
+        return [k for k in keys if k is not None]
+
+    def change_key(self, record: Dict[str, Any], key_columns: List[str]) -> Any:
+        """Chave normalizada do registro (comparável com get_row_hashes)."""
+        flat = self._flatten_dict(record, columns=key_columns)
+        return normalize_key([self._serialize_value(flat.get(c)) for c in key_columns])
+
+    def hash_record(self, record: Dict[str, Any], columns: List[str]) -> str:
+        """Hash do registro serializado como no insert, nas colunas de conteúdo."""
+        row = self._prepare_row(record, columns)
+        return row_hash(row[c] for c in columns)
+
+    def classify_changes(
+        self, table_name: str, data: List[Dict[str, Any]], key_columns: List[str], stored: Dict[Any, Optional[str]]
+    ) -> ChangeSet:
+        """Compara o lote com os hashes gravados (stored) e separa inserções, alterações e inalterados."""
+        columns = self._change_columns.get(table_name)
+        if columns is None:
+            table = self._client.get_table(f"{self._dataset_ref}.{table_name}")
+            columns = self._change_columns[table_name] = content_columns(f.name for f in table.schema)
+        return classify_changes(
+            data, stored,
+            key_fn=lambda r: self.change_key(r, key_columns),
+            hash_fn=lambda r: self.hash_record(r, columns),
+        )
+
+    def write_changes(
+        self, table_name: str, inserts: List[Dict[str, Any]], updates: List[Dict[str, Any]], key_columns: List[str]
+    ) -> int:
+        """
+        Grava linhas novas e alteradas com um único MERGE a partir de uma tabela staging
+        (load job, sem custo de streaming). Linhas inalteradas não entram no DML.
+        """
+        data = list(inserts) + list(updates)
+        if not data:
+            return 0
+        table_id = f"{self._dataset_ref}.{table_name}"
+        staging_id = f"{table_id}__stg_{uuid.uuid4().hex[:8]}"
+        try:
+            table = self._client.get_table(table_id)
+            columns = [f.name for f in table.schema]
+            id_col = next((f.name for f in table.schema if f.name.lower() == "id" and f.field_type == "STRING"), None)
+            rows = []
+            for record in data:
+                row = self._prepare_row(record, columns)
+                if id_col is not None and (row.get(id_col) is None or row.get(id_col) == ""):
+                    row[id_col] = str(uuid.uuid4())
+                rows.append(row)
+            job_config = bigquery.LoadJobConfig(
+                schema=table.schema,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            )
+            self._client.load_table_from_json(rows, staging_id, job_config=job_config).result()
+
+            on = " AND ".join(f"T.{c} = S.{c}" for c in key_columns)
+            set_cols = [c for c in columns if c not in key_columns and c not in ("id", "created_at")]
+            set_clause = ", ".join(f"{c} = S.{c}" for c in set_cols)
+            cols_str = ", ".join(columns)
+            vals_str = ", ".join(f"S.{c}" for c in columns)
+            merge = (
+                f"MERGE `{table_id}` T USING `{staging_id}` S ON {on} "
+                + (f"WHEN MATCHED THEN UPDATE SET {set_clause} " if set_clause else "")
+                + f"WHEN NOT MATCHED THEN INSERT ({cols_str}) VALUES ({vals_str})"
+            )
+            job = self._client.query(merge)
+            job.result()
+            written = int(job.num_dml_affected_rows or 0)
+            logger.info(f"MERGE em BigQuery '{table_name}': {written} linhas gravadas ({len(inserts)} novas, {len(updates)} alteradas)")
+            return written
+        except Exception as e:
+            logger.error(f"Erro no MERGE em BigQuery '{table_name}': {e}")
+            raise
+        finally:
+            self._client.delete_table(staging_id, not_found_ok=True)
+
+    def load_arrow(self, table_name: str, batches: Iterable[Any], replace: bool = False) -> int:
+        """
+        Carga de RecordBatches Arrow (src.pipeline.columnar): grava Parquet local, sobe numa
+        tabela staging por load job (sem custo de streaming insert) e copia para a tabela final
+        numa transação (replace=True apaga o conteúdo anterior na mesma transação).
+        """
+        batches = iter(batches)
+        first = next(batches, None)
+        if first is None:
+            # Coleta vazia não apaga a tabela (mesmo comportamento do caminho por dicts)
+            return 0
+        table_id = f"{self._dataset_ref}.{table_name}"
+        staging_id = f"{table_id}__stg_{uuid.uuid4().hex[:8]}"
+        fd, parquet_path = tempfile.mkstemp(suffix=".parquet", prefix=f"{table_name}-")
+        os.close(fd)
+        try:
+            table = self._client.get_table(table_id)
+            # Nomes legados da API de schema -> tipos do GoogleSQL (CAST)
+            legacy = {"FLOAT": "FLOAT64", "BOOLEAN": "BOOL", "INTEGER": "INT64"}
+            types = {f.name: legacy.get(f.field_type, f.field_type) for f in table.schema}
+            columns = [name for name in first.schema.names if name in types]
+            rows = write_parquet(
+                (b.select(columns) for b in itertools.chain([first], batches)),
+                parquet_path, first.select(columns).schema,
+            )
+            job_config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            )
+            with open(parquet_path, "rb") as f:
+                self._client.load_table_from_file(f, staging_id, job_config=job_config).result()
+
+            cols_str = ", ".join(columns)
+            # Parquet sem fuso vira TIMESTAMP no BigQuery: o CAST alinha ao tipo da tabela final
+            select_str = ", ".join(f"CAST({c} AS {types[c]})" for c in columns)
+            script = (
+                "BEGIN TRANSACTION; "
+                + (f"DELETE FROM `{table_id}` WHERE TRUE; " if replace else "")
+                + f"INSERT INTO `{table_id}` ({cols_str}) SELECT {select_str} FROM `{staging_id}`; "
+                "COMMIT TRANSACTION;"
+            )
+            self._client.query(script).result()
+            logger.info(
+                f"Carga Parquet em BigQuery '{table_name}': {rows} registros "
+                f"({'troca completa' if replace else 'append'})"
+            )
+            return rows
+        except Exception as e:
+            logger.error(f"Erro na carga Parquet em BigQuery '{table_name}': {e}")
+            raise
+        finally:
+            self._client.delete_table(staging_id, not_found_ok=True)
+            if os.path.exists(parquet_path):
+                os.unlink(parquet_path)
+
+    def mark_deleted(self, table_name: str, key_columns: List[str], keys: List[Any]) -> int:
+        """Exclusão lógica: grava deleted_at nas linhas das chaves informadas (comparação como STRING)."""
+        if not keys or not key_columns or not self.ensure_deleted_at_column(table_name):
+            return 0
+        key_expr = (
+            f"CAST({key_columns[0]} AS STRING)" if len(key_columns) == 1
+            else "TO_JSON_STRING([" + ", ".join(f"CAST({c} AS STRING)" for c in key_columns) + "])"
+        )
+        values = [k if len(key_columns) == 1 else json.dumps(list(k), separators=(",", ":"), ensure_ascii=False) for k in keys]
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("keys", "STRING", values)]
+        )
+        job = self._client.query(
+            f"UPDATE {self.table_ref(table_name)} SET {DELETED_AT_COLUMN} = CURRENT_DATETIME() "
+            f"WHERE {DELETED_AT_COLUMN} IS NULL AND {key_expr} IN UNNEST(@keys)",
+            job_config=job_config,
+        )
+        job.result()
+        marked = int(job.num_dml_affected_rows or 0)
+        logger.info(f"Marcados {marked} registros como excluídos na origem na tabela BigQuery '{table_name}'")
+        return marked
+
+    def sync_rows(self, table_name: str, data: List[Dict[str, Any]], key_columns: List[str]) -> Dict[str, int]:
+        """
+        Carga com detecção de mudanças: só linhas novas/alteradas entram no MERGE.
+        Linhas ausentes da origem são tratadas à parte (mark_deleted).
+        Retorna contagens: inserted, updated, unchanged.
+        """
+        stored = self.get_row_hashes(table_name, key_columns)
+        changes = self.classify_changes(table_name, data, key_columns, stored)
+        self.write_changes(table_name, changes.inserts, changes.updates, key_columns)
+        stats = {
+            "inserted": len(changes.inserts),
+            "updated": len(changes.updates),
+            "unchanged": changes.unchanged,
+        }
+        logger.info(
+            f"Mudanças em BigQuery '{table_name}': {stats['inserted']} novos, {stats['updated']} alterados, "
+            f"{stats['unchanged']} inalterados"
+            + (f" ({changes.keyless} sem chave, inseridos sem comparação)" if changes.keyless else "")
+        )
+        return stats
+
     def execute_query(self, query: str, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
         """
         Executa uma query SELECT no BigQuery e retorna lista de dicionários.
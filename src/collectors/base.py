@@ -3,9 +3,16 @@ Classe base para coletores de dados.
 Suporta coleta full e incremental (por janela de datas).
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from collections import deque
+import time
 from datetime import datetime, timedelta
 from src.core.interfaces import IDataCollector, IApiClient
+from src.collectors.mapping import MappingSpec, RecordMapper, resolve_path
+from src.collectors.shape_cache import get_shape_cache
+from src.metrics.ledger import add_to_step
+from src.pipeline.columnar import DEFAULT_BATCH_ROWS, iter_record_batches
+from src.pipeline.transform import TransformPool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,6 +35,16 @@ class BaseCollector(IDataCollector, ABC):
             api_client: Cliente da API para fazer requisições
         """
         self.api_client = api_client
+        # Atualizado por iter_pages: True se a última coleta percorreu a origem até o fim
+        self.last_scan_complete = False
+        # Mapeador compilado de get_field_mapping() (criado na primeira página)
+        self._mapper: Optional[RecordMapper] = None
+        # Pool de processos para transform_data (definido pelo orquestrador se process_transform)
+        self.transform_pool: Optional[TransformPool] = None
+
+    # True: transform_data é puro (não usa api_client nem estado externo) e pesado o bastante
+    # para valer rodar em outro processo (src.pipeline.transform)
+    process_transform = False
     
     @abstractmethod
     def get_endpoint(self) -> str:
@@ -71,6 +88,23 @@ class BaseCollector(IDataCollector, ABC):
         """
         return []
 
+    def get_change_key_columns(self) -> List[str]:
+        """
+        Colunas que identificam a linha na detecção de mudanças (_row_hash).
+        Usa get_unique_key_columns(); na falta, a PRIMARY KEY/UNIQUE natural do schema
+        (id auto-incremento não identifica o registro de origem). [] = sem detecção.
+        """
+        keys = self.get_unique_key_columns()
+        if keys:
+            return keys
+        schema = self.get_schema()
+        for marker in ("PRIMARY KEY", "UNIQUE"):
+            for col, type_def in schema.items():
+                t = type_def.upper()
+                if marker in t and "AUTO_INCREMENT" not in t:
+                    return [col]
+        return []
+
     def build_payload(self, **kwargs) -> Dict[str, Any]:
         """
         Constrói o payload para a requisição.
@@ -85,6 +119,13 @@ class BaseCollector(IDataCollector, ABC):
         """
         return kwargs
     
+    def get_field_mapping(self) -> Optional[MappingSpec]:
+        """
+        Mapeamento declarativo (src.collectors.mapping) da resposta para o schema.
+        Se retornar uma MappingSpec, transform_data usa o extrator compilado dela. None = sem mapeamento.
+        """
+        return None
+
     def transform_data(self, raw_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Transforma os dados brutos da API em formato para o banco.
@@ -96,6 +137,45 @@ class BaseCollector(IDataCollector, ABC):
         Returns:
             Lista de dicionários com dados transformados
         """
+        spec = self.get_field_mapping()
+        if spec is not None:
+            if self._mapper is None:
+                cache = get_shape_cache()
+                key = self._shape_key()
+                self._mapper = spec.compile(
+                    self.get_schema(),
+                    fallback=self._find_record_list,
+                    list_path=cache.get(key) if cache is not None else None,
+                    on_list_path=(lambda path: cache.put(key, path)) if cache is not None else None,
+                )
+            return self._mapper.transform(raw_data)
+        return self._find_record_list(raw_data)
+
+    def _shape_key(self) -> str:
+        """Chave do cache de formato da resposta (endpoint|método)."""
+        return f"{self.get_endpoint()}|{self.get_method()}"
+
+    def _find_record_list(self, raw_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Lista de registros da resposta. Usa o caminho aprendido (cache por endpoint/método);
+        se o caminho não existir nesta resposta, sonda de novo e atualiza o cache.
+        """
+        cache = get_shape_cache()
+        key = self._shape_key()
+        path = cache.get(key) if cache is not None else None
+        if path is not None:
+            data = resolve_path(raw_data, path)
+            if isinstance(data, list):
+                return data
+            logger.info(f"Formato da resposta de '{key}' mudou (sem '{'.'.join(path)}'); procurando a lista de novo")
+            cache.invalidate(key)
+        path, data = self._probe_record_list(raw_data)
+        if path is not None and cache is not None:
+            cache.put(key, path)
+        return data
+
+    def _probe_record_list(self, raw_data: Dict[str, Any]) -> Tuple[Optional[Tuple[str, ...]], List[Dict[str, Any]]]:
+        """Procura a lista de registros nas chaves conhecidas da API Omie (ou qualquer lista de dicts)."""
         # Mapeamento de chaves comuns da API Omie
         possible_keys = [
             "cadastros",  # API Omie: oportunidades, etapas faturamento, etc.
@@ -122,23 +202,23 @@ class BaseCollector(IDataCollector, ABC):
             "listaCategoriaCadastro",  # Categorias
         ]
         
-        # Procura por chaves conhecidas
+        # Procura por chaves conhecidas (só listas com dados entram no cache)
         for key in possible_keys:
             if key in raw_data:
                 data = raw_data[key]
                 if isinstance(data, list):
-                    return data
+                    return ((key,) if data else None), data
                 elif isinstance(data, dict) and "cadastro" in data:
                     # Algumas APIs retornam {"cadastro": [...]}
                     if isinstance(data["cadastro"], list):
-                        return data["cadastro"]
+                        return ((key, "cadastro") if data["cadastro"] else None), data["cadastro"]
         
         # Tenta encontrar qualquer lista no primeiro nível
         for key, value in raw_data.items():
             if isinstance(value, list) and len(value) > 0:
                 # Verifica se é uma lista de dicionários (dados válidos)
                 if isinstance(value[0], dict):
-                    return value
+                    return (key,), value
         
         # Se não encontrou nada, loga detalhes para debug
         logger.warning(f"Nenhum dado encontrado na resposta. Chaves disponíveis: {list(raw_data.keys())}")
@@ -149,7 +229,7 @@ class BaseCollector(IDataCollector, ABC):
             sample_value = raw_data[sample_key]
             logger.debug(f"Exemplo de chave '{sample_key}': tipo={type(sample_value)}, valor={str(sample_value)[:200] if not isinstance(sample_value, (dict, list)) else 'estrutura complexa'}")
         
-        return []
+        return None, []
     
     def collect(self, **kwargs) -> List[Dict[str, Any]]:
         """
@@ -164,15 +244,165 @@ class BaseCollector(IDataCollector, ABC):
             Lista de dicionários com os dados coletados
         """
         all_data = []
+        for page_data in self.iter_pages(**kwargs):
+            all_data.extend(page_data)
+        return all_data
+
+    def iter_record_batches(self, batch_rows: int = DEFAULT_BATCH_ROWS, **kwargs) -> Iterator[Any]:
+        """
+        Coleta página a página e entrega pyarrow.RecordBatch tipados pelo get_schema()
+        (exige pyarrow). Os carregadores consomem os lotes direto (load_arrow).
+        """
+        return iter_record_batches(self.iter_pages(**kwargs), self.get_schema(), batch_rows)
+
+    def _incremental_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Em modo incremental, completa data_inicio/data_fim com a janela padrão."""
+        if not (kwargs.get('incremental', False) and self.supports_incremental()):
+            return kwargs
+        days = kwargs.get('incremental_days', INCREMENTAL_DAYS_DEFAULT)
+        data_fim = kwargs.get('data_fim') or datetime.now().strftime("%Y-%m-%d")
+        data_inicio = kwargs.get('data_inicio') or (datetime.now() - timedelta(days=int(days))).strftime("%Y-%m-%d")
+        logger.info(f"Coleta incremental: {data_inicio} a {data_fim} (últimos {days} dias)")
+        return {**kwargs, "data_inicio": data_inicio, "data_fim": data_fim}
+
+    @staticmethod
+    def _uses_pagination(payload: Dict[str, Any]) -> bool:
+        return any(k in payload for k in ['pagina', 'nPagina', 'registros_por_pagina', 'nRegPorPagina', 'nRegsPorPagina'])
+
+    @staticmethod
+    def _total_pages(response: Dict[str, Any], payload: Dict[str, Any], registros_por_pagina: int) -> int:
+        """Total de páginas informado pela resposta (0 se desconhecido)."""
+        total_de_paginas = (
+            response.get('total_de_paginas')
+            or response.get('nTotalPaginas')
+            or response.get('nTotPaginas')
+            or response.get('totalPaginas')
+            or 0
+        )
+        if total_de_paginas:
+            return int(total_de_paginas)
+        total_de_registros = (
+            response.get('total_de_registros')
+            or response.get('nTotalRegistros')
+            or response.get('nTotRegistros')
+            or response.get('totalRegistros')
+            or 0
+        )
+        if total_de_registros:
+            reg_por_pag = payload.get('nRegPorPagina') or payload.get('nRegsPorPagina') or payload.get('registros_por_pagina', registros_por_pagina)
+            return (int(total_de_registros) + reg_por_pag - 1) // reg_por_pag
+        return 0
+
+    def _iter_pages_pooled(self, **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """
+        iter_pages com transform_data no pool de processos: esta thread só busca os bytes das
+        páginas (request_raw) e entrega os resultados em ordem. Depois da primeira página
+        (que informa o total), mantém até max_in_flight páginas buscadas à frente; sem total
+        conhecido, busca só uma à frente para não pedir páginas além do fim.
+        Mesmas regras de parada e de last_scan_complete que iter_pages.
+        """
+        pool = self.transform_pool
+        total_coletado = 0
+        self.last_scan_complete = False
+        completo = False
         pagina = kwargs.get('pagina', 1)
         registros_por_pagina = kwargs.get('registros_por_pagina', 200)
-        incremental = kwargs.get('incremental', False) and self.supports_incremental()
-        if incremental:
-            days = kwargs.get('incremental_days', INCREMENTAL_DAYS_DEFAULT)
-            data_fim = kwargs.get('data_fim') or datetime.now().strftime("%Y-%m-%d")
-            data_inicio = kwargs.get('data_inicio') or (datetime.now() - timedelta(days=int(days))).strftime("%Y-%m-%d")
-            kwargs = {**kwargs, "data_inicio": data_inicio, "data_fim": data_fim}
-            logger.info(f"Coleta incremental: {data_inicio} a {data_fim} (últimos {days} dias)")
+        kwargs = self._incremental_kwargs(kwargs)
+        max_iterations = kwargs.get('max_iterations', 1000)
+        endpoint = self.get_endpoint()
+        method = self.get_method()
+        iteration = 0
+        total_paginas: Optional[int] = None  # None = primeira página ainda não transformada
+        fetching = True
+        pending = deque()  # (página, payload, usa_paginacao, future)
+
+        try:
+            while True:
+                ahead = pool.max_in_flight if total_paginas else 1
+                while fetching and len(pending) < ahead and iteration < max_iterations:
+                    if total_paginas and pagina > total_paginas:
+                        fetching = False
+                        break
+                    payload = self.build_payload(pagina=pagina, registros_por_pagina=registros_por_pagina, **kwargs)
+                    if payload is None:
+                        logger.info("Coleta pulada: build_payload retornou None (parâmetros inválidos ou coleta não aplicável)")
+                        fetching = False
+                        break
+                    usa_paginacao = self._uses_pagination(payload)
+                    logger.info(
+                        f"Coletando dados: endpoint={endpoint} call={method} - Página {pagina}"
+                        if usa_paginacao else
+                        f"Coletando dados: endpoint={endpoint} call={method} (sem paginação)"
+                    )
+                    if iteration > 0:
+                        time.sleep(0.5)  # 500ms entre requisições
+                        add_to_step(sleep_time=0.5)
+                    raw = self.api_client.request_raw(endpoint, method, payload)
+                    pending.append((pagina, payload, usa_paginacao, pool.submit(self, raw)))
+                    iteration += 1
+                    pagina += 1
+                    if not usa_paginacao:
+                        fetching = False
+                if not pending:
+                    break
+
+                num, payload, usa_paginacao, future = pending.popleft()
+                espera = time.perf_counter()
+                page = future.result()
+                # Transformação roda no pool: conta o tempo em que a coleta ficou esperando por ela
+                add_to_step(transform_time=time.perf_counter() - espera)
+                if "faultstring" in page.meta:
+                    logger.error(f"Erro na API: {page.meta['faultstring']}")
+                    break
+                if total_paginas is None:
+                    total_paginas = self._total_pages(page.meta, payload, registros_por_pagina)
+                if not page.records:
+                    logger.warning(f"Nenhum dado transformado na página {num}. Chaves na resposta: {list(page.meta.keys())[:10]}")
+                    completo = True
+                    break
+                total_coletado += len(page.records)
+                add_to_step(rows_fetched=len(page.records))
+                logger.info(f"Página {num}: {len(page.records)} registros coletados")
+                yield page.records
+                if not usa_paginacao or (total_paginas and num >= total_paginas):
+                    completo = True
+                    break
+
+            self.last_scan_complete = completo
+            logger.info(f"Total de dados coletados: {total_coletado} registros")
+
+        except Exception as e:
+            logger.error(f"Erro ao coletar dados: {str(e)}")
+            # Encerra com o que já foi entregue até o erro
+        finally:
+            for *_, future in pending:
+                future.cancel()
+
+    def iter_pages(self, **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Coleta dados da API página a página (gerador).
+        Cada item é a lista de registros transformados de uma página; permite que o
+        orquestrador carregue uma página enquanto a próxima é buscada.
+        Em caso de erro, encerra após as páginas já entregues.
+        Ao final, last_scan_complete indica se a origem foi percorrida até o fim
+        (False após erro, fault da API ou limite de iterações).
+        
+        Args:
+            **kwargs: Parâmetros específicos do coletor
+            
+        Yields:
+            Lista de dicionários com os dados de cada página
+        """
+        if (self.process_transform and self.transform_pool is not None
+                and hasattr(self.api_client, 'request_raw')):
+            yield from self._iter_pages_pooled(**kwargs)
+            return
+        total_coletado = 0
+        self.last_scan_complete = False
+        completo = False
+        pagina = kwargs.get('pagina', 1)
+        registros_por_pagina = kwargs.get('registros_por_pagina', 200)
+        kwargs = self._incremental_kwargs(kwargs)
         
         try:
             # Para APIs sem paginação (ex: extrato, ordem_servico), coleta apenas uma vez
@@ -192,7 +422,7 @@ class BaseCollector(IDataCollector, ABC):
                     break
                 
                 # Detecta formato de paginação usado
-                usa_paginacao = any(k in payload for k in ['pagina', 'nPagina', 'registros_por_pagina', 'nRegPorPagina', 'nRegsPorPagina'])
+                usa_paginacao = self._uses_pagination(payload)
                 
                 # Se não usa paginação, coleta apenas uma vez
                 if not usa_paginacao and iteration > 0:
@@ -205,8 +435,8 @@ class BaseCollector(IDataCollector, ABC):
                 
                 # Adiciona delay entre requisições para evitar rate limiting
                 if iteration > 0:
-                    import time
                     time.sleep(0.5)  # 500ms entre requisições
+                    add_to_step(sleep_time=0.5)
                 
                 response = self.api_client.request(endpoint, method, payload)
                 
@@ -216,11 +446,14 @@ class BaseCollector(IDataCollector, ABC):
                     break
                 
                 # Transforma os dados
+                inicio_transform = time.perf_counter()
                 page_data = self.transform_data(response)
+                add_to_step(transform_time=time.perf_counter() - inicio_transform)
                 
                 # Log de debug se não encontrou dados
                 if not page_data:
                     logger.warning(f"Nenhum dado transformado na página {pagina}. Chaves na resposta: {list(response.keys())[:10]}")
+                    completo = True
                     # Se não usa paginação, para após primeira tentativa
                     if not usa_paginacao:
                         break
@@ -230,37 +463,21 @@ class BaseCollector(IDataCollector, ABC):
                     # Se páginas seguintes não têm dados, para
                     break
                 
-                all_data.extend(page_data)
+                total_coletado += len(page_data)
+                add_to_step(rows_fetched=len(page_data))
                 logger.info(f"Página {pagina}: {len(page_data)} registros coletados")
+                yield page_data
                 
                 # Se não usa paginação, para após primeira coleta
                 if not usa_paginacao:
+                    completo = True
                     break
                 
                 # Verifica se há mais páginas (Omie pode usar total_de_paginas, nTotalPaginas, nTotPaginas etc.)
-                total_de_paginas = (
-                    response.get('total_de_paginas')
-                    or response.get('nTotalPaginas')
-                    or response.get('nTotPaginas')
-                    or response.get('totalPaginas')
-                    or 0
-                )
-                total_de_registros = (
-                    response.get('total_de_registros')
-                    or response.get('nTotalRegistros')
-                    or response.get('nTotRegistros')
-                    or response.get('totalRegistros')
-                    or 0
-                )
-                reg_por_pag = payload.get('nRegPorPagina') or payload.get('nRegsPorPagina') or payload.get('registros_por_pagina', registros_por_pagina)
-                
-                if total_de_paginas:
-                    if pagina >= int(total_de_paginas):
-                        break
-                elif total_de_registros:
-                    total_paginas = (int(total_de_registros) + reg_por_pag - 1) // reg_por_pag
-                    if pagina >= total_paginas:
-                        break
+                total_paginas = self._total_pages(response, payload, registros_por_pagina)
+                if total_paginas and pagina >= total_paginas:
+                    completo = True
+                    break
                 
                 # Para quando a página veio vazia (fim dos dados)
                 if len(page_data) == 0:
@@ -269,9 +486,9 @@ class BaseCollector(IDataCollector, ABC):
                 pagina += 1
                 iteration += 1
             
-            logger.info(f"Total de dados coletados: {len(all_data)} registros")
-            return all_data
+            self.last_scan_complete = completo
+            logger.info(f"Total de dados coletados: {total_coletado} registros")
             
         except Exception as e:
             logger.error(f"Erro ao coletar dados: {str(e)}")
-            return all_data  # Retorna o que foi coletado até o erro
+            # Encerra com o que já foi entregue até o erro
@@ -3,7 +3,7 @@ Coletor de dados de Extrato.
 NOTA: Este coletor requer uma conta corrente válida (nCodCC ou cCodIntCC).
 Forneça o código manualmente ou configure no .env/testar_coletor.py
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator
 from src.collectors.base import BaseCollector
 import logging
 
@@ -91,9 +91,10 @@ class ExtratoCollector(BaseCollector):
         return payload
     
     
-    def collect(self, **kwargs) -> List[Dict[str, Any]]:
+    def iter_pages(self, **kwargs) -> Iterator[List[Dict[str, Any]]]:
         """
-        Sobrescreve collect para adicionar delays e melhor tratamento de erros.
+        Sobrescreve iter_pages (usado por collect e pelo pipeline) para adicionar delays
+        e melhor tratamento de erros.
         A validação de conta corrente é feita no build_payload.
         """
         import time
@@ -103,9 +104,9 @@ class ExtratoCollector(BaseCollector):
         time.sleep(2)
         
         try:
-            # Chama o método collect do BaseCollector
+            # Chama o método iter_pages do BaseCollector
             # O BaseCollector já verifica se build_payload retorna None
-            return super().collect(**kwargs)
+            yield from super().iter_pages(**kwargs)
         except Exception as e:
             error_msg = str(e)
             
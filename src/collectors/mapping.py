@@ -0,0 +1,230 @@
+"""
+Mapeamento declarativo de campos da API Omie para o schema da tabela.
+Cada coletor descreve onde está a lista de registros e, por campo, os caminhos alternativos
+(em ordem de prioridade), o tipo e o tamanho máximo. A especificação é compilada uma vez
+num RecordMapper, que aprende na primeira página qual formato de resposta a API está usando
+e, nas páginas seguintes, vai direto à lista. Os campos sempre percorrem os caminhos em ordem
+de prioridade (vale o primeiro não vazio), como as cadeias "a or b or c" que substituem: o
+mesmo registro é mapeado igual em qualquer página.
+"""
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class Field:
+    """
+    Campo de destino.
+    paths: caminhos na origem em ordem de prioridade ("Cabecalho.nCodOS"); vale o primeiro não vazio.
+    type: str | float | int | raw (valor como veio).
+    default: valor quando nenhum caminho tem dado.
+    max_len: trunca strings (padrão: tamanho do VARCHAR/CHAR no schema).
+    convert: função aplicada ao valor encontrado (ou None) no lugar da conversão por tipo.
+    """
+    name: str
+    paths: Tuple[str, ...]
+    type: str = "str"
+    default: Any = None
+    max_len: Optional[int] = None
+    convert: Optional[Callable[[Any], Any]] = None
+
+
+@dataclass(frozen=True)
+class MappingSpec:
+    """
+    Especificação de mapeamento de um coletor.
+    list_paths: onde procurar a lista de registros ("osListarResponse.listaOS"; "chave.*" = primeira
+    lista dentro do dict). Sem acerto, faz busca genérica por lista de dicts (deep_scan: também no
+    segundo nível) e, por fim, usa o fallback do coletor.
+    keep_empty: campos mantidos mesmo vazios (os demais vazios são removidos do registro).
+    require_any: registro só é aceito se algum destes campos tiver valor.
+    """
+    list_paths: Tuple[str, ...]
+    fields: Tuple[Field, ...]
+    keep_empty: Tuple[str, ...] = ()
+    require_any: Tuple[str, ...] = ()
+    deep_scan: bool = False
+
+    def compile(self, schema: Optional[Dict[str, str]] = None,
+                fallback: Optional[Callable[[Dict[str, Any]], List[Dict[str, Any]]]] = None,
+                list_path: Optional[Tuple[str, ...]] = None,
+                on_list_path: Optional[Callable[[Tuple[str, ...]], None]] = None) -> "RecordMapper":
+        return RecordMapper(self, schema, fallback, list_path, on_list_path)
+
+
+def _split(path: str) -> Tuple[str, ...]:
+    return tuple(path.split("."))
+
+
+def resolve_path(data: Any, parts: Tuple[str, ...]) -> Any:
+    for part in parts:
+        if not isinstance(data, dict):
+            return _MISSING
+        data = data.get(part, _MISSING)
+        if data is _MISSING:
+            return _MISSING
+    return data
+
+
+def _schema_lengths(schema: Optional[Dict[str, str]]) -> Dict[str, int]:
+    lengths = {}
+    for col, type_def in (schema or {}).items():
+        m = re.match(r"^\s*(VARCHAR|CHAR)\s*\((\d+)\)", type_def, re.IGNORECASE)
+        if m:
+            lengths[col] = int(m.group(2))
+    return lengths
+
+
+def _to_float(v: Any, default: Any) -> Any:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_int(v: Any, default: Any) -> Any:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        try:
+            return int(float(v))
+        except (TypeError, ValueError):
+            return default
+
+
+class _CompiledField:
+    """Campo compilado: caminhos pré-divididos e conversão resolvida."""
+
+    __slots__ = ("name", "paths", "kind", "default", "max_len", "convert")
+
+    def __init__(self, spec: Field, max_len: Optional[int]):
+        self.name = spec.name
+        self.paths = [_split(p) for p in spec.paths]
+        self.kind = spec.type
+        self.default = spec.default
+        self.max_len = max_len
+        self.convert = spec.convert
+
+    def extract(self, item: Dict[str, Any]) -> Any:
+        """Primeiro valor não vazio na ordem de prioridade dos caminhos, convertido."""
+        for parts in self.paths:
+            v = resolve_path(item, parts)
+            if v is not _MISSING and v:
+                return self._cast(v)
+        return self._cast(None)
+
+    def _cast(self, value: Any) -> Any:
+        if self.convert is not None:
+            return self.convert(value)
+        kind = self.kind
+        if kind == "str":
+            if not value:
+                return "" if self.default is None else self.default
+            s = str(value)
+            return s[: self.max_len] if self.max_len and len(s) > self.max_len else s
+        if kind == "float":
+            default = 0.0 if self.default is None else self.default
+            return _to_float(value, default) if value else default
+        if kind == "int":
+            default = 0 if self.default is None else self.default
+            return _to_int(value, default) if value else default
+        return value if value else self.default
+
+
+class RecordMapper:
+    """
+    Extrator compilado de uma MappingSpec (estado por instância de coletor).
+    Aprende na primeira página com dados o caminho da lista de registros.
+    """
+
+    def __init__(self, spec: MappingSpec, schema: Optional[Dict[str, str]] = None,
+                 fallback: Optional[Callable[[Dict[str, Any]], List[Dict[str, Any]]]] = None,
+                 list_path: Optional[Tuple[str, ...]] = None,
+                 on_list_path: Optional[Callable[[Tuple[str, ...]], None]] = None):
+        """list_path: caminho já conhecido (cache de formato); on_list_path: avisado quando aprende um novo."""
+        self.spec = spec
+        lengths = _schema_lengths(schema)
+        self.fields = [_CompiledField(f, f.max_len or lengths.get(f.name)) for f in spec.fields]
+        self._fallback = fallback
+        self._list_path: Optional[Tuple[str, ...]] = tuple(list_path) if list_path else None
+        self._on_list_path = on_list_path
+        self._keep_empty = set(spec.keep_empty)
+
+    # ---- lista de registros ----
+
+    def _probe_list(self, raw: Dict[str, Any]) -> Tuple[Optional[Tuple[str, ...]], List[Dict[str, Any]]]:
+        """Procura a lista de registros nos caminhos declarados e, depois, por busca genérica."""
+        for path in self.spec.list_paths:
+            if path.endswith(".*"):
+                container = resolve_path(raw, _split(path[:-2]))
+                if isinstance(container, dict):
+                    for sub_key, sub_value in container.items():
+                        if isinstance(sub_value, list) and sub_value:
+                            return _split(path[:-2]) + (sub_key,), sub_value
+                continue
+            value = resolve_path(raw, _split(path))
+            if isinstance(value, list) and value:
+                return _split(path), value
+        for key, value in raw.items():
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                return (key,), value
+        if self.spec.deep_scan:
+            for key, value in raw.items():
+                if isinstance(value, dict):
+                    for sub_key, sub_value in value.items():
+                        if isinstance(sub_value, list) and sub_value and isinstance(sub_value[0], dict):
+                            return (key, sub_key), sub_value
+        return None, []
+
+    def extract_list(self, raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self._list_path is not None:
+            value = resolve_path(raw, self._list_path)
+            if isinstance(value, list):
+                return value
+            logger.info(f"Formato da resposta mudou (sem '{'.'.join(self._list_path)}'); procurando a lista de novo")
+            self._list_path = None
+        path, data_list = self._probe_list(raw)
+        if path is not None:
+            self._list_path = path
+            if self._on_list_path is not None:
+                self._on_list_path(path)
+            logger.info(f"Encontrados {len(data_list)} registros em '{'.'.join(path)}'")
+            return data_list
+        if self._fallback is not None:
+            logger.warning(f"Nenhum dado encontrado. Chaves disponíveis: {list(raw.keys())}")
+            return self._fallback(raw)
+        return []
+
+    # ---- registros ----
+
+    def map_item(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Mapeia um registro; None se não tiver nenhum campo de require_any."""
+        mapped = {}
+        keep = self._keep_empty
+        for f in self.fields:
+            v = f.extract(item)
+            if v or f.name in keep:
+                mapped[f.name] = v
+        if self.spec.require_any and not any(mapped.get(n) for n in self.spec.require_any):
+            return None
+        return mapped
+
+    def transform(self, raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+        data_list = self.extract_list(raw)
+        mapped_data = []
+        for item in data_list:
+            if not isinstance(item, dict):
+                continue
+            mapped = self.map_item(item)
+            if mapped is not None:
+                mapped_data.append(mapped)
+            else:
+                logger.debug(f"Registro ignorado (sem {' nem '.join(self.spec.require_any)}). Chaves disponíveis: {list(item.keys())[:5]}")
+        logger.info(f"Total de {len(mapped_data)} registros mapeados para inserção")
+        return mapped_data
@@ -18,6 +18,9 @@ def _get(d: dict, key: str, default=None):
 class NfConsultarCollector(BaseCollector):
     """Coletor para listagem de NF-e (produtos/nfconsultar/)."""
 
+    # transform_data puro e pesado: pode rodar no pool de processos (PIPELINE_TRANSFORM_WORKERS)
+    process_transform = True
+
     def get_endpoint(self) -> str:
         return "produtos/nfconsultar/"
 
@@ -31,6 +31,9 @@ def _date_omie(d: str) -> str:
 class NfseCollector(BaseCollector):
     """Coletor para listagem de NFS-e (servicos/nfse/)."""
 
+    # transform_data puro e pesado: pode rodar no pool de processos (PIPELINE_TRANSFORM_WORKERS)
+    process_transform = True
+
     def get_endpoint(self) -> str:
         return "servicos/nfse/"
 
@@ -33,9 +33,27 @@ def _date_omie(d: str) -> str:
     return d
 
 
+# Filtros de status do PesquisarPedCompra ligados por conjunto de status.
+# "ativo" é o que a coleta sempre trouxe (pendentes, faturados, recebidos e parciais).
+PEDIDO_COMPRA_STATUS = {
+    "ativo": (
+        "lExibirPedidosPendentes",
+        "lExibirPedidosFaturados",
+        "lExibirPedidosRecebidos",
+        "lExibirPedidosRecParciais",
+        "lExibirPedidosFatParciais",
+    ),
+    "cancelado": ("lExibirPedidosCancelados",),
+    "encerrado": ("lExibirPedidosEncerrados",),
+}
+
+
 class PedidosCompraCollector(BaseCollector):
     """Coletor para pedidos de compra (produtos/pedidocompra/). Uma linha por pedido (cabeçalho)."""
 
+    # transform_data puro e pesado: pode rodar no pool de processos (PIPELINE_TRANSFORM_WORKERS)
+    process_transform = True
+
     def get_endpoint(self) -> str:
         return "produtos/pedidocompra/"
 
@@ -87,11 +105,17 @@ class PedidosCompraCollector(BaseCollector):
         """
         Payload alinhado à API Omie. Máximo 100 registros por página (limite da Omie).
         Janela: 01/01/2024 até hoje. Flags iguais ao script que funciona.
+        status: chave de PEDIDO_COMPRA_STATUS (padrão "ativo"); data_inicial/data_final
+        (YYYY-MM-DD ou DD/MM/YYYY) fixam a janela (usado pelo bronze em src.lake).
         """
         from datetime import datetime
         hoje = datetime.now()
         data_inicio_default = "01/01/2024"
         data_fim_default = hoje.strftime("%d/%m/%Y")
+        status = kwargs.get("status") or "ativo"
+        if status not in PEDIDO_COMPRA_STATUS:
+            raise ValueError(f"Status de pedido de compra desconhecido: {status}")
+        ligados = PEDIDO_COMPRA_STATUS[status]
 
         # Omie: máximo 100 registros por página neste endpoint
         n_regs = min(int(registros_por_pagina), 100)
@@ -99,17 +123,19 @@ class PedidosCompraCollector(BaseCollector):
             "nPagina": int(pagina),
             "nRegsPorPagina": n_regs,
             "lApenasImportadoApi": "F",
-            "lExibirPedidosPendentes": "T",
-            "lExibirPedidosFaturados": "T",
-            "lExibirPedidosRecebidos": "T",
+            "lExibirPedidosPendentes": "F",
+            "lExibirPedidosFaturados": "F",
+            "lExibirPedidosRecebidos": "F",
             "lExibirPedidosCancelados": "F",
             "lExibirPedidosEncerrados": "F",
-            "lExibirPedidosRecParciais": "T",
-            "lExibirPedidosFatParciais": "T",
-            "dDataInicial": data_inicio_default,
-            "dDataFinal": data_fim_default,
+            "lExibirPedidosRecParciais": "F",
+            "lExibirPedidosFatParciais": "F",
+            "dDataInicial": _date_omie(kwargs.get("data_inicial") or data_inicio_default),
+            "dDataFinal": _date_omie(kwargs.get("data_final") or data_fim_default),
             "lApenasAlterados": "F",
         }
+        for flag in ligados:
+            payload[flag] = "T"
 
         if kwargs.get("incremental") and kwargs.get("data_inicio") and kwargs.get("data_fim"):
             payload["dDataInicial"] = _date_omie(kwargs["data_inicio"])
@@ -0,0 +1,82 @@
+"""
+Cache do formato das respostas da API Omie: para cada endpoint/método, o caminho da lista
+de registros na resposta (ex.: ["osCadastro"] ou ["dreCadastroListResponse", "dreLista"]).
+Aprendido na primeira página com dados e persistido em JSON entre execuções; as páginas
+seguintes (e as próximas execuções) vão direto ao caminho, e só voltam a sondar a resposta
+quando o caminho some.
+"""
+import os
+import json
+import tempfile
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "omie_shape_cache.json")
+
+
+class ShapeCache:
+    """Mapa endpoint|método -> caminho da lista, em memória e em arquivo JSON (troca atômica)."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATH):
+        self.path = path
+        self._paths: Optional[Dict[str, List[str]]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[str]]:
+        if self._paths is None:
+            self._paths = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    self._paths = {k: list(v) for k, v in data.items() if isinstance(v, list)}
+                except (OSError, ValueError, AttributeError) as e:
+                    logger.warning(f"Cache de formato '{self.path}' inválido ({e}); será recriado")
+        return self._paths
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._paths, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o cache de formato '{self.path}': {e}")
+
+    def get(self, key: str) -> Optional[Tuple[str, ...]]:
+        with self._lock:
+            path = self._load().get(key)
+        return tuple(path) if path else None
+
+    def put(self, key: str, path: Tuple[str, ...]):
+        with self._lock:
+            paths = self._load()
+            if paths.get(key) == list(path):
+                return
+            paths[key] = list(path)
+            self._save()
+        logger.debug(f"Formato de '{key}' aprendido: {'.'.join(path)}")
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+
+_cache: Optional[ShapeCache] = ShapeCache()
+
+
+def configure_shape_cache(enabled: bool = True, path: Optional[str] = None):
+    """Liga/desliga o cache e define o arquivo (None = pasta temporária do sistema)."""
+    global _cache
+    _cache = ShapeCache(path or DEFAULT_PATH) if enabled else None
+
+
+def get_shape_cache() -> Optional[ShapeCache]:
+    return _cache
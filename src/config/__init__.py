@@ -1,6 +1,6 @@
 """
 Módulo de configuração do sistema.
 """
-from src.config.settings import Settings, DatabaseSettings, OmieSettings, GcpSettings
+from src.config.settings import Settings, DatabaseSettings, OmieSettings, GcpSettings, LakeSettings, PipelineSettings, WebSettings
 
-__all__ = ["Settings", "DatabaseSettings", "OmieSettings", "GcpSettings"]
+__all__ = ["Settings", "DatabaseSettings", "OmieSettings", "GcpSettings", "LakeSettings", "PipelineSettings", "WebSettings"]
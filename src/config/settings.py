@@ -42,6 +42,11 @@ class DatabaseSettings(BaseSettings):
     DB_NAME: str = "coleta_dados"
     DB_POOL_SIZE: int = 10
     DB_MAX_OVERFLOW: int = 20
+    # Carga em massa via LOAD DATA LOCAL INFILE (exige local_infile=ON no servidor); o cliente só
+    # envia arquivos da pasta privada de carga (allow_local_infile_in_path), nunca outros caminhos
+    DB_LOCAL_INFILE: bool = True
+    # Abaixo deste número de linhas usa o INSERT em lote normal
+    DB_BULK_LOAD_MIN_ROWS: int = 5000
 
     class Config:
         env_file = ".env"
@@ -67,6 +72,90 @@ class OmieSettings(BaseSettings):
         extra = "ignore"
 
 
+class PipelineSettings(BaseSettings):
+    """Configurações do pipeline de coleta (busca na API e carga no banco em paralelo)."""
+    # True: páginas são carregadas por workers enquanto a próxima página é buscada na API
+    PIPELINE_ENABLED: bool = False
+    # Workers de carga (conexões simultâneas ao MySQL/BigQuery); manter abaixo de DB_POOL_SIZE
+    PIPELINE_LOADER_WORKERS: int = 4
+    # Máximo de páginas aguardando carga (backpressure: a coleta espera quando a fila enche)
+    PIPELINE_QUEUE_BATCHES: int = 16
+    # True: compara o hash de cada linha com _row_hash gravado e escreve só inserções/alterações
+    # (desligado até ser validado em produção)
+    PIPELINE_ROW_HASH: bool = False
+    # Reconciliação de exclusões: não marca deleted_at se mais que esta fração da tabela sumiu da origem
+    PIPELINE_RECONCILE_MAX_DELETE_RATIO: float = 0.5
+    # Índice local de chaves (carga incremental sem detecção de mudanças): evita reler todas as chaves do banco
+    # (validado pelo token da tabela: COUNT(*) + MAX da chave; sem uso com PIPELINE_ROW_HASH=true)
+    PIPELINE_KEY_INDEX: bool = True
+    # Diretório dos índices (padrão: pasta temporária do sistema)
+    PIPELINE_KEY_INDEX_DIR: Optional[str] = None
+    # Reconstrói o índice a partir do banco após este tempo (pega gravações feitas por outros processos)
+    PIPELINE_KEY_INDEX_MAX_AGE_HOURS: float = 24
+    # Cache do formato das respostas (caminho da lista de registros por endpoint/método), entre execuções
+    PIPELINE_SHAPE_CACHE: bool = True
+    # Arquivo JSON do cache (padrão: pasta temporária do sistema)
+    PIPELINE_SHAPE_CACHE_PATH: Optional[str] = None
+    # Full refresh via lotes colunares Arrow (Parquet no BigQuery, CSV no LOAD DATA); exige pyarrow
+    PIPELINE_COLUMNAR: bool = False
+    # Linhas por RecordBatch no caminho colunar
+    PIPELINE_COLUMNAR_BATCH_ROWS: int = 50000
+    # Processos para transform_data dos coletores pesados (pedidos de compra, NF-e, NFS-e); 0 = desligado
+    PIPELINE_TRANSFORM_WORKERS: int = 0
+    # Páginas buscadas à frente por coletor enquanto as anteriores são transformadas
+    PIPELINE_TRANSFORM_IN_FLIGHT: int = 4
+    # Métricas (api_metrics) gravadas em lote por uma thread a cada N segundos; 0 = só no fim da execução
+    PIPELINE_METRICS_FLUSH_SECONDS: float = 30
+    # Grava antes do intervalo quando o buffer de métricas chega a este tamanho
+    PIPELINE_METRICS_BUFFER_ROWS: int = 200
+    # Profiler de amostragem da execução (o mesmo que src/main.py --profile); saída .folded (flame graph)
+    PIPELINE_PROFILE: bool = False
+    # Diretório dos perfis (um .folded por execução e, com PER_COLLECTOR, um por coletor)
+    PIPELINE_PROFILE_DIR: str = "profiles"
+    # Intervalo entre amostras (ms); 10 ms = 100 amostras/s por thread
+    PIPELINE_PROFILE_INTERVAL_MS: float = 10
+    PIPELINE_PROFILE_PER_COLLECTOR: bool = False
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class LakeSettings(BaseSettings):
+    """Configurações do data lake (camada bronze em Parquet; ver src.lake)."""
+    # Raiz onde ficam as camadas (bronze/..., silver/...): diretório local ou gs://bucket/prefixo
+    LAKE_ROOT: str = "data/lake"
+    # Status de pedido de compra coletados no bronze (ver PEDIDO_COMPRA_STATUS)
+    LAKE_PEDIDO_COMPRA_STATUS: str = "ativo,cancelado,encerrado"
+    # dia | mes | ano: tamanho da janela de datas (uma partição por janela)
+    LAKE_GRANULARIDADE: str = "mes"
+    # Tamanho alvo (MB) dos arquivos gerados pela compactação (python -m src.lake.compaction)
+    LAKE_COMPACTACAO_ALVO_MB: int = 128
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class WebSettings(BaseSettings):
+    """Configurações do dashboard web (cache compartilhado entre processos)."""
+    # memory: dict por processo | sqlite: arquivo local compartilhado por todos os workers da máquina
+    DASHBOARD_CACHE_BACKEND: str = "sqlite"
+    # Caminho do arquivo SQLite (padrão: diretório privado do usuário, 0700, no temporário do sistema)
+    DASHBOARD_CACHE_PATH: Optional[str] = None
+    DASHBOARD_CACHE_TTL: int = 45
+    DASHBOARD_CACHE_MAX_ENTRIES: int = 256
+    # Segundos que o token de versão (/api/version) fica em cache; a página só busca os dados quando ele muda
+    DASHBOARD_VERSION_TTL: int = 15
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
 class Settings:
     """Classe principal de configurações."""
     
@@ -74,3 +163,6 @@ class Settings:
         self.database = DatabaseSettings()
         self.omie = OmieSettings()
         self.gcp = GcpSettings()
+        self.pipeline = PipelineSettings()
+        self.web = WebSettings()
+        self.lake = LakeSettings()
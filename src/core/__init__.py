@@ -5,12 +5,14 @@ from src.core.interfaces import (
     IApiClient,
     IDataCollector,
     IDatabaseManager,
-    IMetricsCollector
+    IMetricsCollector,
+    IObjectStore
 )
 
 __all__ = [
     "IApiClient",
     "IDataCollector",
     "IDatabaseManager",
-    "IMetricsCollector"
+    "IMetricsCollector",
+    "IObjectStore"
 ]
@@ -2,7 +2,7 @@
 Interfaces (Protocols) seguindo o princípio de Interface Segregation (SOLID).
 """
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from typing import BinaryIO, Dict, List, Any, Optional
 from datetime import datetime
 
 
@@ -38,8 +38,9 @@ class IDatabaseManager(ABC):
     """Interface para gerenciador de banco de dados."""
     
     @abstractmethod
-    def create_table(self, table_name: str, schema: Dict[str, str]) -> bool:
-        """Cria uma tabela no banco de dados."""
+    def create_table(self, table_name: str, schema: Dict[str, str],
+                     indexes: Optional[Dict[str, List[str]]] = None) -> bool:
+        """Cria uma tabela no banco de dados (indexes: nome do índice -> colunas)."""
         pass
     
     @abstractmethod
@@ -74,3 +75,65 @@ class IMetricsCollector(ABC):
     def get_metrics(self) -> Dict[str, Any]:
         """Retorna todas as métricas coletadas."""
         pass
+
+
+class IObjectStore(ABC):
+    """
+    Interface para armazenamento de objetos do lake (chaves "bronze/tabela/arquivo.parquet").
+    Implementações: diretório local e bucket GCS (src.lake.storage).
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        """Grava o objeto inteiro (substitui se existir)."""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        """Lê o objeto inteiro (FileNotFoundError se não existir)."""
+        pass
+
+    @abstractmethod
+    def get_range(self, key: str, start: int, length: int) -> bytes:
+        """Lê length bytes a partir de start."""
+        pass
+
+    @abstractmethod
+    def size(self, key: str) -> Optional[int]:
+        """Tamanho em bytes (None se não existir)."""
+        pass
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> List[str]:
+        """Chaves sob o prefixo (recursivo), em ordem."""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove o objeto (sem erro se não existir)."""
+        pass
+
+    @abstractmethod
+    def open_writer(self, key: str) -> BinaryIO:
+        """
+        Arquivo binário para gravação em streaming; o objeto só aparece, inteiro,
+        quando o arquivo é fechado sem erro (use com with). abort() descarta a gravação.
+        """
+        pass
+
+    @abstractmethod
+    def open_reader(self, key: str) -> BinaryIO:
+        """Arquivo binário com seek (leituras por faixa; o PyArrow lê só rodapé e row groups)."""
+        pass
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    def put_file(self, key: str, path: str) -> None:
+        """Envia um arquivo local em streaming."""
+        with open(path, "rb") as src, self.open_writer(key) as dst:
+            while True:
+                chunk = src.read(8 * 1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
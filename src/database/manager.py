@@ -1,19 +1,63 @@
 """
 Gerenciador de banco de dados MySQL com pool de conexões.
+Cargas grandes usam LOAD DATA LOCAL INFILE (TSV temporário -> tabela staging -> merge/troca);
+INSERT em lote continua como fallback quando local_infile está desativado.
 """
+import os
+import stat
+import itertools
+import tempfile
 import mysql.connector
 from mysql.connector import pooling, Error
-from typing import Dict, List, Any, Optional
+from typing import Container, Dict, List, Any, Iterable, Iterator, Optional
 from contextlib import contextmanager
 import logging
-import json
 from src.core.interfaces import IDatabaseManager
 from src.config import DatabaseSettings
+from src.utils import json_codec
+from src.pipeline.columnar import read_load_data_csv, write_load_data_csv
+from src.utils.row_hash import (
+    DELETED_AT_COLUMN, DELETED_AT_SQL_TYPE, ROW_HASH_COLUMN, ROW_HASH_SQL_TYPE, ChangeSet, classify_changes, content_columns, normalize_key, row_hash,
+)
 
 logger = logging.getLogger(__name__)
 
-# Tamanho do lote para insert (evita exceder max_allowed_packet do MySQL)
-INSERT_BATCH_SIZE = 500
+# Lotes de INSERT são dimensionados por bytes contra o max_allowed_packet do servidor:
+# usa só esta fração do limite (folga para escapes do conector e cláusula ON DUPLICATE KEY)
+PACKET_FILL_RATIO = 0.75
+# Usado se não for possível ler @@max_allowed_packet (padrão do MySQL 5.7)
+DEFAULT_MAX_ALLOWED_PACKET = 4 * 1024 * 1024
+# Bytes extras por valor/linha no SQL gerado: aspas, vírgulas, parênteses
+_VALUE_OVERHEAD = 3
+_ROW_OVERHEAD = 4
+
+# Escape de campos para LOAD DATA (FIELDS TERMINATED BY '\t' ESCAPED BY '\\')
+_TSV_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\0": "\\0",
+})
+_TSV_NULL = "\\N"
+_TSV_FIELDS = "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n'"
+# CSV gerado pelo pyarrow (src.pipeline.columnar): campos entre aspas, aspas dobradas, NULL sem aspas
+_CSV_FIELDS = "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' LINES TERMINATED BY '\\n'"
+
+
+def local_infile_dir() -> str:
+    """
+    Único diretório de onde o cliente aceita enviar arquivos no LOAD DATA LOCAL INFILE
+    (allow_local_infile_in_path): pasta só do usuário (0700) no temporário do sistema, onde os
+    TSV/CSV da carga são criados. Um servidor (ou proxy) malicioso não consegue pedir outros arquivos.
+    """
+    usuario = str(os.getuid()) if hasattr(os, "getuid") else "user"
+    directory = os.path.join(tempfile.gettempdir(), f"omie_load_{usuario}")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or (hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o077)):
+        raise PermissionError(f"diretório de carga inseguro: {directory}")
+    return directory
 
 
 class DatabaseManager(IDatabaseManager):
@@ -43,6 +87,8 @@ class DatabaseManager(IDatabaseManager):
             settings = Settings().database
         
         self.settings = settings
+        # Colunas de conteúdo (hash) por tabela, lidas uma vez por carga em get_row_hashes
+        self._change_columns: Dict[str, List[str]] = {}
         
         if self._pool is None:
             self._create_pool()
@@ -61,8 +107,11 @@ class DatabaseManager(IDatabaseManager):
                 "pool_reset_session": True,
                 "autocommit": False,
                 "charset": "utf8mb4",
-                "collation": "utf8mb4_unicode_ci"
+                "collation": "utf8mb4_unicode_ci",
             }
+            if self.settings.DB_LOCAL_INFILE:
+                # LOCAL INFILE restrito à pasta dos arquivos de carga (nunca allow_local_infile=True)
+                config["allow_local_infile_in_path"] = local_infile_dir()
             
             self._pool = pooling.MySQLConnectionPool(**config)
             logger.info("Pool de conexões criado com sucesso")
@@ -122,19 +171,23 @@ class DatabaseManager(IDatabaseManager):
             logger.error(f"Erro ao criar banco de dados: {str(e)}")
             raise
     
-    def create_table(self, table_name: str, schema: Dict[str, str]) -> bool:
+    def create_table(self, table_name: str, schema: Dict[str, str],
+                     indexes: Optional[Dict[str, List[str]]] = None) -> bool:
         """
         Cria uma tabela no banco de dados.
         
         Args:
             table_name: Nome da tabela
             schema: Dicionário com nome da coluna e tipo SQL
+            indexes: Índices secundários (nome -> colunas), criados junto com a tabela
             
         Returns:
             True se criada com sucesso
         """
         try:
             columns = ", ".join([f"{col} {type_def}" for col, type_def in schema.items()])
+            for index_name, index_columns in (indexes or {}).items():
+                columns += f", INDEX {index_name} ({', '.join(index_columns)})"
             query = f"CREATE TABLE IF NOT EXISTS {table_name} ({columns}) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci"
             
             with self.get_connection() as conn:
@@ -149,7 +202,9 @@ class DatabaseManager(IDatabaseManager):
             logger.error(f"Erro ao criar tabela '{table_name}': {str(e)}")
             return False
     
-    def _flatten_dict(self, d: Dict[str, Any], parent_key: str = '', sep: str = '_') -> Dict[str, Any]:
+    def _flatten_dict(
+        self, d: Dict[str, Any], parent_key: str = '', sep: str = '_', columns: Optional[Container[str]] = None
+    ) -> Dict[str, Any]:
         """
         Achata um dicionário aninhado.
         
@@ -157,6 +212,7 @@ class DatabaseManager(IDatabaseManager):
             d: Dicionário a ser achatado
             parent_key: Chave pai (para recursão)
             sep: Separador para chaves aninhadas
+            columns: Colunas de destino; listas sem coluna correspondente não são serializadas
             
         Returns:
             Dicionário achatado
@@ -167,10 +223,11 @@ class DatabaseManager(IDatabaseManager):
             
             if isinstance(v, dict):
                 # Se é um dict, achata recursivamente
-                items.extend(self._flatten_dict(v, new_key, sep=sep).items())
+                items.extend(self._flatten_dict(v, new_key, sep=sep, columns=columns).items())
             elif isinstance(v, list):
-                # Se é uma lista, converte para JSON string
-                items.append((new_key, json.dumps(v, ensure_ascii=False) if v else None))
+                # Se é uma lista, converte para JSON string (só se a coluna existir)
+                if columns is None or new_key in columns:
+                    items.append((new_key, json_codec.dumps(v) if v else None))
             else:
                 items.append((new_key, v))
         
@@ -188,17 +245,56 @@ class DatabaseManager(IDatabaseManager):
             Valor preparado para MySQL
         """
         if isinstance(value, dict):
-            return json.dumps(value, ensure_ascii=False)
+            return json_codec.dumps(value)
         elif isinstance(value, list):
-            return json.dumps(value, ensure_ascii=False) if value else None
+            return json_codec.dumps(value) if value else None
         elif value is None:
             return None
         else:
             return value
     
+    def _max_allowed_packet(self, cursor) -> int:
+        """Lê @@max_allowed_packet do servidor uma vez (resultado em cache)."""
+        if getattr(self, "_max_packet", None) is None:
+            try:
+                cursor.execute("SELECT @@max_allowed_packet")
+                row = cursor.fetchone()
+                self._max_packet = int(row[0]) if row and row[0] else DEFAULT_MAX_ALLOWED_PACKET
+            except Error as e:
+                logger.warning(f"Não foi possível ler max_allowed_packet ({e}); usando {DEFAULT_MAX_ALLOWED_PACKET}")
+                self._max_packet = DEFAULT_MAX_ALLOWED_PACKET
+        return self._max_packet
+
+    @staticmethod
+    def _encoded_row_size(row: List[Any]) -> int:
+        """Estimativa do tamanho em bytes da linha no INSERT multi-linha."""
+        size = _ROW_OVERHEAD
+        for v in row:
+            if v is None:
+                size += 4 + _VALUE_OVERHEAD
+            elif isinstance(v, str):
+                size += len(v.encode("utf-8")) + _VALUE_OVERHEAD
+            else:
+                size += len(str(v)) + _VALUE_OVERHEAD
+        return size
+
+    def _packet_chunks(self, rows: List[List[Any]], budget: int):
+        """Agrupa linhas em lotes cujo tamanho codificado cabe no orçamento de bytes."""
+        chunk, chunk_size = [], 0
+        for row in rows:
+            row_size = self._encoded_row_size(row)
+            if chunk and chunk_size + row_size > budget:
+                yield chunk
+                chunk, chunk_size = [], 0
+            chunk.append(row)
+            chunk_size += row_size
+        if chunk:
+            yield chunk
+
     def insert_batch(self, table_name: str, data: List[Dict[str, Any]]) -> int:
         """
-        Insere dados em lote usando executemany para melhor performance.
+        Insere dados em lote (INSERT multi-linha via executemany) com lotes dimensionados
+        pelo max_allowed_packet do servidor.
         Trata dados aninhados convertendo para JSON ou achatando.
         
         Args:
@@ -219,12 +315,13 @@ class DatabaseManager(IDatabaseManager):
                 # Obtém as colunas da tabela
                 cursor.execute(f"DESCRIBE {table_name}")
                 columns = [row[0] for row in cursor.fetchall()]
+                column_set = set(columns)
                 
                 # Filtra e prepara os dados
                 filtered_data = []
                 for record in data:
                     # Achata dicionários aninhados
-                    flattened = self._flatten_dict(record)
+                    flattened = self._flatten_dict(record, columns=column_set)
                     
                     # Filtra apenas colunas válidas e prepara valores
                     filtered_record = {}
@@ -261,12 +358,13 @@ class DatabaseManager(IDatabaseManager):
                     ON DUPLICATE KEY UPDATE {update_clause}
                 """
                 
-                # Prepara os valores e insere em lotes (evita max_allowed_packet)
+                # Insere em INSERTs multi-linha dimensionados por bytes (não estoura max_allowed_packet
+                # em tabelas com TEXT largo nem desperdiça round trips em tabelas estreitas)
+                values = [[record.get(col) for col in columns_to_insert] for record in filtered_data]
+                budget = int(self._max_allowed_packet(cursor) * PACKET_FILL_RATIO) - len(query)
                 affected_rows = 0
-                for i in range(0, len(filtered_data), INSERT_BATCH_SIZE):
-                    chunk = filtered_data[i : i + INSERT_BATCH_SIZE]
-                    values = [[record.get(col) for col in columns_to_insert] for record in chunk]
-                    cursor.executemany(query, values)
+                for chunk in self._packet_chunks(values, budget):
+                    cursor.executemany(query, chunk)
                     affected_rows += cursor.rowcount
                 
                 cursor.close()
@@ -278,6 +376,255 @@ class DatabaseManager(IDatabaseManager):
             logger.error(f"Erro ao inserir dados na tabela '{table_name}': {str(e)}")
             raise
 
+    def _tsv_field(self, value: Any) -> str:
+        """Codifica um valor já preparado como campo TSV do LOAD DATA (NULL -> \\N)."""
+        if value is None:
+            return _TSV_NULL
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        return str(value).translate(_TSV_ESCAPES)
+
+    def _write_tsv(self, path: str, data: List[Dict[str, Any]], columns: List[str]) -> int:
+        """Grava os registros (achatados e preparados) em TSV, linha a linha. Retorna linhas gravadas."""
+        count = 0
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            column_set = set(columns)
+            for record in data:
+                flattened = self._flatten_dict(record, columns=column_set)
+                f.write("\t".join(self._tsv_field(self._prepare_value(flattened.get(col))) for col in columns))
+                f.write("\n")
+                count += 1
+        return count
+
+    def supports_local_infile(self) -> bool:
+        """True se o cliente e o servidor permitem LOAD DATA LOCAL INFILE (resultado em cache)."""
+        if not self.settings.DB_LOCAL_INFILE:
+            return False
+        if getattr(self, "_local_infile", None) is None:
+            try:
+                rows = self.execute_query("SHOW GLOBAL VARIABLES LIKE 'local_infile'")
+                value = str(rows[0]["Value"]).upper() if rows else "OFF"
+                self._local_infile = value in ("ON", "1")
+            except Exception as e:
+                logger.warning(f"Não foi possível verificar local_infile: {e}")
+                self._local_infile = False
+            if not self._local_infile:
+                logger.info("local_infile desativado no servidor; cargas usam INSERT em lote")
+        return self._local_infile
+
+    def _load_staged_file(
+        self, cursor, table_name: str, path: str, columns: List[str], table_columns: List[str],
+        fields_clause: str, replace: bool,
+    ) -> int:
+        """
+        LOAD DATA LOCAL INFILE do arquivo numa tabela staging e troca (replace=True, RENAME atômico)
+        ou merge (INSERT ... SELECT ... ON DUPLICATE KEY UPDATE) na tabela final.
+        """
+        staging = f"{table_name}__stg"
+        cols_str = ", ".join(f"`{c}`" for c in columns)
+        cursor.execute(f"DROP TABLE IF EXISTS `{staging}`")
+        cursor.execute(f"CREATE TABLE `{staging}` LIKE `{table_name}`")
+        load_path = path.replace("\\", "/").replace("'", "\\'")
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE '{load_path}' INTO TABLE `{staging}` "
+            f"CHARACTER SET utf8mb4 {fields_clause} ({cols_str})"
+        )
+        loaded = cursor.rowcount
+
+        if replace:
+            self._swap_staging(cursor, table_name, staging)
+        else:
+            update_clause = ", ".join(
+                f"`{col}` = VALUES(`{col}`)"
+                for col in columns
+                if col not in ["id", "created_at", "updated_at"]
+            )
+            if "updated_at" in table_columns:
+                update_clause = (update_clause + ", " if update_clause else "") + "updated_at = CURRENT_TIMESTAMP"
+            cursor.execute(
+                f"INSERT INTO `{table_name}` ({cols_str}) "
+                f"SELECT {cols_str} FROM `{staging}` "
+                f"ON DUPLICATE KEY UPDATE {update_clause}"
+            )
+            cursor.execute(f"DROP TABLE `{staging}`")
+        return loaded
+
+    @staticmethod
+    def _swap_staging(cursor, table_name: str, staging: str):
+        """Troca atômica: leitores veem a tabela antiga até o RENAME."""
+        old = f"{table_name}__old"
+        cursor.execute(f"DROP TABLE IF EXISTS `{old}`")
+        cursor.execute(
+            f"RENAME TABLE `{table_name}` TO `{old}`, `{staging}` TO `{table_name}`"
+        )
+        cursor.execute(f"DROP TABLE `{old}`")
+
+    def begin_staging(self, table_name: str) -> str:
+        """
+        Cria a tabela staging vazia (mesma estrutura da final) para um full refresh em streaming:
+        as páginas são gravadas nela e commit_staging() troca as tabelas só no fim, com sucesso.
+        """
+        staging = f"{table_name}__stg"
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS `{staging}`")
+            cursor.execute(f"CREATE TABLE `{staging}` LIKE `{table_name}`")
+            cursor.close()
+        return staging
+
+    def commit_staging(self, table_name: str, staging: str):
+        """Troca a tabela final pela staging (RENAME atômico)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._swap_staging(cursor, table_name, staging)
+            cursor.close()
+        logger.info(f"Tabela MySQL '{table_name}' substituída pela carga em '{staging}'")
+
+    def abort_staging(self, staging: str):
+        """Descarta a staging de uma carga que falhou (a tabela final fica intacta)."""
+        self._drop_quietly(staging)
+
+    def bulk_load(self, table_name: str, data: List[Dict[str, Any]], replace: bool = False) -> int:
+        """
+        Carga em massa: grava TSV temporário, LOAD DATA LOCAL INFILE numa tabela staging
+        e depois troca (replace=True, full refresh atômico via RENAME) ou faz merge
+        (INSERT ... SELECT ... ON DUPLICATE KEY UPDATE) na tabela final.
+        Usa insert_batch (com TRUNCATE antes, se replace) quando o lote é pequeno
+        ou local_infile está desativado.
+        
+        Args:
+            table_name: Nome da tabela
+            data: Lista de dicionários com os dados
+            replace: Se True, substitui todo o conteúdo da tabela
+            
+        Returns:
+            Número de registros carregados
+        """
+        if not data:
+            if replace:
+                self.truncate_table(table_name)
+            return 0
+        if len(data) < self.settings.DB_BULK_LOAD_MIN_ROWS or not self.supports_local_infile():
+            return self._fallback_load(table_name, data, replace)
+
+        staging = f"{table_name}__stg"
+        fd, tsv_path = tempfile.mkstemp(suffix=".tsv", prefix=f"{table_name}-", dir=local_infile_dir())
+        os.close(fd)
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"DESCRIBE `{table_name}`")
+                table_columns = [row[0] for row in cursor.fetchall()]
+                present = set()
+                table_column_set = set(table_columns)
+                for record in data:
+                    present.update(self._flatten_dict(record, columns=table_column_set).keys())
+                columns = [c for c in table_columns if c in present]
+                if not columns:
+                    logger.warning(f"Nenhum dado válido para inserir na tabela '{table_name}'")
+                    cursor.close()
+                    return 0
+
+                self._write_tsv(tsv_path, data, columns)
+                loaded = self._load_staged_file(
+                    cursor, table_name, tsv_path, columns, table_columns, _TSV_FIELDS, replace
+                )
+                cursor.close()
+
+            logger.info(
+                f"LOAD DATA: {loaded} registros carregados na tabela '{table_name}' "
+                f"({'troca completa' if replace else 'merge'})"
+            )
+            return loaded
+        except Error as e:
+            logger.warning(f"LOAD DATA em '{table_name}' falhou ({e}); usando INSERT em lote")
+            self._drop_quietly(staging)
+            if e.errno in (1148, 2068, 3948):  # local_infile recusado pelo cliente/servidor
+                self._local_infile = False
+            return self._fallback_load(table_name, data, replace)
+        finally:
+            if os.path.exists(tsv_path):
+                os.unlink(tsv_path)
+
+    def _fallback_load(self, table_name: str, data: List[Dict[str, Any]], replace: bool) -> int:
+        """Carga via INSERT em lote (caminho usado quando LOAD DATA não se aplica)."""
+        if replace:
+            self.truncate_table(table_name)
+        return self.insert_batch(table_name, data)
+
+    def load_arrow(self, table_name: str, batches: Iterable[Any], replace: bool = False) -> int:
+        """
+        Carga de RecordBatches Arrow (src.pipeline.columnar): os lotes são gravados em CSV pelo
+        pyarrow e vão direto para LOAD DATA, sem dict por linha. Sem local_infile (ou se o
+        LOAD DATA falhar), cai para INSERT em lote a partir dos lotes.
+        
+        Args:
+            table_name: Nome da tabela
+            batches: Iterável de pyarrow.RecordBatch com o mesmo schema
+            replace: Se True, substitui todo o conteúdo da tabela
+            
+        Returns:
+            Número de registros carregados
+        """
+        batches = iter(batches)
+        first = next(batches, None)
+        if first is None:
+            # Coleta vazia não apaga a tabela (mesmo comportamento do caminho por dicts)
+            return 0
+        batches = itertools.chain([first], batches)
+        if not self.supports_local_infile():
+            return self._fallback_load_arrow(table_name, batches, replace)
+
+        table_columns = self._table_columns(table_name)
+        schema = first.schema
+        keep = [name for name in schema.names if name in table_columns]
+        if len(keep) != len(schema.names):
+            # Colunas do lote que a tabela não tem ficam de fora
+            batches = (b.select(keep) for b in batches)
+            schema = first.select(keep).schema
+        staging = f"{table_name}__stg"
+        fd, csv_path = tempfile.mkstemp(suffix=".csv", prefix=f"{table_name}-", dir=local_infile_dir())
+        os.close(fd)
+        try:
+            write_load_data_csv(batches, csv_path, schema)
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    loaded = self._load_staged_file(
+                        cursor, table_name, csv_path, keep, table_columns, _CSV_FIELDS, replace
+                    )
+                    cursor.close()
+            except Error as e:
+                logger.warning(f"LOAD DATA em '{table_name}' falhou ({e}); usando INSERT em lote")
+                self._drop_quietly(staging)
+                if e.errno in (1148, 2068, 3948):  # local_infile recusado pelo cliente/servidor
+                    self._local_infile = False
+                table = read_load_data_csv(csv_path, schema)
+                return self._fallback_load_arrow(table_name, table.to_batches(), replace)
+            logger.info(
+                f"LOAD DATA (Arrow): {loaded} registros carregados na tabela '{table_name}' "
+                f"({'troca completa' if replace else 'merge'})"
+            )
+            return loaded
+        finally:
+            if os.path.exists(csv_path):
+                os.unlink(csv_path)
+
+    def _fallback_load_arrow(self, table_name: str, batches: Iterable[Any], replace: bool) -> int:
+        """INSERT em lote a partir de RecordBatches (um lote por vez na memória)."""
+        if replace:
+            self.truncate_table(table_name)
+        return sum(self.insert_batch(table_name, batch.to_pylist()) for batch in batches)
+
+    def _drop_quietly(self, table_name: str):
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"DROP TABLE IF EXISTS `{table_name}`")
+                cursor.close()
+        except Error:
+            pass
+
     def truncate_table(self, table_name: str) -> bool:
         """Esvazia a tabela antes da carga (full refresh, evita duplicação)."""
         try:
@@ -310,16 +657,238 @@ class DatabaseManager(IDatabaseManager):
             logger.warning(f"Erro ao buscar chaves existentes em '{table_name}': {e}")
             return set()
 
+    def iter_keys(self, table_name: str, key_columns: List[str], batch_size: int = 50000) -> Iterator[List[Any]]:
+        """Lê as chaves normalizadas da tabela em lotes (cursor sem buffer; não materializa a tabela)."""
+        cols = ", ".join(f"`{c}`" for c in key_columns)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(buffered=False)
+            cursor.execute(f"SELECT {cols} FROM `{table_name}`")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                keys = (normalize_key([self._prepare_value(v) for v in row]) for row in rows)
+                yield [k for k in keys if k is not None]
+            cursor.close()
+
+    def table_token(self, table_name: str, key_columns: List[str]) -> Optional[str]:
+        """
+        Token barato do conteúdo da tabela (contagem + maior valor de cada coluna da chave) para
+        validar o índice local de chaves; muda se a tabela for esvaziada ou recarregada. None se falhar.
+        """
+        maxes = ", ".join(f"MAX(`{c}`)" for c in key_columns)
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT COUNT(*), {maxes} FROM `{table_name}`")
+                row = cursor.fetchone()
+                cursor.close()
+            return "|".join(str(v) for v in row)
+        except Error as e:
+            logger.warning(f"Não foi possível ler o token de '{table_name}': {e}")
+            return None
+
     def get_key_from_record(self, record: Dict[str, Any], key_columns: List[str]) -> Any:
         """Extrai a chave do registro (mesmo flatten que o insert usa). Para comparar com get_existing_keys."""
         if not key_columns:
             return None
-        flat = self._flatten_dict(record)
+        flat = self._flatten_dict(record, columns=key_columns)
         vals = [self._prepare_value(flat.get(c)) for c in key_columns]
         if len(key_columns) == 1:
             return vals[0]
         return tuple(vals)
 
+    def _table_columns(self, table_name: str) -> List[str]:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"DESCRIBE `{table_name}`")
+            columns = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        return columns
+
+    def _ensure_column(self, table_name: str, column: str, type_def: str) -> bool:
+        """Adiciona a coluna (NULL) se a tabela foi criada antes dela existir no schema."""
+        try:
+            if column in self._table_columns(table_name):
+                return True
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"ALTER TABLE `{table_name}` ADD COLUMN `{column}` {type_def} NULL")
+                cursor.close()
+            logger.info(f"Coluna '{column}' adicionada à tabela '{table_name}'")
+            return True
+        except Error as e:
+            logger.warning(f"Não foi possível adicionar '{column}' em '{table_name}': {e}")
+            return False
+
+    def ensure_row_hash_column(self, table_name: str) -> bool:
+        """Adiciona a coluna _row_hash em tabelas criadas antes da detecção de mudanças."""
+        return self._ensure_column(table_name, ROW_HASH_COLUMN, ROW_HASH_SQL_TYPE)
+
+    def ensure_deleted_at_column(self, table_name: str) -> bool:
+        """Adiciona a coluna deleted_at (exclusão lógica) em tabelas criadas antes dela."""
+        return self._ensure_column(table_name, DELETED_AT_COLUMN, DELETED_AT_SQL_TYPE)
+
+    def get_row_hashes(self, table_name: str, key_columns: List[str]) -> Dict[Any, Optional[str]]:
+        """
+        Retorna chave -> _row_hash de todas as linhas da tabela.
+        Linhas ainda sem hash ou marcadas como excluídas (deleted_at) vêm com None,
+        para que reapareçam como alteradas e sejam reativadas.
+        """
+        if not key_columns or not self.ensure_row_hash_column(table_name):
+            return {}
+        table_columns = self._table_columns(table_name)
+        self._change_columns[table_name] = content_columns(table_columns)
+        cols = ", ".join(f"`{c}`" for c in key_columns)
+        hash_expr = f"`{ROW_HASH_COLUMN}`"
+        if DELETED_AT_COLUMN in table_columns:
+            hash_expr = f"CASE WHEN `{DELETED_AT_COLUMN}` IS NULL THEN `{ROW_HASH_COLUMN}` END AS `{ROW_HASH_COLUMN}`"
+        rows = self.execute_query(f"SELECT {cols}, {hash_expr} FROM `{table_name}`")
+        hashes = {}
+        for r in rows:
+            key = normalize_key([self._prepare_value(r.get(c)) for c in key_columns])
+            if key is not None:
+                hashes[key] = r.get(ROW_HASH_COLUMN)
+        return hashes
+
+    def get_active_keys(self, table_name: str, key_columns: List[str]) -> List[Any]:
+        """Chaves normalizadas das linhas não excluídas (deleted_at IS NULL)."""
+        if not key_columns or not self.ensure_deleted_at_column(table_name):
+            return []
+        cols = ", ".join(f"`{c}`" for c in key_columns)
+        rows = self.execute_query(f"SELECT {cols} FROM `{table_name}` WHERE `{DELETED_AT_COLUMN}` IS NULL")
+        keys = (normalize_key([self._prepare_value(r.get(c)) for c in key_columns]) for r in rows)
+        return [k for k in keys if k is not None]
+
+    def change_key(self, record: Dict[str, Any], key_columns: List[str]) -> Any:
+        """Chave normalizada do registro (comparável com get_row_hashes)."""
+        flat = self._flatten_dict(record, columns=key_columns)
+        return normalize_key([self._prepare_value(flat.get(c)) for c in key_columns])
+
+    def hash_record(self, record: Dict[str, Any], columns: List[str]) -> str:
+        """Hash do registro codificado como no INSERT (mesmo flatten/prepare), nas colunas de conteúdo."""
+        flat = self._flatten_dict(record, columns=columns)
+        return row_hash(self._prepare_value(flat.get(c)) for c in columns)
+
+    def classify_changes(
+        self, table_name: str, data: List[Dict[str, Any]], key_columns: List[str], stored: Dict[Any, Optional[str]]
+    ) -> ChangeSet:
+        """Compara o lote com os hashes gravados (stored) e separa inserções, alterações e inalterados."""
+        columns = self._change_columns.get(table_name)
+        if columns is None:
+            columns = self._change_columns[table_name] = content_columns(self._table_columns(table_name))
+        return classify_changes(
+            data, stored,
+            key_fn=lambda r: self.change_key(r, key_columns),
+            hash_fn=lambda r: self.hash_record(r, columns),
+        )
+
+    def update_rows(self, table_name: str, data: List[Dict[str, Any]], key_columns: List[str]) -> int:
+        """
+        UPDATE por chave (não depende de índice único nas colunas-chave).
+        Só as linhas recebidas são reescritas; updated_at é atualizado e deleted_at limpo nelas.
+        """
+        if not data:
+            return 0
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"DESCRIBE `{table_name}`")
+                table_columns = [row[0] for row in cursor.fetchall()]
+                table_column_set = set(table_columns)
+                flat_data = [self._flatten_dict(r, columns=table_column_set) for r in data]
+                present = set()
+                for flat in flat_data:
+                    present.update(flat.keys())
+                set_columns = [
+                    c for c in table_columns
+                    if c in present and c not in key_columns and c not in ["id", "created_at", "updated_at"]
+                ]
+                if not set_columns:
+                    cursor.close()
+                    return 0
+                set_clause = ", ".join(f"`{c}` = %s" for c in set_columns)
+                if "updated_at" in table_columns:
+                    set_clause += ", updated_at = CURRENT_TIMESTAMP"
+                if DELETED_AT_COLUMN in table_columns:
+                    # Registro voltou a aparecer na origem: reativa
+                    set_clause += f", `{DELETED_AT_COLUMN}` = NULL"
+                where = " AND ".join(f"`{c}` = %s" for c in key_columns)
+                query = f"UPDATE `{table_name}` SET {set_clause} WHERE {where}"
+                values = [
+                    [self._prepare_value(flat.get(c)) for c in set_columns + key_columns]
+                    for flat in flat_data
+                ]
+                budget = int(self._max_allowed_packet(cursor) * PACKET_FILL_RATIO)
+                updated = 0
+                for chunk in self._packet_chunks(values, budget):
+                    cursor.executemany(query, chunk)
+                    updated += cursor.rowcount
+                cursor.close()
+            logger.info(f"Atualizados {updated} registros na tabela '{table_name}'")
+            return updated
+        except Error as e:
+            logger.error(f"Erro ao atualizar dados na tabela '{table_name}': {str(e)}")
+            raise
+
+    def mark_deleted(self, table_name: str, key_columns: List[str], keys: List[Any]) -> int:
+        """Exclusão lógica: grava deleted_at nas linhas das chaves informadas (as já excluídas não mudam)."""
+        if not keys or not key_columns or not self.ensure_deleted_at_column(table_name):
+            return 0
+        where = " AND ".join(f"`{c}` = %s" for c in key_columns)
+        values = [[k] if len(key_columns) == 1 else list(k) for k in keys]
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                f"UPDATE `{table_name}` SET `{DELETED_AT_COLUMN}` = CURRENT_TIMESTAMP "
+                f"WHERE {where} AND `{DELETED_AT_COLUMN}` IS NULL",
+                values,
+            )
+            marked = cursor.rowcount
+            cursor.close()
+        logger.info(f"Marcados {marked} registros como excluídos na origem na tabela '{table_name}'")
+        return marked
+
+    def write_changes(
+        self, table_name: str, inserts: List[Dict[str, Any]], updates: List[Dict[str, Any]], key_columns: List[str]
+    ) -> int:
+        """Grava só as linhas novas (INSERT em lote/LOAD DATA) e as alteradas (UPDATE por chave)."""
+        written = 0
+        if inserts:
+            written += self.bulk_load(table_name, inserts, replace=False)
+        if updates:
+            written += self.update_rows(table_name, updates, key_columns)
+        return written
+
+    def sync_rows(self, table_name: str, data: List[Dict[str, Any]], key_columns: List[str]) -> Dict[str, int]:
+        """
+        Carga com detecção de mudanças: compara o hash de cada registro com _row_hash gravado
+        e escreve apenas inserções e alterações (linhas inalteradas não são tocadas).
+        Linhas ausentes da origem são tratadas à parte (mark_deleted).
+
+        Args:
+            table_name: Nome da tabela
+            data: Lista de dicionários com os dados
+            key_columns: Colunas que identificam a linha
+
+        Returns:
+            Contagens: inserted, updated, unchanged
+        """
+        stored = self.get_row_hashes(table_name, key_columns)
+        changes = self.classify_changes(table_name, data, key_columns, stored)
+        self.write_changes(table_name, changes.inserts, changes.updates, key_columns)
+        stats = {
+            "inserted": len(changes.inserts),
+            "updated": len(changes.updates),
+            "unchanged": changes.unchanged,
+        }
+        logger.info(
+            f"Mudanças em '{table_name}': {stats['inserted']} novos, {stats['updated']} alterados, "
+            f"{stats['unchanged']} inalterados"
+            + (f" ({changes.keyless} sem chave, inseridos sem comparação)" if changes.keyless else "")
+        )
+        return stats
+
     def execute_query(self, query: str, params: Optional[Dict] = None) -> Any:
         """
         Executa uma query SQL.
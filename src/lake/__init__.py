@@ -0,0 +1,23 @@
+"""
+Módulo do data lake (camadas em Parquet).
+"""
+from src.lake.compaction import compact
+from src.lake.manifest import BloomFilter, rebuild_manifests
+from src.lake.pedido_compra import BronzePedidoCompra, gerar_janelas, processar_pedido_compra
+from src.lake.silver import SilverPedidoCompra
+from src.lake.storage import GCSObjectStore, LocalObjectStore, open_store
+from src.lake.writer import StreamingParquetWriter
+
+__all__ = [
+    "BloomFilter",
+    "BronzePedidoCompra",
+    "GCSObjectStore",
+    "LocalObjectStore",
+    "SilverPedidoCompra",
+    "StreamingParquetWriter",
+    "compact",
+    "gerar_janelas",
+    "open_store",
+    "processar_pedido_compra",
+    "rebuild_manifests",
+]
@@ -0,0 +1,289 @@
+"""
+Compactação das partições do bronze: junta as partições diárias (periodo=YYYYMMDD) em
+mensais (periodo=YYYYMM) ou anuais (periodo=YYYY), em arquivos de tamanho alvo, para que
+busca e silver abram poucos arquivos grandes em vez de milhares de Parquet com meia dúzia
+de linhas.
+
+- Dedup por nCodPed, ficando a linha de maior datetime_coleta_dados (na mesma coleta, a
+  com fl_encerrado_cancelado = "T"; depois, o arquivo mais recente na ordem das chaves). Só chave e data são lidas para decidir; depois cada arquivo
+  é relido row group a row group e só as linhas vencedoras são gravadas.
+- A saída é ordenada por nCodPed em row groups de COMPACT_ROW_GROUP_ROWS linhas, com
+  estatísticas min/max estreitas para o lookup. Os diários gravados em streaming têm um row
+  group por página da API, na ordem em que as páginas chegaram (sem poda útil por row
+  group); a compactação é que devolve a ordenação. As linhas vencedoras são gravadas por
+  faixas de chave de até COMPACT_SORT_ROWS linhas (memória limitada às chaves e a uma faixa).
+- O manifesto da partição destino é substituído numa única gravação, depois de todos os
+  arquivos novos existirem; só então os arquivos e manifestos de origem são removidos.
+  Se o processo cair no meio, a partição destino continua válida e as linhas duplicadas
+  somem na próxima compactação (a partição destino também é entrada).
+
+Uso: python -m src.lake.compaction --granularidade mes [--alvo-mb 128] [--root data/lake] [--dry-run]
+"""
+import sys
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.interfaces import IObjectStore
+from src.lake.manifest import KEY_COLUMNS, group_partitions, partition_manifest_key, write_partition_manifest
+from src.lake.pedido_compra import BRONZE_PREFIX
+from src.lake.storage import open_store
+from src.lake.writer import StreamingParquetWriter
+
+try:
+    import pyarrow as pa  # opcional
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pc = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DEDUP_KEY = KEY_COLUMNS[0]
+# Ordem de "última escrita" entre linhas da mesma chave (a primeira fica)
+DEDUP_ORDER = (("datetime_coleta_dados", "descending"), ("fl_encerrado_cancelado", "descending"))
+# Linhas por row group nos arquivos compactados (as páginas dos diários são row groups minúsculos)
+COMPACT_ROW_GROUP_ROWS = 50000
+# Linhas ordenadas em memória por passada (faixa de nCodPed); múltiplo de COMPACT_ROW_GROUP_ROWS
+COMPACT_SORT_ROWS = 10 * COMPACT_ROW_GROUP_ROWS
+# Tamanho do rótulo periodo=... de cada granularidade
+_REF_LEN = {"dia": 8, "mes": 6, "ano": 4}
+
+
+def _periodo(partition_key: str) -> str:
+    return partition_key.rsplit("periodo=", 1)[-1]
+
+
+def plan_compaction(store: IObjectStore, prefix: str, granularidade: str,
+                    alvo_bytes: int) -> List[Dict[str, Any]]:
+    """
+    Grupos a compactar: {"destino", "periodo", "origens" (partições), "arquivos"}.
+    Um grupo entra se tem partições mais finas que a granularidade ou se a partição destino
+    já tem dois ou mais arquivos pequenos (< metade do alvo).
+    """
+    if granularidade not in ("mes", "ano"):
+        raise ValueError(f"Granularidade de compactação inválida: {granularidade} (use mes ou ano)")
+    tamanho = _REF_LEN[granularidade]
+    base = prefix.rstrip("/")
+    grupos: Dict[str, Dict[str, Any]] = {}
+    for partition_key, group in sorted(group_partitions(store.list(base), base).items()):
+        periodo = _periodo(partition_key)
+        if not partition_key or not periodo.isdigit() or len(periodo) < tamanho or not group["arquivos"]:
+            continue
+        referencia = periodo[:tamanho]
+        destino = f"{base}/periodo={referencia}"
+        grupo = grupos.setdefault(destino, {"destino": destino, "periodo": referencia, "origens": [], "arquivos": []})
+        if partition_key != destino:
+            grupo["origens"].append(partition_key)
+        grupo["arquivos"].extend(group["arquivos"])
+    plano = []
+    for grupo in grupos.values():
+        if not grupo["origens"]:
+            pequenos = [k for k in grupo["arquivos"] if (store.size(k) or 0) < alvo_bytes // 2]
+            if len(pequenos) < 2:
+                continue
+        plano.append(grupo)
+    return plano
+
+
+def first_per_key_mask(chaves):
+    """
+    Em chaves já ordenadas, True na primeira linha de cada chave (a vencedora pela ordenação).
+    Linhas com chave nula não têm como ser deduplicadas: ficam todas.
+    """
+    chaves = chaves.combine_chunks() if isinstance(chaves, pa.ChunkedArray) else chaves
+    if len(chaves) == 0:
+        return pa.array([], pa.bool_())
+    novas = pc.fill_null(pc.not_equal(chaves.slice(1), chaves.slice(0, len(chaves) - 1)), True)
+    primeiro = pa.concat_arrays([pa.array([True]), novas])
+    return pc.or_(primeiro, pc.is_null(chaves))
+
+
+def _winner_masks(store: IObjectStore, arquivos: List[str]):
+    """
+    Máscara de linhas mantidas por arquivo (última coleta de cada nCodPed), total de linhas
+    lidas e as chaves vencedoras em ordem crescente (nulas no fim).
+    """
+    partes = []
+    for idx, key in enumerate(arquivos):
+        with store.open_reader(key) as f:
+            parquet = pq.ParquetFile(f)
+            tabela = parquet.read(columns=[DEDUP_KEY, *(c for c, _ in DEDUP_ORDER if c in parquet.schema_arrow.names)])
+        n = tabela.num_rows
+        partes.append(tabela.append_column("_arquivo", pa.repeat(pa.scalar(idx, pa.int32()), n))
+                      .append_column("_linha", pa.array(range(n), pa.int64())))
+    tabela = pa.concat_tables(partes).combine_chunks()
+    ordem = [(c, o) for c, o in DEDUP_ORDER if c in tabela.column_names]
+    ordenada = tabela.sort_by([(DEDUP_KEY, "ascending"), *ordem, ("_arquivo", "descending")])
+    vencedores = ordenada.filter(first_per_key_mask(ordenada.column(DEDUP_KEY)))
+    masks = []
+    for idx, parte in enumerate(partes):
+        linhas = vencedores.filter(pc.equal(vencedores.column("_arquivo"), idx)).column("_linha")
+        masks.append(pc.is_in(parte.column("_linha"), value_set=linhas.combine_chunks()))
+    return masks, tabela.num_rows, vencedores.column(DEDUP_KEY).combine_chunks()
+
+
+def _key_ranges(chaves) -> List[Any]:
+    """
+    Faixas [inicio, fim) de nCodPed com até COMPACT_SORT_ROWS vencedores cada (None = sem
+    limite), mais ("nulos",) se houver linhas sem chave.
+    """
+    validas = chaves.drop_null()
+    limites = [None] + [validas[i].as_py() for i in range(COMPACT_SORT_ROWS, len(validas), COMPACT_SORT_ROWS)] + [None]
+    faixas: List[Any] = list(zip(limites, limites[1:])) if len(validas) else []
+    if chaves.null_count:
+        faixas.append(("nulos",))
+    return faixas
+
+
+def _row_group_in_range(parquet, index: int, faixa) -> bool:
+    """Estatísticas do row group admitem linhas da faixa? (sem estatísticas: sim)"""
+    rg = parquet.metadata.row_group(index)
+    for i in range(rg.num_columns):
+        chunk = rg.column(i)
+        if chunk.path_in_schema != DEDUP_KEY:
+            continue
+        stats = chunk.statistics
+        if len(faixa) == 1:
+            return stats is None or not stats.has_null_count or stats.null_count > 0
+        if stats is None or not stats.has_min_max:
+            return True
+        inicio, fim = faixa
+        return (inicio is None or stats.max >= inicio) and (fim is None or stats.min < fim)
+    return True
+
+
+def _in_range(coluna, faixa):
+    if len(faixa) == 1:
+        return pc.is_null(coluna)
+    inicio, fim = faixa
+    dentro = pc.is_valid(coluna)
+    if inicio is not None:
+        dentro = pc.and_(dentro, pc.greater_equal(coluna, inicio))
+    if fim is not None:
+        dentro = pc.and_(dentro, pc.less(coluna, fim))
+    return pc.fill_null(dentro, False)
+
+
+def _nome_parte(tabela: str, referencia: str, carimbo: str, parte: int) -> str:
+    return f"{tabela}_{referencia}_c{carimbo}_{parte:02d}.parquet"
+
+
+def compact_group(store: IObjectStore, grupo: Dict[str, Any], alvo_bytes: int) -> Dict[str, Any]:
+    """Compacta um grupo (ver plan_compaction) e retorna o resumo."""
+    arquivos = grupo["arquivos"]
+    schemas = []
+    for key in arquivos:
+        with store.open_reader(key) as f:
+            schemas.append(pq.ParquetFile(f).schema_arrow.remove_metadata())
+    schema = schemas[-1]
+    diferentes = [k for k, s in zip(arquivos, schemas) if not s.equals(schema)]
+    if diferentes:
+        # Arquivos de antes do schema tipado: regrave a janela com o coletor antes de compactar
+        logger.warning(f"Compactação de {grupo['destino']} ignorada: schema diferente em {', '.join(diferentes)}")
+        return {**_resumo(grupo), "ignorado": True}
+    masks, lidos, chaves = _winner_masks(store, arquivos)
+    mantidos = len(chaves)
+
+    tabela = grupo["destino"].rsplit("/", 2)[-2]
+    carimbo = datetime.now().strftime("%Y%m%d%H%M%S")
+    entradas: List[Dict[str, Any]] = []
+    writer: Optional[StreamingParquetWriter] = None
+
+    def gravar(ordenada):
+        nonlocal writer
+        for batch in ordenada.combine_chunks().to_batches(max_chunksize=COMPACT_ROW_GROUP_ROWS):
+            if writer is None:
+                writer = StreamingParquetWriter(
+                    store, f"{grupo['destino']}/{_nome_parte(tabela, grupo['periodo'], carimbo, len(entradas))}", schema
+                )
+            writer.write_batch(batch)
+            if writer.bytes_written >= alvo_bytes:
+                entradas.append(writer.close(update_manifest=False))
+                writer = None
+
+    try:
+        for faixa in _key_ranges(chaves):
+            partes = []
+            for key, mask in zip(arquivos, masks):
+                with store.open_reader(key) as f:
+                    parquet = pq.ParquetFile(f)
+                    inicio = 0
+                    for rg in range(parquet.metadata.num_row_groups):
+                        n = parquet.metadata.row_group(rg).num_rows
+                        if _row_group_in_range(parquet, rg, faixa):
+                            dados = parquet.read_row_group(rg).replace_schema_metadata(None)
+                            selecao = pc.and_(mask.slice(inicio, n), _in_range(dados.column(DEDUP_KEY), faixa))
+                            parte = dados.filter(selecao)
+                            if parte.num_rows:
+                                partes.append(parte)
+                        inicio += n
+            if partes:
+                gravar(pa.concat_tables(partes).sort_by([(DEDUP_KEY, "ascending")]))
+        if writer is not None:
+            entradas.append(writer.close(update_manifest=False))
+            writer = None
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        for entrada in entradas:
+            store.delete(f"{grupo['destino']}/{entrada['arquivo']}")
+        raise
+
+    # Troca atômica para o leitor: o manifesto destino passa a listar só os arquivos novos
+    write_partition_manifest(store, grupo["destino"], entradas)
+    novos = {f"{grupo['destino']}/{e['arquivo']}" for e in entradas}
+    for key in arquivos:
+        if key not in novos:
+            store.delete(key)
+    for origem in grupo["origens"]:
+        store.delete(partition_manifest_key(origem))
+    logger.info(
+        f"Compactado {grupo['destino']}: {len(arquivos)} arquivos -> {len(entradas)}, "
+        f"{lidos} linhas -> {mantidos} (dedup por {DEDUP_KEY})"
+    )
+    return {**_resumo(grupo), "arquivos_novos": len(entradas), "linhas_lidas": lidos, "linhas_mantidas": mantidos}
+
+
+def _resumo(grupo: Dict[str, Any]) -> Dict[str, Any]:
+    return {"destino": grupo["destino"], "origens": len(grupo["origens"]), "arquivos": len(grupo["arquivos"])}
+
+
+def compact(store: IObjectStore, prefix: str = BRONZE_PREFIX, granularidade: str = "mes",
+            alvo_bytes: int = 128 * 1024 * 1024, dry_run: bool = False) -> List[Dict[str, Any]]:
+    """Compacta todas as partições de uma tabela do lake na granularidade pedida."""
+    if pq is None:
+        raise RuntimeError("pyarrow não instalado: compactação do lake exige pyarrow")
+    plano = plan_compaction(store, prefix, granularidade, alvo_bytes)
+    logger.info(f"Compactação {prefix} ({granularidade}): {len(plano)} partições destino")
+    if dry_run:
+        return [_resumo(g) for g in plano]
+    return [compact_group(store, grupo, alvo_bytes) for grupo in plano]
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    from src.config import Settings
+
+    settings = Settings()
+    parser = argparse.ArgumentParser(description="Compacta partições diárias do lake em mensais/anuais")
+    parser.add_argument("--granularidade", default="mes", choices=("mes", "ano"))
+    parser.add_argument("--prefixo", default=BRONZE_PREFIX, help="Tabela do lake (prefixo das partições)")
+    parser.add_argument("--alvo-mb", type=int, default=settings.lake.LAKE_COMPACTACAO_ALVO_MB,
+                        help="Tamanho alvo de cada arquivo compactado")
+    parser.add_argument("--root", default=settings.lake.LAKE_ROOT, help="Raiz do lake (diretório ou gs://bucket/prefixo)")
+    parser.add_argument("--dry-run", action="store_true", help="Só lista o que seria compactado")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    resultados = compact(open_store(args.root, settings.gcp), args.prefixo, args.granularidade,
+                         args.alvo_mb * 1024 * 1024, args.dry_run)
+    for r in resultados:
+        print(r)
+    return 1 if any(r.get("ignorado") for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    sys.exit(main())
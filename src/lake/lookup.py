@@ -0,0 +1,157 @@
+"""
+Busca pontual de pedidos no bronze pelo manifesto (substitui a varredura de todos os Parquet).
+1. Lê os _manifest.json das partições e descarta os arquivos cuja faixa min/max ou Bloom
+   exclui a chave.
+2. Nos arquivos restantes, lê só as colunas pedidas, com o filtro empurrado para o Parquet
+   (row groups cujas estatísticas excluem a chave nem são lidos).
+Partições sem manifesto (gravadas antes dele) são lidas sem poda, também com filtro.
+
+Uso: python -m src.lake.lookup 23498 [--coluna nCodPed|cNumero] [--root data/lake]
+"""
+import sys
+import logging
+import argparse
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.core.interfaces import IObjectStore
+from src.lake.manifest import KEY_COLUMNS, file_may_contain, group_partitions, normalize_key, read_partition_manifest
+from src.lake.pedido_compra import BRONZE_PREFIX
+from src.lake.storage import open_store
+
+try:
+    import pyarrow as pa  # opcional
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pc = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Colunas mostradas por padrão
+DEFAULT_COLUMNS = ("nCodPed", "cNumero", "dIncData", "fl_encerrado_cancelado", "cEtapa", "nCodFor", "status",
+                   "datetime_coleta_dados")
+
+
+def prune_files(manifests: Iterable[Tuple[str, Optional[Dict[str, Any]]]], value: Any,
+                columns: Sequence[str] = KEY_COLUMNS) -> Tuple[List[str], int]:
+    """
+    Chaves dos arquivos que podem conter a chave de busca em alguma das colunas.
+    manifests: (chave da partição, manifesto ou None). Retorna (candidatos, total de arquivos nos manifestos).
+    """
+    candidates = []
+    total = 0
+    for partition, manifest in manifests:
+        for entry in (manifest or {}).get("arquivos", []):
+            total += 1
+            if any(file_may_contain(entry, col, value) for col in columns):
+                candidates.append(f"{partition}/{entry['arquivo']}")
+    return candidates, total
+
+
+def _typed_value(field_type, value: Any) -> Any:
+    if pa.types.is_integer(field_type):
+        return int(float(value))
+    if pa.types.is_floating(field_type):
+        return float(value)
+    return str(value)
+
+
+def read_matches(source, value: Any, columns: Sequence[str] = KEY_COLUMNS,
+                 projection: Optional[Sequence[str]] = DEFAULT_COLUMNS) -> List[Dict[str, Any]]:
+    """
+    Linhas de um Parquet (caminho ou arquivo aberto) em que alguma coluna-chave = value.
+    Filtro por coluna com pushdown; projeção restrita às colunas existentes.
+    """
+    if pq is None:
+        raise RuntimeError("pyarrow não instalado: busca no lake exige pyarrow")
+    parquet = pq.ParquetFile(source)
+    schema = parquet.schema_arrow
+    names = schema.names
+    wanted = [c for c in (projection or names) if c in names]
+    key = normalize_key(value)
+    rows: List[Dict[str, Any]] = []
+    for col in columns:
+        if col not in names or key is None:
+            continue
+        try:
+            typed = _typed_value(schema.field(col).type, key)
+        except ValueError:
+            continue  # chave não numérica numa coluna numérica
+        groups = [i for i in range(parquet.metadata.num_row_groups) if _row_group_may_contain(parquet, i, col, typed)]
+        if not groups:
+            continue
+        table = parquet.read_row_groups(groups, columns=list(dict.fromkeys([*wanted, col])))
+        mask = pc.equal(table.column(col), pa.scalar(typed, type=schema.field(col).type))
+        for row in table.filter(mask).to_pylist():
+            row["_coluna"] = col
+            rows.append(row)
+        if rows:
+            break
+    return rows
+
+
+def _row_group_may_contain(parquet, index: int, column: str, value: Any) -> bool:
+    """Usa as estatísticas min/max do row group (pushdown manual, sem depender de dataset)."""
+    rg = parquet.metadata.row_group(index)
+    for i in range(rg.num_columns):
+        chunk = rg.column(i)
+        if chunk.path_in_schema != column:
+            continue
+        stats = chunk.statistics
+        if stats is None or not stats.has_min_max:
+            return True
+        try:
+            return stats.min <= value <= stats.max
+        except TypeError:
+            return True
+    return True
+
+
+def find(store: IObjectStore, value: Any, columns: Sequence[str] = KEY_COLUMNS,
+         projection: Optional[Sequence[str]] = DEFAULT_COLUMNS, prefix: str = BRONZE_PREFIX) -> List[Dict[str, Any]]:
+    """Busca a chave em todas as partições de uma tabela do lake."""
+    manifests = []
+    unindexed = []
+    for partition_key, group in sorted(group_partitions(store.list(prefix), prefix).items()):
+        manifest = read_partition_manifest(store, partition_key) if group["manifesto"] else None
+        if manifest is None:
+            unindexed.extend(group["arquivos"])
+        else:
+            manifests.append((partition_key, manifest))
+    candidates, total = prune_files(manifests, value, columns)
+    logger.info(
+        f"Busca {value}: {len(candidates)}/{total} arquivos após o manifesto"
+        + (f", {len(unindexed)} sem manifesto" if unindexed else "")
+    )
+    found = []
+    for key in candidates + unindexed:
+        with store.open_reader(key) as f:
+            for row in read_matches(f, value, columns, projection):
+                row["_arquivo"] = key
+                found.append(row)
+    return found
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    from src.config import Settings
+
+    settings = Settings()
+    parser = argparse.ArgumentParser(description="Busca um pedido de compra no bronze pelo manifesto")
+    parser.add_argument("valor", help="nCodPed ou cNumero")
+    parser.add_argument("--coluna", choices=KEY_COLUMNS, help="Coluna da chave (padrão: ambas)")
+    parser.add_argument("--root", default=settings.lake.LAKE_ROOT, help="Raiz do lake (diretório ou gs://bucket/prefixo)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    rows = find(open_store(args.root, settings.gcp), args.valor, (args.coluna,) if args.coluna else KEY_COLUMNS)
+    for row in rows:
+        print(row)
+    if not rows:
+        print(f"Pedido {args.valor} não encontrado no bronze")
+    return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    sys.exit(main())
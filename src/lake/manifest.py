@@ -0,0 +1,267 @@
+"""
+Manifesto das partições do lake: para cada partição (periodo=...), um _manifest.json com,
+por arquivo Parquet, nº de linhas, min/max e filtro de Bloom das colunas-chave
+(nCodPed, cNumero), faixa de datas e contagem por status.
+Uma busca por um pedido lê só os manifestos (poucos KB) e abre apenas os arquivos cuja faixa
+e Bloom admitem a chave; ver src.lake.lookup.
+"""
+import json
+import base64
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from src.core.interfaces import IObjectStore
+from src.pipeline.key_index import BLOOM_BITS_PER_KEY, BLOOM_HASHES, _bloom_positions
+from src.utils.row_hash import key_fingerprint
+
+try:
+    import pyarrow as pa  # opcional
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pc = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "_manifest.json"
+MANIFEST_VERSION = 1
+KEY_COLUMNS = ("nCodPed", "cNumero")
+
+
+def normalize_key(value: Any) -> Optional[str]:
+    """Chave como texto: 23498, 23498.0 e ' 23498 ' viram '23498'."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    s = str(value).strip()
+    if s.endswith(".0") and s[:-2].isdigit():
+        s = s[:-2]
+    return s or None
+
+
+class BloomFilter:
+    """Filtro de Bloom das chaves de um arquivo (mesmas funções hash do KeyIndex)."""
+
+    def __init__(self, bits: int, hashes: int = BLOOM_HASHES, data: Optional[bytearray] = None):
+        self.bits = max(8, bits)
+        self.hashes = hashes
+        self.data = data if data is not None else bytearray((self.bits + 7) // 8)
+
+    @classmethod
+    def for_keys(cls, keys: Sequence[str]) -> "BloomFilter":
+        bloom = cls(len(keys) * BLOOM_BITS_PER_KEY)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def add(self, key: str):
+        for pos in _bloom_positions(key_fingerprint(key), self.bits, self.hashes):
+            self.data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.data[pos >> 3] & (1 << (pos & 7))
+                   for pos in _bloom_positions(key_fingerprint(key), self.bits, self.hashes))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"bits": self.bits, "hashes": self.hashes, "data": base64.b64encode(bytes(self.data)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "BloomFilter":
+        return cls(int(d["bits"]), int(d["hashes"]), bytearray(base64.b64decode(d["data"])))
+
+
+def _json_value(v: Any) -> Any:
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+
+def _parse_br_date(v: Any) -> Optional[str]:
+    if not v:
+        return None
+    try:
+        return datetime.strptime(str(v)[:10], "%d/%m/%Y").date().isoformat()
+    except ValueError:
+        return None
+
+
+class FileStats:
+    """
+    Estatísticas de um arquivo acumuladas lote a lote (gravação em streaming): min/max e
+    chaves das colunas-chave, faixa de datas e contagem por status.
+    """
+
+    def __init__(self, key_columns: Sequence[str] = KEY_COLUMNS):
+        self.key_columns = tuple(key_columns)
+        self.registros = 0
+        self._min: Dict[str, Any] = {}
+        self._max: Dict[str, Any] = {}
+        self._keys: Dict[str, set] = {}
+        self._inicios: set = set()
+        self._fins: set = set()
+        self._status: Dict[str, int] = {}
+
+    def update(self, data) -> "FileStats":
+        """Acumula uma Table ou RecordBatch."""
+        self.registros += data.num_rows
+        if not data.num_rows:
+            return self
+        names = set(data.schema.names)
+        for col in self.key_columns:
+            if col not in names:
+                continue
+            column = data.column(col)
+            self._keys.setdefault(col, set()).update(
+                k for k in (normalize_key(v) for v in column.to_pylist()) if k is not None
+            )
+            minmax = pc.min_max(column).as_py()
+            if minmax["min"] is not None:
+                atual = self._min.get(col)
+                self._min[col] = minmax["min"] if atual is None else min(atual, minmax["min"])
+                atual = self._max.get(col)
+                self._max[col] = minmax["max"] if atual is None else max(atual, minmax["max"])
+        self._inicios.update(_unique(data, "periodo_inicio"))
+        self._fins.update(_unique(data, "periodo_fim"))
+        if "status" in names:
+            for c in pc.value_counts(data.column("status")).to_pylist():
+                self._status[c["values"]] = self._status.get(c["values"], 0) + c["counts"]
+        return self
+
+    def entry(self, arquivo: str, row_groups: Optional[int] = None, columns: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Entrada do manifesto; columns = colunas do arquivo (chaves ausentes nele ficam sem estatística)."""
+        entry: Dict[str, Any] = {
+            "arquivo": arquivo,
+            "registros": self.registros,
+            "row_groups": row_groups,
+            "escrito_em": datetime.now().isoformat(),  # com microssegundos: identifica a gravação
+            "chaves": {},
+        }
+        present = set(columns) if columns is not None else set(self._keys)
+        for col in self.key_columns:
+            if col not in present:
+                continue
+            entry["chaves"][col] = {
+                "min": _json_value(self._min.get(col)),
+                "max": _json_value(self._max.get(col)),
+                "bloom": BloomFilter.for_keys(sorted(self._keys.get(col, ()))).to_dict(),
+            }
+        inicios = [d for d in (_parse_br_date(v) for v in self._inicios) if d]
+        fins = [d for d in (_parse_br_date(v) for v in self._fins) if d]
+        entry["data_inicio"] = min(inicios) if inicios else None
+        entry["data_fim"] = max(fins) if fins else None
+        if self._status or (columns is not None and "status" in present):
+            entry["status"] = dict(self._status)
+        return entry
+
+
+def build_file_entry(table, arquivo: str, key_columns: Sequence[str] = KEY_COLUMNS,
+                     row_groups: Optional[int] = None) -> Dict[str, Any]:
+    """Entrada do manifesto para um arquivo a partir da tabela gravada nele."""
+    return FileStats(key_columns).update(table).entry(arquivo, row_groups, table.column_names)
+
+
+def _unique(data, name: str) -> List[Any]:
+    if name not in data.schema.names:
+        return []
+    return pc.unique(data.column(name)).to_pylist()
+
+
+def file_may_contain(entry: Dict[str, Any], column: str, value: Any) -> bool:
+    """False só quando o manifesto garante que a chave não está no arquivo."""
+    info = entry.get("chaves", {}).get(column)
+    if info is None:
+        return True  # coluna sem estatística: não dá para descartar
+    key = normalize_key(value)
+    if key is None:
+        return False
+    lo, hi = info.get("min"), info.get("max")
+    if lo is None and hi is None:
+        return False  # coluna toda nula
+    try:
+        typed = type(lo)(key) if isinstance(lo, (int, float)) else key
+        if typed < lo or typed > hi:
+            return False
+    except (TypeError, ValueError):
+        pass  # tipos diferentes: decide pelo Bloom
+    return key in BloomFilter.from_dict(info["bloom"])
+
+
+def partition_manifest_key(partition_key: str) -> str:
+    return f"{partition_key}/{MANIFEST_NAME}"
+
+
+def read_partition_manifest(store: IObjectStore, partition_key: str) -> Optional[Dict[str, Any]]:
+    key = partition_manifest_key(partition_key)
+    try:
+        return json.loads(store.get(key))
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logger.warning(f"Manifesto '{key}' ilegível ({e}); partição será lida por inteiro")
+        return None
+
+
+def write_partition_manifest(store: IObjectStore, partition_key: str, files: Iterable[Dict[str, Any]]):
+    """Grava o manifesto da partição (objeto substituído inteiro: leitores nunca veem um pela metade)."""
+    manifest = {
+        "versao": MANIFEST_VERSION,
+        "particao": partition_key.rsplit("/", 1)[-1],
+        "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+        "arquivos": sorted(files, key=lambda e: e["arquivo"]),
+    }
+    store.put(partition_manifest_key(partition_key), json.dumps(manifest, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+
+def update_partition_manifest(store: IObjectStore, partition_key: str, entry: Dict[str, Any]):
+    """Substitui (ou acrescenta) a entrada de um arquivo no manifesto da partição."""
+    current = read_partition_manifest(store, partition_key) or {}
+    files = [e for e in current.get("arquivos", []) if e.get("arquivo") != entry["arquivo"]]
+    files.append(entry)
+    write_partition_manifest(store, partition_key, files)
+
+
+def group_partitions(keys: Iterable[str], table_prefix: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Agrupa as chaves de uma tabela por partição: {partição: {"manifesto": bool, "arquivos": [...]}}.
+    Parquet soltos direto na tabela (layout antigo) ficam na partição "" (sem manifesto).
+    """
+    partitions: Dict[str, Dict[str, Any]] = {}
+    base = table_prefix.rstrip("/") + "/"
+    for key in keys:
+        if not key.startswith(base):
+            continue
+        partition_key, _, name = key.rpartition("/")
+        if partition_key + "/" == base:
+            partition_key = ""
+        group = partitions.setdefault(partition_key, {"manifesto": False, "arquivos": []})
+        if name == MANIFEST_NAME and partition_key:
+            group["manifesto"] = True
+        elif name.endswith(".parquet"):
+            group["arquivos"].append(key)
+    return partitions
+
+
+def rebuild_manifests(store: IObjectStore, table_prefix: str, key_columns: Sequence[str] = KEY_COLUMNS) -> int:
+    """Recria os manifestos de todas as partições de uma tabela (ex.: arquivos gravados antes do manifesto)."""
+    if pq is None:
+        raise RuntimeError("pyarrow não instalado: manifesto do lake exige pyarrow")
+    total = 0
+    for partition_key, group in sorted(group_partitions(store.list(table_prefix), table_prefix).items()):
+        if not partition_key or not group["arquivos"]:
+            continue
+        files = []
+        for key in group["arquivos"]:
+            with store.open_reader(key) as f:
+                parquet = pq.ParquetFile(f)
+                columns = [c for c in (*key_columns, "periodo_inicio", "periodo_fim", "status")
+                           if c in parquet.schema_arrow.names]
+                files.append(build_file_entry(parquet.read(columns=columns), key.rsplit("/", 1)[-1], key_columns,
+                                              parquet.metadata.num_row_groups))
+        write_partition_manifest(store, partition_key, files)
+        total += 1
+    logger.info(f"Manifestos recriados: {total} partições em {table_prefix}")
+    return total
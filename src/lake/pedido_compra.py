@@ -0,0 +1,477 @@
+"""
+Camada bronze de pedidos de compra (produtos/pedidocompra/ - PesquisarPedCompra).
+Substitui os três scripts amigo/nbronze_pedido_compra*.py, que só diferiam nos filtros
+lExibirPedidosCancelados/Encerrados e percorriam as mesmas datas três vezes, em sequência.
+Aqui cada janela de datas é buscada uma vez por status, com os status em paralelo, e grava
+um único Parquet por janela (partição periodo=...) com a coluna status. Cada página da API
+vira um row group, gravado direto no upload (schema tipado fixo, StreamingParquetWriter): a
+memória fica limitada a uma página por status, não ao mês/ano inteiro.
+Os row groups seguem a ordem de chegada das páginas, não a de nCodPed: o lookup poda esses
+arquivos pelo manifesto, mas não por row group. A ordenação por nCodPed em row groups de
+tamanho fixo volta na compactação (src.lake.compaction).
+
+Uso: python -m src.lake.pedido_compra [--inicio YYYY-MM-DD] [--fim YYYY-MM-DD]
+                                      [--status ativo,cancelado,encerrado] [--granularidade mes]
+"""
+import sys
+import time
+import logging
+import argparse
+import concurrent.futures
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.collectors.pedidos_compra import PEDIDO_COMPRA_STATUS, PedidosCompraCollector
+from src.core.interfaces import IApiClient, IObjectStore
+from src.lake.storage import open_store
+from src.lake.writer import StreamingParquetWriter
+from src.utils import json_codec
+
+try:
+    import pyarrow as pa  # opcional
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pc = None
+
+logger = logging.getLogger(__name__)
+
+BRONZE_PREFIX = "bronze/pedido_compra"
+STATUS_PADRAO = tuple(PEDIDO_COMPRA_STATUS)
+GRANULARIDADES = ("dia", "mes", "ano")
+
+# Listas do pedido gravadas como JSON (o cabeçalho vira colunas)
+CAMPOS_SERIALIZADOS = ("departamentos_consulta", "frete_consulta", "parcelas_consulta", "produtos_consulta")
+
+# Schema tipado do cabecalho_consulta (tipos Arrow por alias). Cada página é convertida
+# coluna a coluna com pyarrow.compute; campos fora daqui, valores aninhados e valores que não
+# convertem (ex.: nCodFor "abc") vão, em JSON, para COLUNA_EXTRA. Datas no formato DD/MM/YYYY.
+CAMPOS_CABECALHO = {
+    "nCodPed": "int64",
+    "cCodIntPed": "string",
+    "cNumero": "string",
+    "cEtapa": "string",
+    "nCodEtapa": "int64",
+    "dIncData": "date32",
+    "cIncHora": "string",
+    "dAltData": "date32",
+    "cAltHora": "string",
+    "nCodFor": "int64",
+    "cCodIntFor": "string",
+    "cCnpjCpfFor": "string",
+    "dDtPrevisao": "date32",
+    "cCodParc": "string",
+    "nQtdeParc": "int64",
+    "cCodCateg": "string",
+    "nCodCompr": "int64",
+    "cContato": "string",
+    "cContrato": "string",
+    "cNumPedido": "string",
+    "nCodCC": "int64",
+    "nCodIntCC": "string",
+    "nCodProj": "int64",
+    "cObs": "string",
+    "cObsInt": "string",
+}
+COLUNA_EXTRA = "cabecalho_extra"
+
+# Status já encerrados/cancelados na origem
+_STATUS_FECHADOS = ("cancelado", "encerrado")
+
+
+def periodo_padrao() -> Tuple[date, date]:
+    """Dia 01 do mês anterior até hoje (mesmo padrão dos scripts antigos)."""
+    hoje = date.today()
+    inicio = (hoje.replace(day=1) - timedelta(days=1)).replace(day=1)
+    return inicio, hoje
+
+
+def gerar_janelas(inicio: date, fim: date, granularidade: str = "mes") -> List[Tuple[date, date]]:
+    """Divide [inicio, fim] em janelas por dia, mês ou ano (a primeira e a última são aparadas)."""
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f"Granularidade inválida: {granularidade} (use {', '.join(GRANULARIDADES)})")
+    janelas = []
+    atual = inicio
+    while atual <= fim:
+        if granularidade == "dia":
+            ultimo = atual
+        elif granularidade == "mes":
+            ultimo = atual.replace(day=monthrange(atual.year, atual.month)[1])
+        else:
+            ultimo = date(atual.year, 12, 31)
+        ultimo = min(ultimo, fim)
+        janelas.append((atual, ultimo))
+        atual = ultimo + timedelta(days=1)
+    return janelas
+
+
+def periodo_referencia(inicio: date, granularidade: str) -> str:
+    """Rótulo da partição: YYYYMMDD, YYYYMM ou YYYY."""
+    return inicio.strftime({"dia": "%Y%m%d", "mes": "%Y%m", "ano": "%Y"}[granularidade])
+
+
+def pedido_deveria_estar_encerrado(pedido: Dict[str, Any]) -> bool:
+    """
+    A API devolve como "normais" pedidos com etapa 15 ou 100% recebidos,
+    que na prática estão encerrados.
+    """
+    cabecalho = pedido.get("cabecalho_consulta") or {}
+    etapa = str(cabecalho.get("cEtapa", "")).strip()
+    if etapa == "15" or cabecalho.get("nCodEtapa") == 15:
+        return True
+    produtos = pedido.get("produtos_consulta") or []
+    if isinstance(produtos, list) and produtos:
+        total_qtd = 0.0
+        total_qtd_rec = 0.0
+        for produto in produtos:
+            total_qtd += float(produto.get("nQtde", 0) or 0)
+            total_qtd_rec += float(produto.get("nQtdeRec", 0) or 0)
+        # Margem pequena para erro de float
+        if total_qtd > 0 and abs(total_qtd_rec - total_qtd) < 0.01:
+            return True
+    return False
+
+
+def _serializar(valor: Any) -> str:
+    try:
+        return json_codec.dumps(valor)
+    except (TypeError, ValueError):
+        return str(valor)
+
+
+def processar_pedido_compra(pedido: Dict[str, Any], status: str) -> Dict[str, Any]:
+    """Linha bronze: cabeçalho + listas em JSON + status + fl_encerrado_cancelado."""
+    dados = dict(pedido.get("cabecalho_consulta") or {})
+    for campo in CAMPOS_SERIALIZADOS:
+        dados[campo] = _serializar(pedido.get(campo))
+    fechado = status in _STATUS_FECHADOS or pedido_deveria_estar_encerrado(pedido)
+    dados["fl_encerrado_cancelado"] = "T" if fechado else "F"
+    dados["status"] = status
+    return dados
+
+
+def bronze_schema():
+    """Schema fixo do Parquet bronze: cabeçalho tipado, listas em JSON, metadados da coleta."""
+    return pa.schema(
+        [(nome, pa.type_for_alias(tipo)) for nome, tipo in CAMPOS_CABECALHO.items()]
+        + [(nome, pa.string()) for nome in (*CAMPOS_SERIALIZADOS, COLUNA_EXTRA, "fl_encerrado_cancelado", "status")]
+        + [
+            ("datetime_processamento", pa.timestamp("us")),
+            ("data_coleta", pa.timestamp("us")),
+            ("dt_coleta_dados", pa.string()),
+            ("datetime_coleta_dados", pa.timestamp("us")),
+            ("periodo_inicio", pa.string()),
+            ("periodo_fim", pa.string()),
+            ("periodo_referencia", pa.string()),
+            ("fonte", pa.string()),
+            ("camada", pa.string()),
+        ]
+    )
+
+
+_INTEIRO = r"^[+-]?\d{1,18}$"
+
+
+def _vazios_como_nulos(valores):
+    """Textos vazios ou só com espaços (ex.: dDtPrevisao: "") viram nulo: campo não preenchido, não inválido."""
+    if not pa.types.is_string(valores.type):
+        return valores
+    vazios = pc.equal(pc.utf8_trim_whitespace(valores), "")
+    return pc.if_else(vazios, pa.scalar(None, valores.type), valores)
+
+
+def _converter(valores, tipo):
+    """Converte uma coluna para o tipo do schema; o que não converte vira nulo."""
+    if valores.type == tipo:
+        return valores
+    if pa.types.is_null(valores.type) or pa.types.is_nested(valores.type):
+        return pa.nulls(len(valores), tipo)
+    if pa.types.is_string(tipo):
+        return pc.cast(valores, tipo)
+    if pa.types.is_integer(tipo):
+        if pa.types.is_integer(valores.type) or pa.types.is_floating(valores.type):
+            try:
+                return pc.cast(valores, tipo)  # cast seguro: falha com casas decimais
+            except pa.ArrowInvalid:
+                pass
+        texto = pc.utf8_trim_whitespace(pc.cast(valores, pa.string()))
+        validos = pc.fill_null(pc.match_substring_regex(texto, _INTEIRO), False)
+        return pc.cast(pc.if_else(validos, texto, pa.scalar(None, pa.string())), tipo)
+    if pa.types.is_date(tipo):
+        texto = pc.utf8_trim_whitespace(pc.cast(valores, pa.string()))
+        return pc.cast(pc.strptime(texto, format="%d/%m/%Y", unit="s", error_is_null=True), tipo)
+    raise ValueError(f"Tipo sem conversão no bronze: {tipo}")
+
+
+def _colunas_brutas(cabecalhos: List[Dict[str, Any]], nomes: Iterable[str]) -> Dict[str, Any]:
+    """
+    Colunas Arrow dos campos pedidos. Caminho rápido: a página inteira vira um StructArray numa
+    chamada; se algum campo mistura tipos incompatíveis, cada campo é montado separadamente.
+    """
+    try:
+        struct = pa.array(cabecalhos)
+        if pa.types.is_struct(struct.type):
+            presentes = {struct.type.field(i).name: i for i in range(struct.type.num_fields)}
+            return {nome: struct.field(presentes[nome]) for nome in nomes if nome in presentes}
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    colunas = {}
+    for nome in nomes:
+        valores = [c.get(nome) for c in cabecalhos]
+        try:
+            colunas[nome] = pa.array(valores)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            colunas[nome] = pa.array(
+                [None if v is None or isinstance(v, (dict, list)) else str(v) for v in valores], pa.string()
+            )
+    return colunas
+
+
+def pagina_para_batch(pedidos: List[Dict[str, Any]], status: str, schema, metadados: Dict[str, Any]):
+    """
+    Pedidos de uma página da API -> RecordBatch no schema bronze. Os campos do cabeçalho são
+    convertidos por coluna (pyarrow.compute, sem laço por célula); só as linhas com campos
+    desconhecidos ou valores inválidos passam por Python para montar o JSON de COLUNA_EXTRA.
+    """
+    n = len(pedidos)
+    cabecalhos = [p.get("cabecalho_consulta") or {} for p in pedidos]
+    brutas = _colunas_brutas(cabecalhos, CAMPOS_CABECALHO)
+    extras: List[Optional[Dict[str, Any]]] = [None] * n
+    colunas: Dict[str, Any] = {}
+    for nome in CAMPOS_CABECALHO:
+        tipo = schema.field(nome).type
+        bruta = brutas.get(nome)
+        if bruta is None:
+            colunas[nome] = pa.nulls(n, tipo)
+            continue
+        if not pa.types.is_string(tipo):
+            # Antes do cast: vazio não conta como rejeitado nem vai para COLUNA_EXTRA
+            bruta = _vazios_como_nulos(bruta)
+        convertida = _converter(bruta, tipo)
+        colunas[nome] = convertida
+        rejeitados = pc.and_(pc.is_valid(bruta), pc.is_null(convertida))
+        if pc.any(rejeitados).as_py():
+            for i in pc.indices_nonzero(rejeitados).to_pylist():
+                extras[i] = extras[i] or {}
+                extras[i][nome] = cabecalhos[i].get(nome)
+    desconhecidos = set().union(*cabecalhos) - CAMPOS_CABECALHO.keys() if cabecalhos else set()
+    if desconhecidos:
+        for i, cabecalho in enumerate(cabecalhos):
+            fora = {k: cabecalho[k] for k in desconhecidos if cabecalho.get(k) is not None}
+            if fora:
+                extras[i] = {**(extras[i] or {}), **fora}
+    colunas[COLUNA_EXTRA] = pa.array([json_codec.dumps(e) if e else None for e in extras], pa.string())
+    for campo in CAMPOS_SERIALIZADOS:
+        colunas[campo] = pa.array([_serializar(p.get(campo)) for p in pedidos], pa.string())
+    fechado = status in _STATUS_FECHADOS
+    colunas["fl_encerrado_cancelado"] = pa.array(
+        ["T" if fechado or pedido_deveria_estar_encerrado(p) else "F" for p in pedidos], pa.string()
+    )
+    colunas["status"] = pa.repeat(pa.scalar(status, pa.string()), n)
+    for nome, valor in metadados.items():
+        colunas[nome] = pa.repeat(pa.scalar(valor, schema.field(nome).type), n)
+    return pa.RecordBatch.from_arrays([colunas[f.name] for f in schema], schema=schema)
+
+
+class BronzePedidoCompra:
+    """
+    Pipeline bronze de pedidos de compra: uma passada pelas janelas de datas, todos os
+    status pedidos buscados em paralelo por janela (payload do PedidosCompraCollector,
+    requisições pelo OmieApiClient).
+    """
+
+    def __init__(
+        self,
+        api_client: IApiClient,
+        store: IObjectStore,
+        status: Sequence[str] = STATUS_PADRAO,
+        registros_por_pagina: int = 100,
+        max_workers: Optional[int] = None,
+    ):
+        if pa is None:
+            raise RuntimeError("pyarrow não instalado: o bronze de pedidos de compra grava Parquet")
+        desconhecidos = [s for s in status if s not in PEDIDO_COMPRA_STATUS]
+        if desconhecidos or not status:
+            raise ValueError(f"Status inválidos: {desconhecidos or status} (use {', '.join(PEDIDO_COMPRA_STATUS)})")
+        self.api_client = api_client
+        self.collector = PedidosCompraCollector(api_client)
+        self.store = store
+        self.status = tuple(dict.fromkeys(status))
+        self.registros_por_pagina = registros_por_pagina
+        self.max_workers = max_workers or len(self.status)
+        self.schema = bronze_schema()
+
+    def iter_pages(self, status: str, inicio: date, fim: date) -> Iterator[List[Dict[str, Any]]]:
+        """Páginas de pedidos de um status numa janela (uma página por vez em memória)."""
+        endpoint = self.collector.get_endpoint()
+        method = self.collector.get_method()
+        pagina = 1
+        total_paginas = 1
+        while pagina <= total_paginas:
+            if pagina > 1:
+                time.sleep(0.5)  # 500ms entre páginas (rate limit da Omie)
+            payload = self.collector.build_payload(
+                pagina=pagina,
+                registros_por_pagina=self.registros_por_pagina,
+                status=status,
+                data_inicial=inicio.strftime("%d/%m/%Y"),
+                data_final=fim.strftime("%d/%m/%Y"),
+            )
+            resposta = self.api_client.request(endpoint, method, payload)
+            if "faultstring" in resposta:
+                raise RuntimeError(f"Erro na API ({status}): {resposta['faultstring']}")
+            total_paginas = int(resposta.get("nTotalPaginas") or 1)
+            lista = resposta.get("pedidos_pesquisa") or []
+            if isinstance(lista, dict):
+                lista = [lista]
+            if not lista:
+                break
+            yield [p for p in lista if isinstance(p, dict)]
+            pagina += 1
+
+    def fetch(self, status: str, inicio: date, fim: date, writer: StreamingParquetWriter,
+              metadados: Dict[str, Any]) -> int:
+        """Grava todas as páginas de um status no arquivo da janela; retorna o nº de registros."""
+        total = 0
+        for pedidos in self.iter_pages(status, inicio, fim):
+            writer.write_batch(pagina_para_batch(pedidos, status, writer.schema, metadados))
+            total += len(pedidos)
+        logger.info(f"Pedidos de compra {status} {inicio:%d/%m/%Y}-{fim:%d/%m/%Y}: {total} registros")
+        return total
+
+    def partition_path(self, referencia: str) -> str:
+        """
+        Chave no store do Parquet de uma janela. Coleta de só parte dos status grava num
+        arquivo próprio (pedido_compra_<ref>_<status>.parquet): regravar o arquivo da coleta
+        completa apagaria os pedidos dos outros status da janela.
+        """
+        sufixo = ""
+        if set(self.status) != set(STATUS_PADRAO):
+            sufixo = "_" + "_".join(s for s in STATUS_PADRAO if s in self.status)
+        return f"{BRONZE_PREFIX}/periodo={referencia}/pedido_compra_{referencia}{sufixo}.parquet"
+
+    @staticmethod
+    def metadados(inicio: date, fim: date, referencia: str) -> Dict[str, Any]:
+        """Colunas de metadados da coleta (mesmos valores em todas as linhas da janela)."""
+        agora = datetime.now()
+        return {
+            "datetime_processamento": agora,
+            "data_coleta": agora,
+            "dt_coleta_dados": agora.strftime("%d/%m/%Y %H:%M:%S"),
+            "datetime_coleta_dados": agora,
+            "periodo_inicio": inicio.strftime("%d/%m/%Y"),
+            "periodo_fim": fim.strftime("%d/%m/%Y"),
+            "periodo_referencia": referencia,
+            "fonte": "omie_api",
+            "camada": "bronze",
+        }
+
+    def run_window(
+        self,
+        inicio: date,
+        fim: date,
+        granularidade: str,
+        executor: concurrent.futures.Executor,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Busca todos os status da janela em paralelo, gravando as páginas no Parquet da partição
+        à medida que chegam. Se algum status falhar, a gravação é descartada (partição parcial
+        esconderia pedidos) e a versão anterior do arquivo, se houver, é mantida.
+        """
+        referencia = periodo_referencia(inicio, granularidade)
+        key = self.partition_path(referencia)
+        writer = StreamingParquetWriter(self.store, key, self.schema)
+        metadados = self.metadados(inicio, fim, referencia)
+        futures = {s: executor.submit(self.fetch, s, inicio, fim, writer, metadados) for s in self.status}
+        por_status: Dict[str, int] = {}
+        falhas = []
+        for status, future in futures.items():
+            try:
+                por_status[status] = future.result()
+            except Exception as e:
+                logger.error(f"Erro ao coletar pedidos {status} de {referencia}: {e}")
+                falhas.append(status)
+        if falhas:
+            writer.abort()
+            return {"periodo": referencia, "arquivo": None, "registros": 0, "por_status": por_status, "falhas": falhas}
+        if writer.close() is None:
+            logger.info(f"Nenhum pedido de compra em {referencia}")
+            return None
+        logger.info(
+            f"Bronze pedido_compra {referencia}: {writer.registros} registros {por_status} "
+            f"({writer.row_groups} row groups) -> {key}"
+        )
+        return {"periodo": referencia, "arquivo": key, "registros": writer.registros, "por_status": por_status,
+                "falhas": []}
+
+    def run(self, inicio: Optional[date] = None, fim: Optional[date] = None, granularidade: str = "mes") -> List[Dict[str, Any]]:
+        """Processa todas as janelas de [inicio, fim]; retorna um resumo por janela com dados ou falha."""
+        padrao_inicio, padrao_fim = periodo_padrao()
+        inicio = _as_date(inicio) or padrao_inicio
+        fim = _as_date(fim) or padrao_fim
+        janelas = gerar_janelas(inicio, fim, granularidade)
+        logger.info(
+            f"Bronze pedido_compra: {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}, {len(janelas)} janelas ({granularidade}), "
+            f"status={','.join(self.status)}"
+        )
+        resultados = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for janela_inicio, janela_fim in janelas:
+                resultado = self.run_window(janela_inicio, janela_fim, granularidade, executor)
+                if resultado is not None:
+                    resultados.append(resultado)
+        total = sum(r["registros"] for r in resultados)
+        falhas = [r["periodo"] for r in resultados if r["falhas"]]
+        logger.info(f"Bronze pedido_compra concluído: {total} registros em {len(resultados) - len(falhas)} partições")
+        if falhas:
+            logger.warning(f"Janelas com falha (não gravadas): {', '.join(falhas)}")
+        return resultados
+
+
+def _as_date(value: Any) -> Optional[date]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(str(value), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {value}")
+
+
+def parse_status(value: Optional[str]) -> Tuple[str, ...]:
+    """'ativo,cancelado' -> ('ativo', 'cancelado')."""
+    return tuple(s.strip() for s in (value or "").split(",") if s.strip())
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    from src.config import Settings
+    from src.omie import OmieApiClient
+
+    settings = Settings()
+    parser = argparse.ArgumentParser(description="Coleta bronze de pedidos de compra (Parquet particionado)")
+    parser.add_argument("--inicio", help="Data inicial (YYYY-MM-DD ou DD/MM/YYYY); padrão: dia 01 do mês anterior")
+    parser.add_argument("--fim", help="Data final; padrão: hoje")
+    parser.add_argument("--status", default=settings.lake.LAKE_PEDIDO_COMPRA_STATUS,
+                        help=f"Status separados por vírgula ({', '.join(PEDIDO_COMPRA_STATUS)})")
+    parser.add_argument("--granularidade", default=settings.lake.LAKE_GRANULARIDADE, choices=GRANULARIDADES)
+    parser.add_argument("--root", default=settings.lake.LAKE_ROOT, help="Raiz do lake (diretório ou gs://bucket/prefixo)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    api_client = OmieApiClient(settings.omie)
+    try:
+        pipeline = BronzePedidoCompra(api_client, open_store(args.root, settings.gcp), parse_status(args.status))
+        resultados = pipeline.run(_as_date(args.inicio), _as_date(args.fim), args.granularidade)
+    finally:
+        api_client.close()
+    return 1 if any(r["falhas"] for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    sys.exit(main())
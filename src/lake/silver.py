@@ -0,0 +1,205 @@
+"""
+Silver incremental de pedidos de compra: em vez de reconstruir um Parquet único a partir de
+todo o bronze, cada execução processa só as partições bronze que mudaram desde a anterior
+(assinatura do manifesto de cada partição guardada em _estado.json) e funde as linhas nas
+partições silver afetadas, uma por mês de inclusão do pedido (dIncData não muda, então cada
+pedido vive numa única partição silver).
+
+Na fusão vale a última escrita por nCodPed: maior datetime_coleta_dados; na mesma coleta,
+a linha com fl_encerrado_cancelado = "T" (calculado no bronze por status e por
+pedido_deveria_estar_encerrado), para um pedido listado como ativo e como encerrado ficar
+encerrado. Custo proporcional ao delta, não ao histórico.
+
+Uso: python -m src.lake.silver [--root data/lake] [--full]
+"""
+import sys
+import json
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.interfaces import IObjectStore
+from src.lake.compaction import DEDUP_ORDER, first_per_key_mask
+from src.lake.manifest import KEY_COLUMNS, group_partitions, read_partition_manifest
+from src.lake.pedido_compra import BRONZE_PREFIX, bronze_schema
+from src.lake.storage import open_store
+from src.lake.writer import StreamingParquetWriter
+
+try:
+    import pyarrow as pa  # opcional
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pc = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+SILVER_PREFIX = "silver/pedidos_compras"
+STATE_NAME = "_estado.json"
+PARTITION_COLUMN = "mes_inclusao"
+SEM_DATA = "sem_data"
+SILVER_KEY = KEY_COLUMNS[0]
+# Ordem da última escrita (a mesma da compactação): a primeira linha de cada nCodPed fica
+_ORDEM = [(SILVER_KEY, "ascending"), *DEDUP_ORDER]
+SILVER_ROW_GROUP_ROWS = 50000
+
+
+def silver_schema():
+    """Schema do bronze tipado + quando a linha entrou no silver."""
+    return bronze_schema().append(pa.field("datetime_silver", pa.timestamp("us")))
+
+
+def _conformar(table, schema):
+    """Tabela no schema dado (colunas ausentes viram nulas); ValueError se algum tipo não converte."""
+    n = table.num_rows
+    arrays = []
+    for field in schema:
+        if field.name in table.column_names:
+            coluna = table.column(field.name)
+            try:
+                arrays.append(coluna if coluna.type == field.type else coluna.cast(field.type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"coluna {field.name}: {coluna.type} -> {field.type} ({e})")
+        else:
+            arrays.append(pa.nulls(n, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class SilverPedidoCompra:
+    """Builder incremental do silver de pedidos de compra a partir do bronze."""
+
+    def __init__(self, store: IObjectStore, bronze_prefix: str = BRONZE_PREFIX, silver_prefix: str = SILVER_PREFIX):
+        if pq is None:
+            raise RuntimeError("pyarrow não instalado: o silver de pedidos de compra grava Parquet")
+        self.store = store
+        self.bronze_prefix = bronze_prefix.rstrip("/")
+        self.silver_prefix = silver_prefix.rstrip("/")
+        self.schema = silver_schema()
+
+    @property
+    def state_key(self) -> str:
+        return f"{self.silver_prefix}/{STATE_NAME}"
+
+    def read_state(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.store.get(self.state_key))
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning(f"Estado do silver ilegível ({e}); todas as partições serão reprocessadas")
+            return {}
+
+    def bronze_partitions(self) -> Dict[str, Dict[str, Any]]:
+        """{partição: {"assinatura", "arquivos"}} do bronze atual (partição "" = Parquet soltos)."""
+        particoes = {}
+        for partition_key, group in group_partitions(self.store.list(self.bronze_prefix), self.bronze_prefix).items():
+            if not group["arquivos"]:
+                continue
+            manifest = read_partition_manifest(self.store, partition_key) if group["manifesto"] else None
+            if manifest is not None:
+                base = [(e.get("arquivo"), e.get("registros"), e.get("escrito_em")) for e in manifest.get("arquivos", [])]
+            else:
+                base = [(key, self.store.size(key)) for key in group["arquivos"]]
+            assinatura = hashlib.sha1(json.dumps(sorted(base), default=str).encode("utf-8")).hexdigest()
+            particoes[partition_key] = {"assinatura": assinatura, "arquivos": group["arquivos"]}
+        return particoes
+
+    def partition_path(self, rotulo: str) -> str:
+        return f"{self.silver_prefix}/{PARTITION_COLUMN}={rotulo}/pedidos_compras_{rotulo}.parquet"
+
+    def _read(self, key: str):
+        with self.store.open_reader(key) as f:
+            return pq.ParquetFile(f).read()
+
+    def load_partition(self, arquivos: List[str]):
+        """Linhas de uma partição bronze no schema bronze (ValueError se algum arquivo não converte)."""
+        bronze = bronze_schema()
+        tabelas = [_conformar(self._read(key), bronze) for key in arquivos]
+        return pa.concat_tables(tabelas) if tabelas else bronze.empty_table()
+
+    def _delta(self, tabelas: List[Any]):
+        """Partições alteradas juntas, no schema silver (sem as linhas sem nCodPed)."""
+        delta = pa.concat_tables(tabelas)
+        sem_chave = delta.column(SILVER_KEY).null_count
+        if sem_chave:
+            logger.warning(f"{sem_chave} linhas do bronze sem {SILVER_KEY} ignoradas no silver")
+            delta = delta.filter(pc.is_valid(delta.column(SILVER_KEY)))
+        agora = pa.repeat(pa.scalar(datetime.now(), pa.timestamp("us")), delta.num_rows)
+        return delta.append_column(self.schema.field("datetime_silver"), agora)
+
+    def merge_partition(self, rotulo: str, novos) -> int:
+        """Funde as linhas novas na partição silver (última escrita vence) e regrava; retorna o total."""
+        key = self.partition_path(rotulo)
+        tabelas = [novos]
+        if self.store.exists(key):
+            tabelas.append(_conformar(self._read(key), self.schema))
+        # Novos antes dos existentes: ordenação estável desempata a favor do delta
+        combinada = pa.concat_tables(tabelas).sort_by(_ORDEM)
+        combinada = combinada.filter(first_per_key_mask(combinada.column(SILVER_KEY)))
+        with StreamingParquetWriter(self.store, key, self.schema) as writer:
+            for batch in combinada.to_batches(max_chunksize=SILVER_ROW_GROUP_ROWS):
+                writer.write_batch(batch)
+        return combinada.num_rows
+
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """Processa as partições bronze alteradas (todas com full=True) e grava o novo estado."""
+        estado = {} if full else self.read_state().get("bronze", {})
+        atuais = self.bronze_partitions()
+        alteradas = sorted(p for p, info in atuais.items() if estado.get(p) != info["assinatura"])
+        novo_estado = {p: estado[p] for p in atuais if p in estado}
+        resumo = {"particoes_bronze": len(atuais), "particoes_alteradas": len(alteradas), "registros_lidos": 0,
+                  "particoes_silver": {}, "ignoradas": []}
+        logger.info(f"Silver pedido_compra: {len(alteradas)}/{len(atuais)} partições bronze alteradas")
+
+        tabelas = []
+        for particao in alteradas:
+            try:
+                tabelas.append(self.load_partition(atuais[particao]["arquivos"]))
+            except ValueError as e:
+                # Ex.: arquivo gravado antes do schema tipado; recolete a janela
+                logger.warning(f"Partição bronze {particao or '(raiz)'} ignorada no silver: {e}")
+                resumo["ignoradas"].append(particao)
+                continue
+            novo_estado[particao] = atuais[particao]["assinatura"]
+
+        if tabelas:
+            delta = self._delta(tabelas)
+            resumo["registros_lidos"] = delta.num_rows
+            rotulos = pc.fill_null(pc.strftime(delta.column("dIncData"), format="%Y%m"), SEM_DATA)
+            for rotulo in sorted(pc.unique(rotulos).to_pylist()):
+                total = self.merge_partition(rotulo, delta.filter(pc.equal(rotulos, rotulo)))
+                resumo["particoes_silver"][rotulo] = total
+
+        self.store.put(self.state_key, json.dumps({
+            "versao": 1,
+            "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+            "bronze": novo_estado,
+        }, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        logger.info(
+            f"Silver pedido_compra: {resumo['registros_lidos']} linhas do bronze -> "
+            f"{len(resumo['particoes_silver'])} partições silver atualizadas"
+        )
+        return resumo
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    from src.config import Settings
+
+    settings = Settings()
+    parser = argparse.ArgumentParser(description="Atualiza o silver de pedidos de compra com as partições bronze alteradas")
+    parser.add_argument("--root", default=settings.lake.LAKE_ROOT, help="Raiz do lake (diretório ou gs://bucket/prefixo)")
+    parser.add_argument("--full", action="store_true", help="Reprocessa todas as partições bronze")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    resumo = SilverPedidoCompra(open_store(args.root, settings.gcp)).run(full=args.full)
+    print(resumo)
+    return 1 if resumo["ignoradas"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Armazenamento de objetos do lake: diretório local ou bucket GCS, pela mesma interface
+(IObjectStore). Com o backend local o pipeline bronze/silver roda e pode ser medido sem
+credenciais nem rede; em produção LAKE_ROOT aponta para gs://bucket[/prefixo].
+"""
+import io
+import os
+import threading
+import logging
+from typing import BinaryIO, List, Optional
+
+from src.core.interfaces import IObjectStore
+
+try:
+    from google.cloud import storage as gcs  # opcional
+    from google.api_core.exceptions import NotFound
+except ImportError:  # pragma: no cover - depende do ambiente
+    gcs = None
+    NotFound = None
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos do upload resumível e das leituras com seek no GCS (múltiplo de 256 KiB)
+GCS_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class _AtomicLocalWriter(io.FileIO):
+    """Grava em <arquivo>.tmp e troca pelo definitivo no close (removido se o with terminar em erro)."""
+
+    def __init__(self, path: str):
+        self._final = path
+        self._tmp = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+        self._failed = False
+        super().__init__(self._tmp, "wb")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._failed = exc_type is not None
+        return super().__exit__(exc_type, exc, tb)
+
+    def abort(self):
+        """Descarta a gravação (o arquivo definitivo, se existir, fica intacto)."""
+        self._failed = True
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        if self._failed:
+            os.remove(self._tmp)
+        else:
+            os.replace(self._tmp, self._final)
+
+
+class LocalObjectStore(IObjectStore):
+    """Objetos como arquivos sob um diretório raiz (chave "a/b.parquet" -> <root>/a/b.parquet)."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def __repr__(self) -> str:
+        return f"LocalObjectStore({self.root!r})"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.strip("/").split("/"))
+
+    def put(self, key: str, data: bytes) -> None:
+        with self.open_writer(key) as f:
+            f.write(data)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def get_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self._path(key))
+        except OSError:
+            return None
+
+    def list(self, prefix: str = "") -> List[str]:
+        base = self._path(prefix) if prefix else self.root
+        # Prefixo pode ser diretório ("bronze/x/") ou início de nome ("bronze/x/pedido_")
+        walk_root = base if os.path.isdir(base) else os.path.dirname(base)
+        keys = []
+        for dirpath, _dirs, files in os.walk(walk_root):
+            for name in files:
+                if ".tmp" in name:
+                    continue  # gravação em andamento
+                key = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix.lstrip("/")):
+                    keys.append(key)
+        return sorted(keys)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def open_writer(self, key: str) -> BinaryIO:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return _AtomicLocalWriter(path)
+
+    def open_reader(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+
+class _GcsWriter:
+    """
+    Upload resumível em blocos (BlobWriter). Só finaliza no close sem erro; se o with terminar
+    em exceção a sessão é abandonada e o objeto não é criado.
+    """
+
+    def __init__(self, writer):
+        self._writer = writer
+        self._failed = False
+
+    def write(self, data) -> int:
+        return self._writer.write(data)
+
+    def tell(self) -> int:
+        return self._writer.tell()
+
+    def flush(self):
+        pass  # o BlobWriter envia por bloco; flush parcial não existe no upload resumível
+
+    def writable(self) -> bool:
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self._failed or self._writer.closed
+
+    def close(self):
+        if not self.closed:
+            self._writer.close()
+
+    def abort(self):
+        """Abandona a sessão de upload sem criar o objeto."""
+        self._failed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._failed = True
+        else:
+            self.close()
+        return False
+
+
+class GCSObjectStore(IObjectStore):
+    """Objetos num bucket GCS, opcionalmente sob um prefixo (gs://bucket/prefixo)."""
+
+    def __init__(self, bucket: str, prefix: str = "", project: Optional[str] = None,
+                 credentials_path: Optional[str] = None, client=None):
+        if gcs is None:
+            raise RuntimeError("google-cloud-storage não instalado: pip install google-cloud-storage")
+        if client is None:
+            if credentials_path:
+                client = gcs.Client.from_service_account_json(credentials_path, project=project)
+            else:
+                client = gcs.Client(project=project)
+        self._client = client
+        self._bucket = client.bucket(bucket)
+        self.bucket_name = bucket
+        self.prefix = prefix.strip("/")
+
+    def __repr__(self) -> str:
+        return f"GCSObjectStore('gs://{self.bucket_name}/{self.prefix}')"
+
+    def _name(self, key: str) -> str:
+        key = key.lstrip("/")
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, data: bytes) -> None:
+        self._bucket.blob(self._name(key)).upload_from_string(data)
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self._bucket.blob(self._name(key)).download_as_bytes()
+        except NotFound:
+            raise FileNotFoundError(key)
+
+    def get_range(self, key: str, start: int, length: int) -> bytes:
+        if length <= 0:
+            return b""
+        try:
+            return self._bucket.blob(self._name(key)).download_as_bytes(start=start, end=start + length - 1)
+        except NotFound:
+            raise FileNotFoundError(key)
+
+    def size(self, key: str) -> Optional[int]:
+        blob = self._bucket.get_blob(self._name(key))
+        return blob.size if blob is not None else None
+
+    def list(self, prefix: str = "") -> List[str]:
+        full = self._name(prefix)
+        cut = len(self.prefix) + 1 if self.prefix else 0
+        return sorted(b.name[cut:] for b in self._client.list_blobs(self._bucket, prefix=full))
+
+    def delete(self, key: str) -> None:
+        try:
+            self._bucket.blob(self._name(key)).delete()
+        except NotFound:
+            pass
+
+    def open_writer(self, key: str) -> BinaryIO:
+        blob = self._bucket.blob(self._name(key), chunk_size=GCS_CHUNK_SIZE)
+        return _GcsWriter(blob.open("wb", ignore_flush=True))
+
+    def open_reader(self, key: str) -> BinaryIO:
+        blob = self._bucket.get_blob(self._name(key))
+        if blob is None:
+            raise FileNotFoundError(key)
+        return blob.open("rb", chunk_size=GCS_CHUNK_SIZE)
+
+
+def open_store(location: str, gcp_settings=None) -> IObjectStore:
+    """
+    "gs://bucket[/prefixo]" -> GCSObjectStore (credenciais de GcpSettings, como no BigQuery);
+    qualquer outro valor -> LocalObjectStore no diretório.
+    """
+    if location.startswith("gs://"):
+        bucket, _, prefix = location[len("gs://"):].partition("/")
+        credentials_path = None
+        project = None
+        if gcp_settings is not None:
+            from src.bigquery.manager import _resolve_credentials_path
+            credentials_path = _resolve_credentials_path(gcp_settings)
+            project = gcp_settings.project_id
+        return GCSObjectStore(bucket, prefix, project=project, credentials_path=credentials_path)
+    return LocalObjectStore(location)
@@ -0,0 +1,117 @@
+"""
+Gravação de Parquet em streaming no object store: cada lote (uma página da API) vira um
+row group, escrito direto no upload (IObjectStore.open_writer). A memória fica limitada ao
+lote corrente, não à janela inteira; o manifesto é montado com as estatísticas acumuladas.
+"""
+import threading
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+from src.core.interfaces import IObjectStore
+from src.lake.manifest import KEY_COLUMNS, FileStats, update_partition_manifest
+
+try:
+    import pyarrow as pa  # opcional
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingParquetWriter:
+    """
+    Um Parquet com schema fixo gravado lote a lote. Thread-safe: várias threads de coleta
+    (um status cada) podem gravar no mesmo arquivo. O objeto só é criado no close();
+    abort() descarta a gravação e mantém a versão anterior do arquivo, se houver.
+    """
+
+    def __init__(self, store: IObjectStore, key: str, schema, key_columns: Sequence[str] = KEY_COLUMNS,
+                 compression: str = "snappy"):
+        if pq is None:
+            raise RuntimeError("pyarrow não instalado: gravação de Parquet exige pyarrow")
+        self.store = store
+        self.key = key
+        self.schema = schema
+        self.compression = compression
+        self.stats = FileStats(key_columns)
+        self.row_groups = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._closed = False
+
+    @property
+    def registros(self) -> int:
+        return self.stats.registros
+
+    @property
+    def bytes_written(self) -> int:
+        """Bytes já enviados ao arquivo (o rodapé entra só no close)."""
+        with self._lock:
+            return self._file.tell() if self._file is not None else 0
+
+    def write_batch(self, batch) -> None:
+        """Grava um RecordBatch/Table (no schema do arquivo) como um row group."""
+        if batch.num_rows == 0:
+            return
+        if not batch.schema.equals(self.schema):
+            raise ValueError(f"Lote fora do schema de '{self.key}': {batch.schema}")
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Gravação de '{self.key}' já encerrada")
+            if self._writer is None:
+                self._file = self.store.open_writer(self.key)
+                self._writer = pq.ParquetWriter(self._file, self.schema, compression=self.compression)
+            self._writer.write(batch, row_group_size=batch.num_rows)
+            self.stats.update(batch)
+            self.row_groups += 1
+
+    def close(self, update_manifest: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Finaliza o arquivo e, por padrão, registra-o no manifesto da partição.
+        Retorna a entrada do manifesto, ou None se nenhum lote foi gravado (nada é criado).
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            self._closed = True
+            if self._writer is None:
+                return None
+            try:
+                self._writer.close()
+            except BaseException:
+                self._file.abort()
+                raise
+            self._file.close()
+        partition_key, _, arquivo = self.key.rpartition("/")
+        entry = self.stats.entry(arquivo, self.row_groups, self.schema.names)
+        if update_manifest:
+            update_partition_manifest(self.store, partition_key, entry)
+        logger.debug(f"Parquet '{self.key}': {self.registros} registros em {self.row_groups} row groups")
+        return entry
+
+    def abort(self) -> None:
+        """Descarta o que foi gravado."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._writer is None:
+                return
+            try:
+                self._writer.close()  # rodapé vai para a gravação descartada
+            except Exception:
+                pass
+            self._file.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
@@ -1,11 +1,15 @@
 """
 Script principal para execução de coletas de dados do Omie.
 Suporta coleta full e incremental (--incremental: últimos 5 dias).
+--reconcile: varredura de chaves que marca deleted_at nas linhas excluídas no Omie (rodar de vez em quando).
+--profile (ou PIPELINE_PROFILE=true): perfil de amostragem da execução em PIPELINE_PROFILE_DIR (.folded).
 """
 import sys
 from datetime import datetime, timedelta
 from src.orchestrator import DataOrchestrator
 from src.config import Settings
+from src.metrics import active_steps
+from src.utils.profiling import SamplingProfiler
 import logging
 
 logging.basicConfig(
@@ -20,12 +24,27 @@ INCREMENTAL_DAYS_DEFAULT = 5
 def main():
     """Função principal."""
     incremental = "--incremental" in sys.argv or "-i" in sys.argv
+    reconcile = "--reconcile" in sys.argv
+    orchestrator = None
+    profiler = None
     try:
         settings = Settings()
+        if "--profile" in sys.argv or settings.pipeline.PIPELINE_PROFILE:
+            profiler = SamplingProfiler(
+                settings.pipeline.PIPELINE_PROFILE_DIR,
+                interval=settings.pipeline.PIPELINE_PROFILE_INTERVAL_MS / 1000,
+                per_collector=settings.pipeline.PIPELINE_PROFILE_PER_COLLECTOR,
+                labeler=active_steps,
+            ).start()
         orchestrator = DataOrchestrator(settings)
         orchestrator.initialize_database()
         
-        if incremental:
+        if reconcile:
+            print("\n" + "="*80)
+            print("RECONCILIAÇÃO DE EXCLUSÕES OMIE (varredura de chaves)")
+            print("="*80 + "\n")
+            all_results = orchestrator.reconcile_deletions()
+        elif incremental:
             days = INCREMENTAL_DAYS_DEFAULT
             for i, arg in enumerate(sys.argv):
                 if arg in ("--incremental", "-i") and i + 1 < len(sys.argv) and sys.argv[i + 1].isdigit():
@@ -48,6 +67,8 @@ def main():
             print(f"Período: {data_inicio} a {data_fim}")
             print("="*80 + "\n")
             logger.info("Iniciando coletas gerais...")
+            # Uma execução no ledger para as coletas gerais e financeiras
+            orchestrator.ledger.start_run("full", data_inicio, data_fim)
             results_general = orchestrator.run_collections(parallel=False, max_workers=5)
             logger.info("Iniciando coletas financeiras...")
             results_financial = orchestrator.run_financial_collections(
@@ -72,14 +93,11 @@ def main():
         # Imprime métricas de performance
         orchestrator.print_metrics_summary()
         
-        # --- BIGQUERY / GCS: metadado da coleta (comentário para rastreabilidade) ---
-        # Aqui você pode montar o metadado (execucao_id, data_inicio, data_fim, modo,
-        # tabelas_coletadas, registros_por_tabela, etc.) e:
-        # 1) Gravar em JSON (ex.: metadata_coleta_YYYYMMDD_HHMMSS.json) para enviar ao GCS
-        # 2) Gravar em tabela MySQL execucao_coleta (opcional)
+        # Metadado da coleta (run_id, modo, janela, tempos e registros por coletor) vai para
+        # as tabelas runs/run_steps no cleanup (src.metrics.ledger).
         # Ver docs/BIGQUERY_GCS_PASSO_A_PASSO.md para o passo a passo completo (GCS → BigQuery).
         
-        # Limpa recursos
+        # Limpa recursos (grava o ledger da execução)
         orchestrator.cleanup()
         
         print("Coleta de dados concluída com sucesso!")
@@ -89,7 +107,13 @@ def main():
         sys.exit(0)
     except Exception as e:
         logger.error(f"Erro fatal: {str(e)}", exc_info=True)
+        if orchestrator is not None:
+            # Registra a execução interrompida (runs.success = 0) com os passos já concluídos
+            orchestrator.ledger.finish_run(error_message=str(e))
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.stop()
 
 
 if __name__ == "__main__":
@@ -2,5 +2,12 @@
 Módulo de métricas de performance.
 """
 from src.metrics.collector import MetricsCollector, MetricRecord
+from src.metrics.ledger import (
+    RUN_STEPS_TABLE, RUNS_TABLE, RunLedger, RunStep, active_steps, add_to_step, current_step,
+)
+from src.metrics.writer import API_METRICS_SCHEMA, API_METRICS_TABLE, MetricsWriter
 
-__all__ = ["MetricsCollector", "MetricRecord"]
+__all__ = [
+    "API_METRICS_SCHEMA", "API_METRICS_TABLE", "MetricsCollector", "MetricRecord", "MetricsWriter",
+    "RUN_STEPS_TABLE", "RUNS_TABLE", "RunLedger", "RunStep", "active_steps", "add_to_step", "current_step",
+]
@@ -0,0 +1,276 @@
+"""
+Registro de execuções (run ledger): uma linha em runs por execução da coleta e uma em
+run_steps por coletor executado, com modo, janela, páginas, bytes, o tempo de cada fase
+(API, espera de rate limit, transformação, carga) e as contagens da carga.
+
+Os tempos são somados no passo corrente da thread (current_step / add_to_step): o cliente
+da API e os coletores acumulam neles sem conhecer o ledger. A carga nos workers do
+pipeline roda em outras threads e é medida com RunStep.timed(). Tudo fica em memória até
+finish_run(), que grava cada tabela num único insert_batch.
+"""
+import time
+import uuid
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from src.core.interfaces import IDatabaseManager
+
+logger = logging.getLogger(__name__)
+
+RUNS_TABLE = "runs"
+RUN_STEPS_TABLE = "run_steps"
+RUNS_SCHEMA = {
+    'run_id': 'VARCHAR(36) PRIMARY KEY',
+    'mode': 'VARCHAR(20)',
+    'window_start': 'DATE',
+    'window_end': 'DATE',
+    'started_at': 'DATETIME',
+    'finished_at': 'DATETIME',
+    'duration': 'DECIMAL(10,2)',
+    'steps': 'INT',
+    'steps_ok': 'INT',
+    'steps_failed': 'INT',
+    'pages': 'INT',
+    'api_bytes': 'BIGINT',
+    'rows_inserted': 'BIGINT',
+    'rows_updated': 'BIGINT',
+    'rows_unchanged': 'BIGINT',
+    'success': 'TINYINT(1)',
+    'error_message': 'TEXT',
+}
+# Sem id substituto: (run_id, collector) identifica o passo. Um AUTO_INCREMENT vira INTEGER no
+# BigQuery, e o insert_batch dele preenche id ausente com UUID, o que rejeitaria as linhas
+RUN_STEPS_SCHEMA = {
+    'run_id': 'VARCHAR(36)',
+    'collector': 'VARCHAR(100)',
+    'mode': 'VARCHAR(20)',
+    'window_start': 'DATE',
+    'window_end': 'DATE',
+    'started_at': 'DATETIME',
+    'finished_at': 'DATETIME',
+    'duration': 'DECIMAL(10,2)',
+    'pages': 'INT',
+    'api_bytes': 'BIGINT',
+    'api_time': 'DECIMAL(10,2)',
+    'sleep_time': 'DECIMAL(10,2)',
+    'transform_time': 'DECIMAL(10,2)',
+    'load_time': 'DECIMAL(10,2)',
+    'rows_fetched': 'BIGINT',
+    'rows_inserted': 'BIGINT',
+    'rows_updated': 'BIGINT',
+    'rows_unchanged': 'BIGINT',
+    'rows_deleted': 'BIGINT',
+    'success': 'TINYINT(1)',
+    'error_message': 'TEXT',
+}
+# Consultas do dashboard: última execução, passos de uma execução, histórico por coletor
+RUNS_INDEXES = {'idx_runs_started_at': ['started_at']}
+RUN_STEPS_INDEXES = {
+    'idx_run_steps_run_id': ['run_id'],
+    'idx_run_steps_collector': ['collector', 'started_at'],
+}
+
+_TIMINGS = ("api_time", "sleep_time", "transform_time", "load_time")
+_COUNTERS = ("pages", "api_bytes", "rows_fetched")
+_local = threading.local()
+# Passo por thread (ident), inclusive workers de carga durante RunStep.timed(); lido pelo
+# profiler de amostragem (src.utils.profiling) para separar as amostras por coletor
+_active: Dict[int, "RunStep"] = {}
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _data(valor: Any) -> Optional[str]:
+    """Janela do coletor (YYYY-MM-DD ou DD/MM/YYYY) como DATE; outros valores viram NULL."""
+    if not valor:
+        return None
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(str(valor), formato).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def current_step() -> Optional["RunStep"]:
+    """Passo em execução na thread atual (None fora de uma coleta)."""
+    return getattr(_local, "step", None)
+
+
+def active_steps() -> Dict[int, str]:
+    """{ident da thread: coletor} das threads trabalhando para algum passo agora."""
+    return {ident: step.collector for ident, step in list(_active.items())}
+
+
+def add_to_step(**valores: float) -> None:
+    """Soma tempos/contadores no passo da thread atual; sem passo, não faz nada."""
+    step = current_step()
+    if step is not None:
+        step.add(**valores)
+
+
+class RunStep:
+    """Tempos e contadores de um coletor numa execução (thread-safe)."""
+
+    def __init__(self, run_id: str, collector: str, mode: str,
+                 window_start: Optional[str] = None, window_end: Optional[str] = None):
+        self.run_id = run_id
+        self.collector = collector
+        self.mode = mode
+        self.window_start = window_start
+        self.window_end = window_end
+        self.started_at = _agora()
+        self._inicio = time.perf_counter()
+        self._load_timed = False
+        self._lock = threading.Lock()
+        self.values: Dict[str, float] = dict.fromkeys(_TIMINGS + _COUNTERS, 0)
+
+    def add(self, **valores: float) -> None:
+        with self._lock:
+            for campo, valor in valores.items():
+                self.values[campo] += valor
+
+    def timed(self, fn: Callable, field: str = "load_time") -> Callable:
+        """fn embrulhada para somar o próprio tempo em field (para chamadas em outras threads)."""
+        if field == "load_time":
+            self._load_timed = True
+
+        def wrapper(*args, **kwargs):
+            ident = threading.get_ident()
+            anterior = _active.get(ident)
+            _active[ident] = self
+            inicio = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(**{field: time.perf_counter() - inicio})
+                if anterior is None:
+                    _active.pop(ident, None)
+                else:
+                    _active[ident] = anterior
+        return wrapper
+
+    def row(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Linha de run_steps a partir do resultado de collect_data."""
+        duration = time.perf_counter() - self._inicio
+        with self._lock:
+            values = dict(self.values)
+        if not self._load_timed:
+            # Caminho síncrono (coleta e carga na mesma thread): a carga é o tempo restante
+            values["load_time"] = max(0.0, duration - values["api_time"] - values["sleep_time"] - values["transform_time"])
+        success = bool(result.get("success"))
+        return {
+            'run_id': self.run_id,
+            'collector': self.collector,
+            'mode': self.mode,
+            'window_start': self.window_start,
+            'window_end': self.window_end,
+            'started_at': self.started_at,
+            'finished_at': _agora(),
+            'duration': round(duration, 2),
+            'pages': int(values["pages"]),
+            'api_bytes': int(values["api_bytes"]),
+            **{campo: round(values[campo], 2) for campo in _TIMINGS},
+            'rows_fetched': int(values["rows_fetched"]),
+            'rows_inserted': int(result.get("inserted", result.get("records", 0)) or 0),
+            'rows_updated': int(result.get("updated", 0) or 0),
+            'rows_unchanged': int(result.get("unchanged", 0) or 0),
+            'rows_deleted': int(result.get("deleted", 0) or 0),
+            'success': 1 if success else 0,
+            'error_message': None if success else str(result.get("message") or "")[:2000] or None,
+        }
+
+
+class RunLedger:
+    """
+    Execução corrente e seus passos, gravados em runs/run_steps no finish_run().
+    begin_step() sem start_run() abre a execução (modo pelo kwarg incremental).
+    """
+
+    def __init__(self, db_manager: IDatabaseManager):
+        self.db_manager = db_manager
+        self._lock = threading.Lock()
+        self._run: Optional[Dict[str, Any]] = None
+        self._steps: List[Dict[str, Any]] = []
+        self._tables_ready = False
+
+    @property
+    def run_id(self) -> Optional[str]:
+        return self._run["run_id"] if self._run else None
+
+    def start_run(self, mode: str, window_start: Any = None, window_end: Any = None) -> str:
+        """Abre a execução (se já houver uma aberta, devolve o id dela)."""
+        with self._lock:
+            if self._run is None:
+                self._run = {
+                    'run_id': str(uuid.uuid4()),
+                    'mode': mode,
+                    'window_start': _data(window_start),
+                    'window_end': _data(window_end),
+                    'started_at': _agora(),
+                    '_inicio': time.perf_counter(),
+                }
+                logger.info(f"Execução {self._run['run_id']} iniciada (modo {mode})")
+            return self._run["run_id"]
+
+    def begin_step(self, collector: str, **kwargs) -> RunStep:
+        """Cria o passo do coletor e o torna o passo corrente da thread."""
+        self.start_run("incremental" if kwargs.get("incremental") else "full")
+        step = RunStep(self._run["run_id"], collector, self._run["mode"],
+                       _data(kwargs.get("data_inicio")), _data(kwargs.get("data_fim")))
+        _local.step = step
+        _active[threading.get_ident()] = step
+        return step
+
+    def end_step(self, step: RunStep, result: Dict[str, Any]) -> None:
+        if current_step() is step:
+            _local.step = None
+            _active.pop(threading.get_ident(), None)
+        row = step.row(result)
+        with self._lock:
+            self._steps.append(row)
+
+    def _ensure_tables(self):
+        if not self._tables_ready:
+            self.db_manager.create_table(RUNS_TABLE, RUNS_SCHEMA, indexes=RUNS_INDEXES)
+            self.db_manager.create_table(RUN_STEPS_TABLE, RUN_STEPS_SCHEMA, indexes=RUN_STEPS_INDEXES)
+            self._tables_ready = True
+
+    def finish_run(self, error_message: Optional[str] = None) -> Optional[str]:
+        """Fecha a execução e grava runs/run_steps (um insert_batch por tabela). Retorna o run_id."""
+        with self._lock:
+            run, steps = self._run, self._steps
+            self._run, self._steps = None, []
+        if run is None:
+            return None
+        falhas = [s for s in steps if not s['success']]
+        run.update({
+            'finished_at': _agora(),
+            'duration': round(time.perf_counter() - run.pop('_inicio'), 2),
+            'steps': len(steps),
+            'steps_ok': len(steps) - len(falhas),
+            'steps_failed': len(falhas),
+            'pages': sum(s['pages'] for s in steps),
+            'api_bytes': sum(s['api_bytes'] for s in steps),
+            'rows_inserted': sum(s['rows_inserted'] for s in steps),
+            'rows_updated': sum(s['rows_updated'] for s in steps),
+            'rows_unchanged': sum(s['rows_unchanged'] for s in steps),
+            'success': 0 if (falhas or error_message) else 1,
+            'error_message': str(error_message)[:2000] if error_message else None,
+        })
+        try:
+            self._ensure_tables()
+            if steps:
+                self.db_manager.insert_batch(RUN_STEPS_TABLE, steps)
+            self.db_manager.insert_batch(RUNS_TABLE, [run])
+            logger.info(
+                f"Execução {run['run_id']} gravada: {len(steps)} passos, {run['duration']}s, "
+                f"{run['pages']} páginas, {run['api_bytes']} bytes"
+            )
+        except Exception as e:
+            logger.warning(f"Erro ao gravar a execução {run['run_id']} em {RUNS_TABLE}/{RUN_STEPS_TABLE}: {str(e)}")
+        return run['run_id']
@@ -0,0 +1,106 @@
+"""
+Gravação de métricas de coleta (api_metrics, uma linha por coleta; lida pelo /api/metrics e
+por consumidores externos) fora do caminho crítico: record() só enfileira
+em memória; uma thread em segundo plano grava o buffer num único insert_batch a cada
+flush_interval segundos (ou quando o buffer enche) e close() grava o restante no fim da
+execução. A tabela é criada uma vez por processo, na primeira gravação.
+"""
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from src.core.interfaces import IDatabaseManager
+
+logger = logging.getLogger(__name__)
+
+API_METRICS_TABLE = "api_metrics"
+# Sem id AUTO_INCREMENT: no BigQuery ele vira INTEGER e o insert_batch não tem como preenchê-lo
+API_METRICS_SCHEMA = {
+    'operation': 'VARCHAR(100)',
+    'duration': 'DECIMAL(10,2)',
+    'success': 'TINYINT(1)',
+    'records_count': 'INT',
+    'error_message': 'TEXT',
+    'created_at': 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'
+}
+
+
+class MetricsWriter:
+    """
+    Buffer de métricas com gravação em lote.
+    flush_interval <= 0: sem thread, grava só no flush()/close() (fim da execução).
+    """
+
+    def __init__(self, db_manager: IDatabaseManager, flush_interval: float = 30.0, max_buffer: int = 200):
+        self.db_manager = db_manager
+        self.flush_interval = flush_interval
+        self.max_buffer = max(1, max_buffer)
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # um insert por vez (thread e close)
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._table_ready = False
+        self._thread: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+            self._thread.start()
+
+    def record(self, operation: str, duration: float, success: bool, records_count: int,
+               error_message: Optional[str] = None) -> None:
+        """Enfileira uma métrica (não acessa o banco)."""
+        # BigQuery NUMERIC(10,2) exige 2 decimais; created_at no momento do registro, não do flush
+        row = {
+            'operation': operation,
+            'duration': round(float(duration), 2),
+            'success': 1 if success else 0,
+            'records_count': int(records_count),
+            'error_message': str(error_message) if error_message else None,
+            'created_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        }
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            if self._thread is not None:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def _ensure_table(self):
+        if not self._table_ready:
+            self.db_manager.create_table(API_METRICS_TABLE, API_METRICS_SCHEMA)
+            self._table_ready = True
+
+    def flush(self) -> int:
+        """Grava o buffer num único insert_batch; retorna o nº de métricas gravadas."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                self._ensure_table()
+                self.db_manager.insert_batch(API_METRICS_TABLE, rows)
+                logger.debug(f"{len(rows)} métricas gravadas em {API_METRICS_TABLE}")
+                return len(rows)
+            except Exception as e:
+                logger.warning(f"Erro ao salvar {len(rows)} métricas no banco: {str(e)}")
+                return 0
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Para a thread e grava o que restou no buffer."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._thread is not None:
+            self._wake.set()
+            self._thread.join()
+        self.flush()
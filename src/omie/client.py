@@ -8,7 +8,9 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from src.core.interfaces import IApiClient
 from src.config import OmieSettings
+from src.metrics.ledger import add_to_step
 from src.omie.auth import OmieAuthenticator
+from src.utils import json_codec
 import logging
 
 logger = logging.getLogger(__name__)
@@ -76,6 +78,22 @@ class OmieApiClient(IApiClient):
         Returns:
             Resposta da API como dicionário
             
+        Raises:
+            requests.RequestException: Em caso de erro na requisição
+        """
+        # Decodifica direto dos bytes (orjson quando instalado)
+        return json_codec.loads(self.request_raw(endpoint, method, payload))
+
+    def request_raw(
+        self,
+        endpoint: str,
+        method: str,
+        payload: Dict[str, Any]
+    ) -> bytes:
+        """
+        Executa uma requisição à API Omie e retorna o corpo da resposta sem decodificar
+        (a decodificação pode ser feita em outro processo; ver src.pipeline.transform).
+        
         Raises:
             requests.RequestException: Em caso de erro na requisição
         """
@@ -95,6 +113,7 @@ class OmieApiClient(IApiClient):
                 time.sleep(1.0)  # 1 segundo para extrato
             else:
                 time.sleep(0.3)  # 300ms para outras APIs
+            api_start = time.time()
             
             # Pedidos de compra: API Omie pode demorar (ex.: nbronze usa timeout=120)
             timeout = 120 if "pedidocompra" in endpoint.lower() else self.settings.TIMEOUT
@@ -105,10 +124,13 @@ class OmieApiClient(IApiClient):
                 headers={"Content-Type": "application/json"}
             )
             elapsed_time = time.time() - start_time
+            # Ledger de execuções: espera de rate limit e tempo de API separados
+            add_to_step(pages=1, api_bytes=len(response.content), sleep_time=api_start - start_time,
+                        api_time=time.time() - api_start)
 
             if response.status_code >= 400:
                 try:
-                    body = response.json()
+                    body = json_codec.loads(response.content)
                     msg = body.get("faultstring") or body.get("message") or str(body)[:500]
                 except Exception:
                     msg = response.text[:500] if response.text else "(sem corpo)"
@@ -117,14 +139,13 @@ class OmieApiClient(IApiClient):
                 )
 
             response.raise_for_status()
-            result = response.json()
             
             logger.info(
                 f"API Request: endpoint={endpoint} call={method} - "
                 f"Status: {response.status_code} - Time: {elapsed_time:.2f}s"
             )
             
-            return result
+            return response.content
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Erro na requisição endpoint={endpoint} call={method}: {str(e)}")
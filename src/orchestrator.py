@@ -4,6 +4,8 @@ Suporta coleta full e incremental (janela de datas).
 Na Vercel só usa BigQuery (MySQL não existe em ambiente serverless).
 """
 import os
+import tempfile
+import threading
 import concurrent.futures
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
@@ -12,7 +14,14 @@ from src.config import Settings
 from src.omie import OmieApiClient
 from src.database import DatabaseManager
 from src.bigquery import BigQueryManager
-from src.metrics import MetricsCollector
+from src.metrics import MetricsCollector, MetricsWriter, RunLedger, current_step
+from src.pipeline import KeyIndex, LoadPipeline
+from src.pipeline.columnar import arrow_available
+from src.pipeline.transform import TransformPool
+from src.utils.row_hash import (
+    DELETED_AT_COLUMN, DELETED_AT_SQL_TYPE, ROW_HASH_COLUMN, ROW_HASH_SQL_TYPE, key_fingerprint,
+)
+from src.collectors.shape_cache import configure_shape_cache
 from src.collectors import (
     ClientesCollector,
     ProdutosCollector,
@@ -41,8 +50,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Tamanho do lote para inserção no MySQL (evita "Lost connection" em tabelas grandes)
-INSERT_BATCH_SIZE = 500
+# Abaixo deste número de linhas ausentes a trava de proporção da reconciliação não se aplica
+RECONCILE_GUARD_MIN_ROWS = 10
 
 
 class DataOrchestrator:
@@ -79,6 +88,17 @@ class DataOrchestrator:
         else:
             self.db_manager = DatabaseManager(self.settings.database)
         self.metrics = MetricsCollector()
+        self.metrics_writer = MetricsWriter(
+            self.db_manager,
+            flush_interval=self.settings.pipeline.PIPELINE_METRICS_FLUSH_SECONDS,
+            max_buffer=self.settings.pipeline.PIPELINE_METRICS_BUFFER_ROWS,
+        )
+        # Execução corrente e tempos por coletor/fase (runs/run_steps, gravados no cleanup)
+        self.ledger = RunLedger(self.db_manager)
+        configure_shape_cache(self.settings.pipeline.PIPELINE_SHAPE_CACHE, self.settings.pipeline.PIPELINE_SHAPE_CACHE_PATH)
+        # Pipeline de carga (criado na primeira coleta com PIPELINE_ENABLED)
+        self._pipeline: Optional[LoadPipeline] = None
+        self._pipeline_lock = threading.Lock()
         
         # Registra todos os coletores disponíveis
         self.collectors = [
@@ -102,36 +122,18 @@ class DataOrchestrator:
             NfseCollector(self.api_client),
             NfConsultarCollector(self.api_client),
         ]
+        # Pool de processos para transform_data dos coletores marcados com process_transform
+        self._transform_pool: Optional[TransformPool] = None
+        workers = self.settings.pipeline.PIPELINE_TRANSFORM_WORKERS
+        if workers > 0:
+            self._transform_pool = TransformPool(workers, self.settings.pipeline.PIPELINE_TRANSFORM_IN_FLIGHT)
+            for collector in self.collectors:
+                if collector.process_transform:
+                    collector.transform_pool = self._transform_pool
     
     def _save_metric_to_db(self, operation: str, duration: float, success: bool, records_count: int, error_message: str = None):
-        """Salva métrica no banco de dados."""
-        try:
-            # Cria tabela se não existir
-            self.db_manager.create_table('api_metrics', {
-                'id': 'BIGINT PRIMARY KEY AUTO_INCREMENT',
-                'operation': 'VARCHAR(100)',
-                'duration': 'DECIMAL(10,2)',
-                'success': 'TINYINT(1)',
-                'records_count': 'INT',
-                'error_message': 'TEXT',
-                'created_at': 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'
-            })
-            
-            # Insere métrica usando insert_batch (BigQuery NUMERIC(10,2) exige 2 decimais; enviar created_at)
-            from datetime import datetime
-            metric_data = [{
-                'operation': operation,
-                'duration': round(float(duration), 2),
-                'success': 1 if success else 0,
-                'records_count': int(records_count),
-                'error_message': str(error_message) if error_message else None,
-                'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-            }]
-            
-            # Usa insert_batch que já trata a criação da tabela
-            self.db_manager.insert_batch('api_metrics', metric_data)
-        except Exception as e:
-            logger.warning(f"Erro ao salvar métrica no banco: {str(e)}")
+        """Enfileira a métrica; a gravação em api_metrics é em lote, fora do caminho da coleta."""
+        self.metrics_writer.record(operation, duration, success, records_count, error_message)
     
     def initialize_database(self):
         """Inicializa o banco de dados e cria todas as tabelas."""
@@ -145,6 +147,8 @@ class DataOrchestrator:
             for collector in self.collectors:
                 table_name = collector.get_table_name()
                 schema = collector.get_schema()
+                if self._change_keys(collector):
+                    schema = {**schema, ROW_HASH_COLUMN: ROW_HASH_SQL_TYPE, DELETED_AT_COLUMN: f"{DELETED_AT_SQL_TYPE} NULL"}
                 self.db_manager.create_table(table_name, schema)
             
             logger.info("Banco de dados inicializado com sucesso")
@@ -153,6 +157,306 @@ class DataOrchestrator:
             logger.error(f"Erro ao inicializar banco de dados: {str(e)}")
             raise
     
+    def _get_pipeline(self) -> LoadPipeline:
+        """Retorna o pipeline de carga, compartilhado por todos os coletores."""
+        with self._pipeline_lock:
+            if self._pipeline is None:
+                cfg = self.settings.pipeline
+                self._pipeline = LoadPipeline(
+                    self.db_manager,
+                    workers=cfg.PIPELINE_LOADER_WORKERS,
+                    max_pending_batches=cfg.PIPELINE_QUEUE_BATCHES,
+                )
+            return self._pipeline
+    
+    def _open_key_index(self, table_name: str, key_columns: List[str]) -> Optional[KeyIndex]:
+        """
+        Índice local de chaves da tabela (None se desativado ou sem suporte no backend).
+        Reconstruído a partir do banco quando não existe, passou de PIPELINE_KEY_INDEX_MAX_AGE_HOURS
+        ou o token da tabela (contagem + maiores chaves) não bate com o gravado no índice
+        (tabela esvaziada/recarregada fora do pipeline: chaves velhas descartariam registros novos).
+        """
+        cfg = self.settings.pipeline
+        if not cfg.PIPELINE_KEY_INDEX or not hasattr(self.db_manager, 'iter_keys'):
+            return None
+        directory = cfg.PIPELINE_KEY_INDEX_DIR or os.path.join(tempfile.gettempdir(), "omie_key_index")
+        index = KeyIndex(os.path.join(directory, f"{table_name}.keyidx"))
+        token = self._table_token(table_name, key_columns)
+        age = index.age_seconds()
+        if age is None or age > cfg.PIPELINE_KEY_INDEX_MAX_AGE_HOURS * 3600 or not index.matches(token):
+            if age is not None and not index.matches(token):
+                logger.info(f"Índice de chaves de '{table_name}' não confere com a tabela; reconstruindo")
+            index.rebuild(
+                ([key_fingerprint(k) for k in batch]
+                 for batch in self.db_manager.iter_keys(table_name, key_columns)),
+                token=token,
+            )
+        return index
+    
+    def _table_token(self, table_name: str, key_columns: List[str]) -> Optional[int]:
+        """Impressão digital do token da tabela (None se o backend não souber calcular)."""
+        if not hasattr(self.db_manager, 'table_token'):
+            return None
+        token = self.db_manager.table_token(table_name, key_columns)
+        return None if token is None else key_fingerprint(token)
+    
+    def _filter_new_records(
+        self, records: List[Dict[str, Any]], key_columns: List[str], key_index: Optional[KeyIndex], existing: Optional[set]
+    ) -> List[Dict[str, Any]]:
+        """
+        Mantém só registros cuja chave ainda não existe no banco (nem apareceu antes nesta carga).
+        Com índice: verificação vetorizada do lote inteiro; as chaves novas entram no delta do índice.
+        Sem índice: set de chaves de get_existing_keys (comportamento anterior).
+        """
+        if key_index is None:
+            new_records = []
+            for r in records:
+                k = self.db_manager.get_key_from_record(r, key_columns)
+                if k is not None and k not in existing:
+                    new_records.append(r)
+                    existing.add(k)
+            return new_records
+        keyed = []
+        for r in records:
+            k = self.db_manager.change_key(r, key_columns)
+            if k is not None:
+                keyed.append((r, key_fingerprint(k)))
+        present = key_index.contains_many([fp for _, fp in keyed])
+        new_records, new_fps = [], set()
+        for (r, fp), hit in zip(keyed, present):
+            if not hit and fp not in new_fps:
+                new_records.append(r)
+                new_fps.add(fp)
+        key_index.add_many(new_fps)
+        return new_records
+    
+    def _change_keys(self, collector) -> List[str]:
+        """Chave da detecção de mudanças (_row_hash) do coletor; [] se desativada ou sem suporte no backend."""
+        if not self.settings.pipeline.PIPELINE_ROW_HASH or not hasattr(self.db_manager, 'sync_rows'):
+            return []
+        return getattr(collector, 'get_change_key_columns', lambda: [])()
+    
+    def _is_full_scan(self, collector, **kwargs) -> bool:
+        """
+        True se a coleta traz o conjunto completo da origem (equivale ao antigo TRUNCATE + INSERT):
+        sem janela de datas e sem chave incremental. Só então linhas ausentes podem ser removidas.
+        """
+        if kwargs.get('incremental') and collector.supports_incremental():
+            return False
+        if kwargs.get('data_inicio') or kwargs.get('data_fim'):
+            return False
+        return not collector.get_unique_key_columns()
+    
+    def _mark_missing(self, collector, key_columns: List[str], seen: set) -> int:
+        """
+        Reconciliação: marca deleted_at nas linhas ativas cuja chave não apareceu na varredura completa.
+        seen: impressões digitais (key_fingerprint) das chaves vistas na origem.
+        Não marca nada se a varredura não chegou ao fim ou se removeria uma fração suspeita da tabela.
+        """
+        table_name = collector.get_table_name()
+        if not getattr(collector, 'last_scan_complete', False):
+            logger.warning(f"Reconciliação de '{table_name}' ignorada: varredura da origem incompleta")
+            return 0
+        active = self.db_manager.get_active_keys(table_name, key_columns)
+        missing = [k for k in active if key_fingerprint(k) not in seen]
+        if not missing:
+            return 0
+        max_ratio = self.settings.pipeline.PIPELINE_RECONCILE_MAX_DELETE_RATIO
+        if len(missing) > RECONCILE_GUARD_MIN_ROWS and len(missing) > max_ratio * len(active):
+            logger.warning(
+                f"Reconciliação de '{table_name}' ignorada: {len(missing)} de {len(active)} linhas ausentes "
+                f"na origem (acima de {max_ratio:.0%}); verifique a coleta"
+            )
+            return 0
+        return self.db_manager.mark_deleted(table_name, key_columns, missing)
+    
+    def reconcile_deletions(self, collectors: Optional[List] = None) -> List[Dict[str, Any]]:
+        """
+        Varredura completa só de chaves: compara o conjunto de chaves da origem com o gravado
+        e marca deleted_at nas linhas excluídas no Omie. Nada além de deleted_at é escrito,
+        então pode rodar de vez em quando entre as cargas incrementais diárias.
+        
+        Args:
+            collectors: Coletores a reconciliar (padrão: todos com chave de detecção de mudanças)
+            
+        Returns:
+            Lista com resultado por tabela (records = linhas marcadas como excluídas)
+        """
+        if not hasattr(self.db_manager, 'mark_deleted'):
+            logger.warning("Reconciliação não suportada pelo banco configurado")
+            return []
+        targets = [c for c in (collectors or self.collectors) if self._change_keys(c)]
+        results = []
+        self.ledger.start_run("reconcile")
+        for collector in targets:
+            table_name = collector.get_table_name()
+            key_columns = self._change_keys(collector)
+            timer_id = self.metrics.start_timer(f"{table_name}_reconcile")
+            step = self.ledger.begin_step(table_name)
+            try:
+                seen = set()
+                for page in collector.iter_pages():
+                    for r in page:
+                        k = self.db_manager.change_key(r, key_columns)
+                        if k is not None:
+                            seen.add(key_fingerprint(k))
+                marked = self._mark_missing(collector, key_columns, seen)
+                self.metrics.stop_timer(timer_id, success=True, records_count=marked)
+                results.append({
+                    "collector": table_name,
+                    "success": True,
+                    "records": marked,
+                    "message": f"{len(seen)} chaves na origem, {marked} marcadas como excluídas"
+                })
+            except Exception as e:
+                self.metrics.stop_timer(timer_id, success=False, records_count=0, error_message=str(e))
+                logger.error(f"Erro na reconciliação de {table_name}: {e}")
+                results.append({"collector": table_name, "success": False, "records": 0, "message": str(e)})
+            # Reconciliação só marca exclusões: records são linhas deleted_at, não inseridas
+            self.ledger.end_step(step, {**results[-1], "inserted": 0, "deleted": results[-1]["records"]})
+        return results
+    
+    @staticmethod
+    def _change_stats_message(stats: Dict[str, int]) -> str:
+        msg = f"{stats['inserted']} novos, {stats['updated']} alterados, {stats['unchanged']} inalterados"
+        if stats.get('deleted'):
+            msg += f", {stats['deleted']} marcados como excluídos"
+        return msg
+    
+    def _collect_streaming(self, collector, **kwargs) -> Dict[str, int]:
+        """
+        Coleta e carga sobrepostas: cada página é enfileirada para os workers de carga
+        enquanto a próxima é buscada na API.
+        
+        Returns:
+            Contagens da carga: records (gravados) e, com detecção de mudanças,
+            inserted/updated/unchanged/deleted
+        """
+        table_name = collector.get_table_name()
+        change_keys = self._change_keys(collector)
+        key_columns = getattr(collector, 'get_unique_key_columns', lambda: [])()
+        incremental_keys = bool(
+            key_columns and hasattr(self.db_manager, 'get_existing_keys') and hasattr(self.db_manager, 'get_key_from_record')
+        )
+        pipeline = self._get_pipeline()
+        pipeline.begin(table_name)
+        
+        existing = None
+        key_index = None
+        stored = None
+        # BigQuery: linhas alteradas acumuladas e gravadas num único MERGE no fim da coleta
+        buffered = bool(change_keys) and getattr(self.db_manager, 'buffer_changes', False)
+        pending_changes: Dict[Any, Dict[str, Any]] = {}
+        inserted_keys = set()
+        keyless: List[Dict[str, Any]] = []
+        if change_keys:
+            stored = self.db_manager.get_row_hashes(table_name, change_keys)
+            stats = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+            seen = set()
+            write_inserts = lambda t, rows: self.db_manager.write_changes(t, rows, [], change_keys)
+            write_updates = lambda t, rows: self.db_manager.write_changes(t, [], rows, change_keys)
+        elif incremental_keys:
+            key_index = self._open_key_index(table_name, key_columns)
+            if key_index is None:
+                existing = self.db_manager.get_existing_keys(table_name, key_columns)
+        
+        # Full refresh: as páginas vão para uma staging, trocada pela tabela só no fim e com sucesso;
+        # falha no meio da coleta (rate limit, rede) deixa a tabela como estava
+        staging = None
+        loader = None
+        if stored is None and not incremental_keys:
+            staging = self.db_manager.begin_staging(table_name)
+            loader = lambda t, rows: self.db_manager.insert_batch(staging, rows)
+        
+        step = current_step()
+        if step is not None:
+            # Carga roda nos workers do pipeline: o tempo é medido no próprio loader
+            loader = step.timed(loader or self.db_manager.insert_batch)
+            write_inserts = step.timed(write_inserts) if stored is not None else None
+            write_updates = step.timed(write_updates) if stored is not None else None
+        
+        total_coletado = 0
+        try:
+            try:
+                for page in collector.iter_pages(**kwargs):
+                    total_coletado += len(page)
+                    if stored is not None:
+                        changes = self.db_manager.classify_changes(table_name, page, change_keys, stored)
+                        seen.update(key_fingerprint(k) for k in changes.seen)
+                        stats["inserted"] += len(changes.inserts)
+                        stats["updated"] += len(changes.updates)
+                        stats["unchanged"] += changes.unchanged
+                        if buffered:
+                            # Mesma chave em páginas diferentes: vale a última (o MERGE aceita uma linha por chave)
+                            for is_insert, rows in ((True, changes.inserts), (False, changes.updates)):
+                                for row in rows:
+                                    k = self.db_manager.change_key(row, change_keys)
+                                    if k is None:
+                                        keyless.append(row)
+                                        continue
+                                    pending_changes[k] = row
+                                    if is_insert:
+                                        inserted_keys.add(k)
+                            continue
+                        pipeline.submit(table_name, changes.inserts, loader=write_inserts)
+                        pipeline.submit(table_name, changes.updates, loader=write_updates)
+                        continue
+                    if incremental_keys:
+                        page = self._filter_new_records(page, key_columns, key_index, existing)
+                    pipeline.submit(table_name, page, loader=loader)
+            finally:
+                # Mesmo com erro na coleta: nenhum lote desta tabela continua gravando depois do retorno
+                records_inserted, errors = pipeline.wait(table_name)
+            if errors:
+                raise RuntimeError(f"{len(errors)} lote(s) falharam na carga de '{table_name}': {errors[0]}")
+            if buffered and (pending_changes or keyless):
+                inserts = keyless + [r for k, r in pending_changes.items() if k in inserted_keys]
+                updates = [r for k, r in pending_changes.items() if k not in inserted_keys]
+                write = lambda: self.db_manager.write_changes(table_name, inserts, updates, change_keys)
+                records_inserted += (step.timed(write) if step is not None else write)()
+            if staging is not None:
+                self.db_manager.commit_staging(table_name, staging)
+                staging = None
+        except BaseException:
+            if staging is not None:
+                self.db_manager.abort_staging(staging)
+            if key_index is not None:
+                key_index.invalidate()
+            raise
+        logger.info(f"Pipeline '{table_name}': {records_inserted} gravados de {total_coletado} coletados")
+        if key_index is not None:
+            key_index.flush(token=self._table_token(table_name, key_columns))
+        if stored is None:
+            return {"records": records_inserted}
+        if self._is_full_scan(collector, **kwargs):
+            stats["deleted"] = self._mark_missing(collector, change_keys, seen)
+        stats["records"] = stats["inserted"] + stats["updated"]
+        return stats
+    
+    def _use_streaming(self, collector) -> bool:
+        """
+        Coleta e carga sobrepostas (PIPELINE_ENABLED). Full refresh só em streaming se o backend
+        tem staging com troca no fim (begin_staging); senão coleta tudo antes de substituir a tabela.
+        """
+        if not self.settings.pipeline.PIPELINE_ENABLED or not hasattr(collector, 'iter_pages'):
+            return False
+        if self._change_keys(collector):
+            return True
+        key_columns = getattr(collector, 'get_unique_key_columns', lambda: [])()
+        if key_columns and hasattr(self.db_manager, 'get_existing_keys') and hasattr(self.db_manager, 'get_key_from_record'):
+            return True
+        return hasattr(self.db_manager, 'begin_staging')
+    
+    def _use_columnar(self, collector) -> bool:
+        """Caminho colunar só para full refresh (sem chaves de mudança/únicas) com pyarrow disponível."""
+        if not self.settings.pipeline.PIPELINE_COLUMNAR or not arrow_available():
+            return False
+        if not hasattr(self.db_manager, 'load_arrow') or not hasattr(collector, 'iter_record_batches'):
+            return False
+        if self._change_keys(collector):
+            return False
+        return not getattr(collector, 'get_unique_key_columns', lambda: [])()
+
     def collect_data(
         self, 
         collector, 
@@ -160,6 +464,7 @@ class DataOrchestrator:
     ) -> Dict[str, Any]:
         """
         Coleta dados de um coletor específico.
+        Registra o passo no ledger da execução (run_steps) com os tempos por fase.
         
         Args:
             collector: Instância do coletor
@@ -168,10 +473,51 @@ class DataOrchestrator:
         Returns:
             Dicionário com resultado da coleta
         """
+        step = self.ledger.begin_step(collector.get_table_name(), **kwargs)
+        result = {"collector": collector.get_table_name(), "success": False, "records": 0, "message": "interrompido"}
+        try:
+            result = self._collect_data(collector, **kwargs)
+            return result
+        finally:
+            self.ledger.end_step(step, result)
+
+    def _collect_data(self, collector, **kwargs) -> Dict[str, Any]:
         operation_name = f"{collector.get_table_name()}_collect"
         timer_id = self.metrics.start_timer(operation_name)
         
         try:
+            if self._use_streaming(collector):
+                # Busca e carga em paralelo (tempo total ~ a etapa mais lenta, não a soma)
+                stats = self._collect_streaming(collector, **kwargs)
+                records_inserted = stats["records"]
+                duration = self.metrics.stop_timer(timer_id, success=True, records_count=records_inserted)
+                self._save_metric_to_db(operation_name, duration, True, records_inserted)
+                result = {
+                    "collector": collector.get_table_name(),
+                    "success": True,
+                    "records": records_inserted,
+                    "message": f"{records_inserted} registros inseridos"
+                }
+                if "inserted" in stats:
+                    result.update({k: stats[k] for k in ("inserted", "updated", "unchanged", "deleted")})
+                    result["message"] = self._change_stats_message(stats)
+                return result
+            
+            if self._use_columnar(collector):
+                # Full refresh colunar: páginas viram RecordBatches e vão direto para o carregador
+                batches = collector.iter_record_batches(
+                    batch_rows=self.settings.pipeline.PIPELINE_COLUMNAR_BATCH_ROWS, **kwargs
+                )
+                records_inserted = self.db_manager.load_arrow(collector.get_table_name(), batches, replace=True)
+                duration = self.metrics.stop_timer(timer_id, success=True, records_count=records_inserted)
+                self._save_metric_to_db(operation_name, duration, True, records_inserted)
+                return {
+                    "collector": collector.get_table_name(),
+                    "success": True,
+                    "records": records_inserted,
+                    "message": f"{records_inserted} registros inseridos" if records_inserted else "Nenhum dado encontrado"
+                }
+
             # Coleta os dados
             data = collector.collect(**kwargs)
             
@@ -186,29 +532,65 @@ class DataOrchestrator:
                 }
             
             table_name = collector.get_table_name()
+            change_keys = self._change_keys(collector)
+            if change_keys:
+                # Detecção de mudanças: só linhas novas/alteradas são escritas
+                stats = self.db_manager.sync_rows(table_name, data, change_keys)
+                stats["deleted"] = 0
+                if self._is_full_scan(collector, **kwargs):
+                    seen = set()
+                    for r in data:
+                        k = self.db_manager.change_key(r, change_keys)
+                        if k is not None:
+                            seen.add(key_fingerprint(k))
+                    stats["deleted"] = self._mark_missing(collector, change_keys, seen)
+                records_inserted = stats["inserted"] + stats["updated"]
+                duration = self.metrics.stop_timer(timer_id, success=True, records_count=records_inserted)
+                self._save_metric_to_db(operation_name, duration, True, records_inserted)
+                return {
+                    "collector": table_name,
+                    "success": True,
+                    "records": records_inserted,
+                    **stats,
+                    "message": self._change_stats_message(stats)
+                }
+            
             key_columns = getattr(collector, 'get_unique_key_columns', lambda: [])()
+            records_inserted = 0
 
             if key_columns and hasattr(self.db_manager, 'get_existing_keys') and hasattr(self.db_manager, 'get_key_from_record'):
                 # Carga incremental: insere só registros cuja chave ainda não existe
                 total_coletado = len(data)
-                existing = self.db_manager.get_existing_keys(table_name, key_columns)
-                new_data = []
-                for r in data:
-                    k = self.db_manager.get_key_from_record(r, key_columns)
-                    if k is not None and k not in existing:
-                        new_data.append(r)
-                        existing.add(k)
+                key_index = self._open_key_index(table_name, key_columns)
+                existing = None if key_index is not None else self.db_manager.get_existing_keys(table_name, key_columns)
+                new_data = self._filter_new_records(data, key_columns, key_index, existing)
                 data = new_data
                 logger.info(f"Incremental '{table_name}': {len(new_data)} novos de {total_coletado} coletados ({total_coletado - len(new_data)} já existentes)")
+                try:
+                    if hasattr(self.db_manager, 'bulk_load'):
+                        # Muitos registros novos: LOAD DATA + merge (fallback: INSERT em lote)
+                        records_inserted = self.db_manager.bulk_load(table_name, data, replace=False)
+                    elif data:
+                        records_inserted = self.db_manager.insert_batch(table_name, data)
+                    data = []
+                except Exception:
+                    if key_index is not None:
+                        key_index.invalidate()
+                    raise
+                if key_index is not None:
+                    key_index.flush(token=self._table_token(table_name, key_columns))
+            elif hasattr(self.db_manager, 'bulk_load'):
+                # Full refresh em massa (MySQL: LOAD DATA + troca atômica; fallback TRUNCATE + INSERT)
+                records_inserted = self.db_manager.bulk_load(table_name, data, replace=True)
+                data = []
             else:
                 # Full refresh: esvazia a tabela e insere tudo
                 if hasattr(self.db_manager, 'truncate_table'):
                     self.db_manager.truncate_table(table_name)
 
-            records_inserted = 0
-            for i in range(0, len(data), INSERT_BATCH_SIZE):
-                chunk = data[i : i + INSERT_BATCH_SIZE]
-                records_inserted += self.db_manager.insert_batch(table_name, chunk)
+            if data:
+                # O gerenciador divide em lotes conforme o backend (MySQL: por bytes; BigQuery: 500 linhas)
+                records_inserted += self.db_manager.insert_batch(table_name, data)
             
             duration = self.metrics.stop_timer(timer_id, success=True, records_count=records_inserted)
             self._save_metric_to_db(operation_name, duration, True, records_inserted)
@@ -251,6 +633,8 @@ class DataOrchestrator:
             Lista com resultados de cada coleta
         """
         logger.info(f"Iniciando coletas (paralelo: {parallel}, workers: {max_workers})")
+        self.ledger.start_run("incremental" if kwargs.get("incremental") else "full",
+                              kwargs.get("data_inicio"), kwargs.get("data_fim"))
         
         if parallel:
             return self._run_parallel(max_workers, **kwargs)
@@ -349,6 +733,7 @@ class DataOrchestrator:
         ]
         
         logger.info(f"Coletando dados financeiros de {data_inicio} a {data_fim}")
+        self.ledger.start_run("full", data_inicio, data_fim)
         
         if parallel:
             results = []
@@ -415,6 +800,7 @@ class DataOrchestrator:
         data_fim = datetime.now().strftime("%Y-%m-%d")
         data_inicio = (datetime.now() - timedelta(days=int(days))).strftime("%Y-%m-%d")
         incremental_collectors = [c for c in self.collectors if c.supports_incremental()]
+        self.ledger.start_run("incremental", data_inicio, data_fim)
         
         logger.info(f"Coleta incremental: {data_inicio} a {data_fim} ({days} dias) - {len(incremental_collectors)} coletores")
         
@@ -476,6 +862,12 @@ class DataOrchestrator:
     
     def cleanup(self):
         """Limpa recursos."""
+        self.ledger.finish_run()  # runs/run_steps num lote por tabela
+        self.metrics_writer.close()  # grava as métricas pendentes antes de fechar o pool
+        if self._pipeline is not None:
+            self._pipeline.close()
+        if self._transform_pool is not None:
+            self._transform_pool.close()
         self.api_client.close()
         self.db_manager.close_pool()
         logger.info("Recursos limpos")
@@ -0,0 +1,9 @@
+"""
+Módulo de pipeline de coleta/carga.
+"""
+from src.pipeline.columnar import RecordBatchBuilder, arrow_available, arrow_schema
+from src.pipeline.key_index import KeyIndex
+from src.pipeline.loader import LoadPipeline, TableLoadState
+from src.pipeline.transform import TransformPool
+
+__all__ = ["KeyIndex", "LoadPipeline", "RecordBatchBuilder", "TableLoadState", "TransformPool", "arrow_available", "arrow_schema"]
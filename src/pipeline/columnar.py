@@ -0,0 +1,247 @@
+"""
+Caminho colunar (PyArrow) entre coletores e carregadores.
+As páginas de transform_data são acumuladas coluna a coluna em RecordBatches tipados pelo
+get_schema() do coletor; os carregadores consomem os lotes direto (Parquet no BigQuery,
+CSV no LOAD DATA do MySQL), sem dict por linha nem listas intermediárias para executemany.
+pyarrow é opcional: sem ele o fluxo continua com listas de dicts.
+"""
+import re
+import logging
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Any, Callable, Container, Dict, Iterable, Iterator, List, Optional
+
+from src.utils import json_codec
+
+try:
+    import pyarrow as pa  # opcional
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pa_csv = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Linhas por RecordBatch (lotes menores liberam memória mais cedo; maiores reduzem overhead)
+DEFAULT_BATCH_ROWS = 50000
+
+_DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y")
+_DATETIME_FORMATS = ("%d/%m/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d-%m-%Y %H:%M:%S")
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def flatten_record(
+    d: Dict[str, Any], parent_key: str = "", sep: str = "_", columns: Optional[Container[str]] = None
+) -> Dict[str, Any]:
+    """Mesmo achatamento dos gerenciadores de banco (dict aninhado -> a_b; lista -> JSON)."""
+    items = {}
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            items.update(flatten_record(v, new_key, sep, columns))
+        elif isinstance(v, list):
+            if columns is None or new_key in columns:
+                items[new_key] = json_codec.dumps(v) if v else None
+        else:
+            items[new_key] = v
+    return items
+
+
+def _parse_date(v: Any) -> Optional[date]:
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    s = str(v).strip()[:10]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_datetime(v: Any) -> Optional[datetime]:
+    if isinstance(v, datetime):
+        return v
+    if isinstance(v, date):
+        return datetime(v.year, v.month, v.day)
+    s = str(v).strip()[:19]
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+    d = _parse_date(s)
+    return datetime(d.year, d.month, d.day) if d else None
+
+
+def _to_int(v: Any) -> Optional[int]:
+    if isinstance(v, bool):
+        return int(v)
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        try:
+            return int(float(v))
+        except (TypeError, ValueError):
+            return None
+
+
+def _to_float(v: Any) -> Optional[float]:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decimal_converter(scale: int) -> Callable[[Any], Optional[Decimal]]:
+    quantum = Decimal(1).scaleb(-scale)
+
+    def convert(v: Any) -> Optional[Decimal]:
+        try:
+            return Decimal(str(v)).quantize(quantum, rounding=ROUND_HALF_UP)
+        except (InvalidOperation, ValueError):
+            return None
+    return convert
+
+
+def _to_str(v: Any) -> str:
+    if isinstance(v, (dict, list)):
+        return json_codec.dumps(v)
+    return str(v)
+
+
+def _column_type(type_def: str):
+    """Tipo Arrow e conversor a partir do tipo MySQL declarado no get_schema()."""
+    t = type_def.upper().strip()
+    if t.startswith(("BIGINT", "INT", "TINYINT", "SMALLINT", "MEDIUMINT")):
+        return pa.int64(), _to_int
+    m = re.match(r"^(DECIMAL|NUMERIC)\s*\((\d+)\s*,\s*(\d+)\)", t)
+    if m:
+        precision, scale = int(m.group(2)), int(m.group(3))
+        return pa.decimal128(precision, scale), _decimal_converter(scale)
+    if t.startswith(("DECIMAL", "NUMERIC")):
+        return pa.decimal128(18, 2), _decimal_converter(2)
+    if t.startswith(("FLOAT", "DOUBLE")):
+        return pa.float64(), _to_float
+    if t.startswith("DATETIME"):
+        return pa.timestamp("s"), _parse_datetime
+    if t.startswith("TIMESTAMP"):
+        return pa.timestamp("s", tz="UTC"), _parse_datetime
+    if t.startswith("DATE"):
+        return pa.date32(), _parse_date
+    return pa.string(), _to_str
+
+
+def _db_filled(type_def: str) -> bool:
+    """Colunas preenchidas pelo banco (auto-incremento, DEFAULT CURRENT_TIMESTAMP) não vão no lote."""
+    t = type_def.upper()
+    return "AUTO_INCREMENT" in t or "CURRENT_TIMESTAMP" in t
+
+
+def arrow_schema(schema: Dict[str, str]):
+    """Schema Arrow das colunas carregáveis a partir do get_schema()."""
+    fields = []
+    for col, type_def in schema.items():
+        if _db_filled(type_def):
+            continue
+        arrow_type, _ = _column_type(type_def)
+        fields.append(pa.field(col, arrow_type, nullable=True))
+    return pa.schema(fields)
+
+
+class RecordBatchBuilder:
+    """
+    Acumula registros (páginas de transform_data) coluna a coluna e emite RecordBatches tipados.
+    Só as colunas do schema são guardadas; o resto do registro é descartado no achatamento.
+    """
+
+    def __init__(self, schema: Dict[str, str], batch_rows: int = DEFAULT_BATCH_ROWS):
+        if pa is None:
+            raise RuntimeError("pyarrow não está instalado (pip install pyarrow)")
+        self.schema = arrow_schema(schema)
+        self.batch_rows = batch_rows
+        types = {col: _column_type(t) for col, t in schema.items() if not _db_filled(t)}
+        self._converters = [(f.name, types[f.name][1]) for f in self.schema]
+        self._columns: Dict[str, List[Any]] = {f.name: [] for f in self.schema}
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> List[Any]:
+        """Adiciona registros; retorna os RecordBatches completados (pode ser vazio)."""
+        done = []
+        for record in records:
+            flat = flatten_record(record, columns=self._columns)
+            columns = self._columns
+            for name, convert in self._converters:
+                v = flat.get(name)
+                if v is None or (v == "" and convert is not _to_str):
+                    columns[name].append(None)
+                else:
+                    columns[name].append(convert(v))
+            self._rows += 1
+            if self._rows >= self.batch_rows:
+                done.append(self.flush())
+        return done
+
+    def flush(self):
+        """Emite o RecordBatch com os registros acumulados (None se vazio)."""
+        if not self._rows:
+            return None
+        arrays = [pa.array(self._columns[f.name], type=f.type) for f in self.schema]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        self._columns = {f.name: [] for f in self.schema}
+        self._rows = 0
+        return batch
+
+
+def iter_record_batches(pages: Iterable[List[Dict[str, Any]]], schema: Dict[str, str],
+                        batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[Any]:
+    """Converte um fluxo de páginas (listas de dicts) em RecordBatches tipados."""
+    builder = RecordBatchBuilder(schema, batch_rows)
+    for page in pages:
+        yield from builder.append(page)
+    last = builder.flush()
+    if last is not None:
+        yield last
+
+
+def write_parquet(batches: Iterable[Any], path: str, schema) -> int:
+    """Grava os lotes em Parquet (streaming, um row group por lote). Retorna linhas gravadas."""
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="snappy") as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def write_load_data_csv(batches: Iterable[Any], path: str, schema) -> int:
+    """
+    Grava os lotes em CSV para LOAD DATA (campos entre aspas, NULL sem aspas, sem cabeçalho).
+    Usar com FIELDS TERMINATED BY ',' ENCLOSED BY '"' ESCAPED BY ''.
+    """
+    options = pa_csv.WriteOptions(include_header=False, null_string="NULL", quoting_style="all_valid")
+    rows = 0
+    with pa_csv.CSVWriter(path, schema, write_options=options) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def read_load_data_csv(path: str, schema):
+    """Relê o CSV de write_load_data_csv como Table (usado no fallback para INSERT em lote)."""
+    read_options = pa_csv.ReadOptions(column_names=schema.names)
+    convert_options = pa_csv.ConvertOptions(
+        column_types=schema, null_values=["NULL"], strings_can_be_null=True, quoted_strings_can_be_null=False,
+    )
+    return pa_csv.read_csv(path, read_options=read_options, convert_options=convert_options)
@@ -0,0 +1,242 @@
+"""
+Índice local de chaves por tabela (substitui o set de chaves montado a cada carga incremental).
+Guarda as impressões digitais de 64 bits das chaves (key_fingerprint) num array ordenado em disco,
+mapeado em memória, com um filtro de Bloom na frente: 8 bytes por chave em vez de centenas,
+e sem reler a tabela inteira do banco a cada execução.
+numpy é opcional: com ele a verificação de um lote inteiro é vetorizada (searchsorted);
+sem ele usa array('Q') + bisect.
+
+Formato do arquivo (<tabela>.keyidx):
+    cabeçalho | chaves uint64 ordenadas (little-endian) | bits do filtro de Bloom
+O cabeçalho guarda também a impressão digital do "token" da tabela (contagem + maiores
+chaves) de quando o índice foi gravado: se a tabela for esvaziada ou recarregada fora do
+pipeline, o token muda e o índice é reconstruído em vez de descartar registros novos.
+"""
+import os
+import struct
+import time
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np  # opcional
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"OKIX"
+_VERSION = 2
+# magic, versão, nº de chaves, nº de bits do Bloom, nº de funções hash, criado em (epoch),
+# impressão digital do token da tabela (0 = sem token)
+_HEADER = struct.Struct("<4sIQQIdQ")
+_HEADER_SIZE = 64
+# ~1% de falso positivo no Bloom
+BLOOM_BITS_PER_KEY = 10
+BLOOM_HASHES = 7
+_MASK64 = (1 << 64) - 1
+
+
+def _bloom_positions(fp: int, m: int, k: int) -> List[int]:
+    h1 = fp & 0xFFFFFFFF
+    h2 = (fp >> 32) | 1
+    return [((h1 + i * h2) & _MASK64) % m for i in range(k)]
+
+
+class KeyIndex:
+    """
+    Conjunto persistente de impressões digitais de chaves de uma tabela.
+    Chaves novas ficam num delta em memória até flush(), que reescreve o arquivo (troca atômica).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._keys = None  # np.ndarray (memmap) ou array('Q'), ordenado
+        self._bloom = None  # np.ndarray uint8 ou bytearray
+        self._bloom_bits = 0
+        self._bloom_k = BLOOM_HASHES
+        self._delta: set = set()
+        self.created_at: Optional[float] = None
+        self.token: int = 0
+        self._load()
+
+    # ---- leitura/gravação ----
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, count, bloom_bits, k, created_at, token = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("formato desconhecido")
+            keys_end = _HEADER_SIZE + count * 8
+            if np is not None:
+                self._keys = np.memmap(self.path, dtype="<u8", mode="r", offset=_HEADER_SIZE, shape=(count,)) if count else np.empty(0, dtype="<u8")
+                self._bloom = np.memmap(self.path, dtype=np.uint8, mode="r", offset=keys_end, shape=(bloom_bits // 8,)) if bloom_bits else None
+            else:
+                with open(self.path, "rb") as f:
+                    f.seek(_HEADER_SIZE)
+                    self._keys = array("Q")
+                    self._keys.frombytes(f.read(count * 8))
+                    self._bloom = bytearray(f.read(bloom_bits // 8))
+            self._bloom_bits = bloom_bits
+            self._bloom_k = k
+            self.created_at = created_at
+            self.token = token
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Índice de chaves '{self.path}' inválido ({e}); será reconstruído")
+            self._keys = None
+            self._bloom = None
+            self.created_at = None
+            self.token = 0
+
+    def _write(self, keys, created_at: Optional[float] = None, token: int = 0):
+        """
+        Grava chaves (ordenadas, sem repetição) + Bloom num arquivo temporário e troca pelo atual.
+        created_at marca a última reconstrução completa (padrão: agora); token é o da tabela.
+        """
+        count = len(keys)
+        m = max(64, ((count * BLOOM_BITS_PER_KEY + 63) // 64) * 64)
+        k = BLOOM_HASHES
+        if np is not None:
+            keys = np.asarray(keys, dtype="<u8")
+            bloom = np.zeros(m // 8, dtype=np.uint8)
+            if count:
+                pos = self._bloom_positions_np(keys, m, k).ravel()
+                np.bitwise_or.at(bloom, pos // 8, (1 << (pos % 8)).astype(np.uint8))
+            keys_bytes, bloom_bytes = keys.tobytes(), bloom.tobytes()
+        else:
+            bloom = bytearray(m // 8)
+            for fp in keys:
+                for p in _bloom_positions(fp, m, k):
+                    bloom[p // 8] |= 1 << (p % 8)
+            keys_bytes, bloom_bytes = array("Q", keys).tobytes(), bytes(bloom)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, count, m, k, created_at or time.time(), token).ljust(_HEADER_SIZE, b"\0"))
+            f.write(keys_bytes)
+            f.write(bloom_bytes)
+        # Solta o mapeamento antigo antes da troca (Windows não substitui arquivo mapeado)
+        self._keys = None
+        self._bloom = None
+        os.replace(tmp, self.path)
+        self._load()
+
+    @staticmethod
+    def _bloom_positions_np(fps, m: int, k: int):
+        h1 = fps & np.uint64(0xFFFFFFFF)
+        h2 = (fps >> np.uint64(32)) | np.uint64(1)
+        i = np.arange(k, dtype=np.uint64)
+        return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(m)
+
+    # ---- consulta ----
+
+    @property
+    def exists(self) -> bool:
+        return self._keys is not None
+
+    def __len__(self) -> int:
+        return (len(self._keys) if self._keys is not None else 0) + len(self._delta)
+
+    def age_seconds(self) -> Optional[float]:
+        return None if self.created_at is None else time.time() - self.created_at
+
+    def matches(self, token: Optional[int]) -> bool:
+        """O índice foi gravado com este token da tabela? (token None: não há como validar)"""
+        return token is None or (self.token != 0 and self.token == token)
+
+    def contains_many(self, fingerprints: Sequence[int]) -> List[bool]:
+        """Verifica um lote inteiro de impressões digitais de uma vez."""
+        if not len(fingerprints):
+            return []
+        if np is not None:
+            fps = np.asarray(fingerprints, dtype=np.uint64)
+            found = np.zeros(len(fps), dtype=bool)
+            if self._keys is not None and len(self._keys):
+                candidates = np.ones(len(fps), dtype=bool)
+                if self._bloom is not None and self._bloom_bits:
+                    pos = self._bloom_positions_np(fps, self._bloom_bits, self._bloom_k)
+                    bits = (self._bloom[pos // np.uint64(8)] >> (pos % np.uint64(8)).astype(np.uint8)) & 1
+                    candidates = bits.all(axis=1)
+                cand = fps[candidates]
+                idx = np.searchsorted(self._keys, cand)
+                idx_ok = idx < len(self._keys)
+                hit = np.zeros(len(cand), dtype=bool)
+                hit[idx_ok] = self._keys[idx[idx_ok]] == cand[idx_ok]
+                found[candidates] = hit
+            if self._delta:
+                found |= np.isin(fps, np.fromiter(self._delta, dtype=np.uint64, count=len(self._delta)))
+            return found.tolist()
+        result = []
+        keys = self._keys
+        n = len(keys) if keys is not None else 0
+        for fp in fingerprints:
+            if fp in self._delta:
+                result.append(True)
+                continue
+            if not n:
+                result.append(False)
+                continue
+            if self._bloom_bits and not all(
+                self._bloom[p // 8] >> (p % 8) & 1 for p in _bloom_positions(fp, self._bloom_bits, self._bloom_k)
+            ):
+                result.append(False)
+                continue
+            i = bisect_left(keys, fp)
+            result.append(i < n and keys[i] == fp)
+        return result
+
+    # ---- atualização ----
+
+    def add_many(self, fingerprints: Iterable[int]):
+        """Registra chaves gravadas (ficam no delta até flush)."""
+        self._delta.update(int(fp) for fp in fingerprints)
+
+    def flush(self, token: Optional[int] = None):
+        """
+        Incorpora o delta ao arquivo (merge ordenado + novo Bloom).
+        token: token da tabela depois da carga (None mantém o atual).
+        """
+        token = self.token if token is None else token
+        if not self._delta and self.exists and token == self.token:
+            return
+        created_at = self.created_at
+        if np is not None:
+            base = np.asarray(self._keys if self._keys is not None else [], dtype=np.uint64)
+            delta = np.fromiter(self._delta, dtype=np.uint64, count=len(self._delta))
+            merged = np.union1d(base, delta)
+        else:
+            merged = sorted(set(self._keys or []) | self._delta)
+        # Mantém a data da última reconstrução completa (o delta não revalida o índice)
+        self._write(merged, created_at=created_at, token=token)
+        self._delta.clear()
+
+    def rebuild(self, key_batches: Iterable[Sequence[int]], token: Optional[int] = None):
+        """
+        Reconstrói o índice a partir de lotes de impressões digitais lidos do banco.
+        token: token da tabela lido antes das chaves (gravação concorrente força nova reconstrução).
+        """
+        if np is not None:
+            parts = [np.asarray(b, dtype=np.uint64) for b in key_batches if len(b)]
+            merged = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.uint64)
+        else:
+            merged = sorted({fp for b in key_batches for fp in b})
+        self._delta.clear()
+        self._write(merged, token=token or 0)
+        logger.info(f"Índice de chaves '{os.path.basename(self.path)}' reconstruído: {len(merged)} chaves")
+
+    def invalidate(self):
+        """Descarta o índice (próxima carga reconstrói a partir do banco)."""
+        self._keys = None
+        self._bloom = None
+        self._delta.clear()
+        self.created_at = None
+        self.token = 0
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,128 @@
+"""
+Pipeline produtor/consumidor de carga.
+Coletores (produtores) entregam páginas já transformadas numa fila limitada; um pool de
+workers de carga (consumidores) grava no MySQL/BigQuery em paralelo.
+A fila limitada gera backpressure: se a carga ficar para trás, a coleta espera,
+e a memória fica limitada a PIPELINE_QUEUE_BATCHES páginas.
+"""
+import queue
+import threading
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class TableLoadState:
+    """Progresso da carga de uma tabela no pipeline."""
+    pending: int = 0
+    records: int = 0
+    batches: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class LoadPipeline:
+    """
+    Pool de workers de carga alimentado por uma fila limitada.
+    Uso: submit(tabela, registros) durante a coleta; wait(tabela) ao final da tabela.
+    """
+
+    def __init__(self, db_manager, workers: int = 4, max_pending_batches: int = 16):
+        """
+        Args:
+            db_manager: Gerenciador com insert_batch(table_name, data) (loader padrão)
+            workers: Número de workers de carga
+            max_pending_batches: Tamanho máximo da fila (páginas aguardando carga)
+        """
+        self.db_manager = db_manager
+        self.workers = max(1, int(workers))
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(max_pending_batches)))
+        self._states: Dict[str, TableLoadState] = {}
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Inicia os workers de carga (idempotente; coletores em paralelo chamam via submit)."""
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"loader-{i + 1}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        logger.info(f"Pipeline de carga iniciado ({self.workers} workers, fila de {self._queue.maxsize} lotes)")
+
+    def begin(self, table_name: str):
+        """Zera o estado da tabela antes de uma nova carga."""
+        with self._cond:
+            self._states[table_name] = TableLoadState()
+
+    def submit(
+        self,
+        table_name: str,
+        records: List[Dict[str, Any]],
+        loader: Optional[Callable[[str, List[Dict[str, Any]]], int]] = None,
+    ):
+        """
+        Enfileira um lote para carga. Bloqueia se a fila estiver cheia (backpressure).
+        loader(tabela, registros) -> gravados; padrão: db_manager.insert_batch.
+        """
+        if not records:
+            return
+        self.start()
+        with self._cond:
+            state = self._states.setdefault(table_name, TableLoadState())
+            state.pending += 1
+        self._queue.put((table_name, records, loader or self.db_manager.insert_batch))
+
+    def wait(self, table_name: str, timeout: Optional[float] = None) -> Tuple[int, List[str]]:
+        """
+        Aguarda todos os lotes enfileirados da tabela serem carregados.
+
+        Returns:
+            (registros carregados, mensagens de erro)
+        """
+        with self._cond:
+            state = self._states.setdefault(table_name, TableLoadState())
+            self._cond.wait_for(lambda: state.pending == 0, timeout=timeout)
+            return state.records, list(state.errors)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                table_name, records, loader = item
+                inserted, error = 0, None
+                try:
+                    inserted = loader(table_name, records)
+                except Exception as e:
+                    error = str(e)
+                    logger.error(f"Pipeline: erro ao carregar lote em '{table_name}': {error}")
+                with self._cond:
+                    state = self._states.setdefault(table_name, TableLoadState())
+                    state.records += inserted or 0
+                    state.batches += 1
+                    if error:
+                        state.errors.append(error)
+                    state.pending -= 1
+                    self._cond.notify_all()
+            finally:
+                self._queue.task_done()
+
+    def close(self):
+        """Aguarda a fila esvaziar e encerra os workers."""
+        with self._cond:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+        for _ in threads:
+            self._queue.put(_STOP)
+        for t in threads:
+            t.join()
+        logger.info("Pipeline de carga encerrado")
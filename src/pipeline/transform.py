@@ -0,0 +1,71 @@
+"""
+Estágio de transformação em processos separados para coletores com transform_data pesado
+(pedidos de compra, NF-e/NFS-e: decodificação de respostas grandes e laços por item em Python puro).
+A thread de I/O só busca os bytes da próxima página; decodificação, transform_data e a
+serialização do resultado rodam num ProcessPoolExecutor, fora do GIL do processo principal.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Type
+
+from src.utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Páginas em voo por coletor (buscadas e aguardando transformação)
+DEFAULT_MAX_IN_FLIGHT = 4
+
+# Instâncias de coletor por processo de trabalho (transform_data pode aprender o formato da resposta)
+_worker_collectors: Dict[type, Any] = {}
+
+
+@dataclass
+class TransformedPage:
+    """
+    Resultado de uma página transformada.
+    meta: campos escalares da raiz da resposta (paginação, faultstring...).
+    records: registros transformados (chegam ao processo principal já serializados pelo executor).
+    """
+    meta: Dict[str, Any] = field(default_factory=dict)
+    records: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _transform_page(collector_cls: Type, raw: bytes) -> TransformedPage:
+    """Executado no processo de trabalho: decodifica a página e aplica transform_data."""
+    response = json_codec.loads(raw)
+    if not isinstance(response, dict):
+        return TransformedPage()
+    meta = {k: v for k, v in response.items() if not isinstance(v, (dict, list))}
+    if "faultstring" in response:
+        return TransformedPage(meta=meta)
+    collector = _worker_collectors.get(collector_cls)
+    if collector is None:
+        # Sem cliente de API: no processo de trabalho o coletor só transforma
+        collector = _worker_collectors[collector_cls] = collector_cls(None)
+    return TransformedPage(meta=meta, records=collector.transform_data(response))
+
+
+class TransformPool:
+    """ProcessPoolExecutor compartilhado pelos coletores marcados com process_transform."""
+
+    def __init__(self, workers: int, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.workers = workers
+        self.max_in_flight = max(1, max_in_flight)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, collector, raw: bytes) -> "Future[TransformedPage]":
+        """Agenda a transformação dos bytes de uma página pelo transform_data do coletor."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                logger.info(f"Pool de transformação iniciado: {self.workers} processos")
+        return self._executor.submit(_transform_page, type(collector), raw)
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
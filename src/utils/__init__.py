@@ -1,6 +1,9 @@
 """
 Módulo de utilitários.
 """
+from src.utils import json_codec
 from src.utils.logging_config import setup_logging
+from src.utils.profiling import SamplingProfiler
+from src.utils.row_hash import ROW_HASH_COLUMN, ChangeSet, classify_changes, row_hash
 
-__all__ = ["setup_logging"]
+__all__ = ["json_codec", "setup_logging", "SamplingProfiler", "ROW_HASH_COLUMN", "ChangeSet", "classify_changes", "row_hash"]
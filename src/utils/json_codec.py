@@ -0,0 +1,42 @@
+"""
+Codec JSON do pipeline: usa orjson (C) quando instalado e cai para o json da stdlib.
+Decodifica direto dos bytes da resposta (sem passar por response.text) e codifica listas
+aninhadas no mesmo formato compacto nos dois backends, para que o _row_hash de uma linha
+não mude conforme a máquina tenha ou não orjson (só floats em notação científica diferem).
+"""
+import json
+import logging
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson  # opcional
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+_SEPARATORS = (",", ":")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decodifica JSON a partir de bytes (ou str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    Codifica em JSON compacto, UTF-8 sem escapes (equivale a
+    json.dumps(obj, ensure_ascii=False, separators=(",", ":"))).
+    Tipos que o orjson não aceita (Decimal, int > 64 bits, chaves não-str) usam a stdlib.
+    default(obj) converte tipos não serializáveis (como no json.dumps).
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=_SEPARATORS, default=default)
@@ -0,0 +1,146 @@
+"""
+Profiler de amostragem para as execuções da coleta (python src/main.py --profile ou
+PIPELINE_PROFILE=true). Uma thread lê a pilha de todas as threads (sys._current_frames) a
+cada intervalo e conta as pilhas; o custo é proporcional ao número de threads, não ao
+código executado, e nada é instrumentado.
+
+Saída em "folded stacks" (thread;func (arquivo:linha);... N), o formato de entrada do
+flamegraph.pl e do speedscope: um arquivo por execução e, opcionalmente, um por coletor
+(threads do coletor e workers de carga trabalhando para ele, via src.metrics.active_steps).
+As amostras são de tempo de parede: esperas em rede, sleep e filas aparecem na pilha em
+que a thread está parada. Com PIPELINE_TRANSFORM_WORKERS > 0 a transformação roda em
+outros processos e aparece como espera no future.
+Os arquivos são regravados a cada flush_seconds, então uma execução morta pelo timeout
+do CI ainda deixa o perfil até o último flush.
+"""
+import os
+import re
+import sys
+import time
+import threading
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Profundidade máxima da pilha amostrada (pilhas maiores perdem os frames mais próximos da raiz)
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_.-]+", "_", name)
+
+
+class SamplingProfiler:
+    """
+    Amostragem periódica das pilhas de todas as threads, gravadas em .folded.
+    labeler() -> {ident da thread: coletor} separa as amostras por coletor (per_collector).
+    """
+
+    def __init__(self, output_dir: str = "profiles", interval: float = 0.01, per_collector: bool = False,
+                 labeler: Optional[Callable[[], Dict[int, str]]] = None, flush_seconds: float = 60.0,
+                 name: Optional[str] = None):
+        self.output_dir = output_dir
+        self.interval = max(0.001, interval)
+        self.per_collector = per_collector
+        self.labeler = labeler
+        self.flush_seconds = flush_seconds
+        self.name = name or f"coleta_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._by_collector: Dict[str, Counter] = {}
+        self._labels: Dict[object, str] = {}  # code -> rótulo (evita formatar o mesmo frame a cada amostra)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+            logger.info(f"Profiler de amostragem ligado ({1 / self.interval:.0f} Hz) -> {self.output_dir}/{self.name}*.folded")
+        return self
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _stack(self, frame) -> List[str]:
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def sample(self) -> None:
+        """Uma amostra de todas as threads (exceto a do profiler)."""
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        labels = self.labeler() if (self.per_collector and self.labeler) else {}
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                folded = ";".join([names.get(ident, str(ident)), *self._stack(frame)])
+                self._stacks[folded] += 1
+                collector = labels.get(ident)
+                if collector is not None:
+                    self._by_collector.setdefault(collector, Counter())[folded] += 1
+            self.samples += 1
+
+    def _run(self):
+        proximo_flush = time.monotonic() + self.flush_seconds
+        while not self._stop.wait(self.interval):
+            self.sample()
+            if self.flush_seconds > 0 and time.monotonic() >= proximo_flush:
+                self.write()
+                proximo_flush = time.monotonic() + self.flush_seconds
+
+    @staticmethod
+    def _write_folded(path: str, stacks: Counter) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp, path)
+
+    def write(self) -> List[str]:
+        """Grava (ou regrava) os .folded da execução; retorna os caminhos."""
+        with self._lock:
+            stacks = Counter(self._stacks)
+            by_collector = {c: Counter(s) for c, s in self._by_collector.items()}
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = [os.path.join(self.output_dir, f"{self.name}.folded")]
+        self._write_folded(paths[0], stacks)
+        for collector, collector_stacks in sorted(by_collector.items()):
+            path = os.path.join(self.output_dir, f"{self.name}_{_safe_name(collector)}.folded")
+            self._write_folded(path, collector_stacks)
+            paths.append(path)
+        return paths
+
+    def stop(self) -> List[str]:
+        """Para a amostragem e grava os arquivos finais."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        paths = self.write()
+        logger.info(f"Perfil gravado: {self.samples} amostras em {', '.join(paths)}")
+        return paths
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
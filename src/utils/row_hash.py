@@ -0,0 +1,102 @@
+"""
+Detecção de mudanças por hash de conteúdo.
+Cada linha gravada guarda em _row_hash o hash dos seus valores já codificados; na carga seguinte,
+linhas com o mesmo hash são ignoradas e só inserções/alterações são escritas.
+Chaves que somem da origem numa varredura completa recebem deleted_at (exclusão lógica).
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+ROW_HASH_COLUMN = "_row_hash"
+ROW_HASH_SQL_TYPE = "CHAR(32)"
+# Exclusão lógica: preenchida quando a chave some da origem numa varredura completa
+DELETED_AT_COLUMN = "deleted_at"
+DELETED_AT_SQL_TYPE = "DATETIME"
+# Colunas técnicas que mudam sem o conteúdo mudar (ficam fora do hash)
+NON_CONTENT_COLUMNS = frozenset(["id", "created_at", "updated_at", DELETED_AT_COLUMN, ROW_HASH_COLUMN])
+
+
+def content_columns(columns: Iterable[str]) -> List[str]:
+    """Colunas da tabela que entram no hash (na ordem da tabela)."""
+    return [c for c in columns if c not in NON_CONTENT_COLUMNS]
+
+
+def row_hash(values: Iterable[Any]) -> str:
+    """Hash estável (blake2b, 128 bits) dos valores codificados de uma linha. NULL difere de ''."""
+    h = hashlib.blake2b(digest_size=16)
+    for v in values:
+        if v is None:
+            h.update(b"\x00")
+            continue
+        b = str(v).encode("utf-8")
+        h.update(b"\x01%d:" % len(b))
+        h.update(b)
+    return h.hexdigest()
+
+
+def normalize_key(values: List[Any]) -> Any:
+    """
+    Chave comparável entre o registro da API e o valor lido do banco (ex.: 123 vs '123' em VARCHAR).
+    Uma coluna -> str; várias -> tupla de str; None se algum componente for nulo.
+    """
+    if any(v is None or v == "" for v in values):
+        return None
+    keys = tuple(str(v) for v in values)
+    return keys[0] if len(keys) == 1 else keys
+
+
+def key_fingerprint(key: Any) -> int:
+    """Impressão digital de 64 bits de uma chave normalizada (conjuntos compactos na reconciliação)."""
+    raw = key if isinstance(key, str) else "\x1f".join(key)
+    return int.from_bytes(hashlib.blake2b(raw.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+@dataclass
+class ChangeSet:
+    """Resultado da comparação de um lote com os hashes gravados."""
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    unchanged: int = 0
+    keyless: int = 0  # registros sem chave: não comparáveis, vão para inserts
+    seen: set = field(default_factory=set)
+
+
+def classify_changes(
+    records: Iterable[Dict[str, Any]],
+    stored: Dict[Any, Optional[str]],
+    key_fn: Callable[[Dict[str, Any]], Any],
+    hash_fn: Callable[[Dict[str, Any]], str],
+) -> ChangeSet:
+    """
+    Separa registros em inserções, alterações e inalterados comparando com stored (chave -> hash).
+    Cada registro devolvido recebe o campo _row_hash. stored é atualizado com os novos hashes,
+    para que páginas seguintes da mesma carga comparem com o que já foi enviado.
+    Chave repetida no lote: vale a última ocorrência. Registro sem chave não tem com o que
+    ser comparado e é inserido (como na carga sem detecção de mudanças).
+    """
+    result = ChangeSet()
+    pending: Dict[Any, tuple] = {}  # chave -> (lista, posição) do registro já enfileirado
+    for record in records:
+        key = key_fn(record)
+        h = hash_fn(record)
+        row = dict(record)
+        row[ROW_HASH_COLUMN] = h
+        if key is None:
+            result.keyless += 1
+            result.inserts.append(row)
+            continue
+        result.seen.add(key)
+        if key in pending:
+            target, pos = pending[key]
+            target[pos] = row
+            stored[key] = h
+            continue
+        if key in stored and stored[key] == h:
+            result.unchanged += 1
+            continue
+        target = result.updates if key in stored else result.inserts
+        target.append(row)
+        pending[key] = (target, len(target) - 1)
+        stored[key] = h
+    return result
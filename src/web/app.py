@@ -2,18 +2,22 @@
 Aplicação Web Flask para Dashboard do Sistema de Coleta Omie.
 Lê do BigQuery quando GCP está configurado; senão lê do MySQL (apenas em ambiente local).
 Na Vercel NÃO existe MySQL: usa só BigQuery ou stub (dados vazios) para evitar erro de conexão.
-Otimizado: cache curto (45s), contagens em paralelo, respostas leves.
+Otimizado: cache curto (45s) compartilhado entre workers, contagens em paralelo, respostas leves
+(ETag + 304 Not Modified e compressão gzip/brotli nas rotas maiores).
+A página consulta só /api/version (token barato que muda quando uma coleta grava o ledger em runs) e
+busca stats/financeiro/métricas apenas quando o token muda; o cache desses dados é chaveado
+pelo token, então cada coleta custa uma rodada de consultas, não uma por aba aberta.
 """
 import os
 import logging
-import time
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import Flask, render_template, jsonify, request
-from src.config import Settings
-from src.database import DatabaseManager
-from src.bigquery import BigQueryManager
-from src.metrics import MetricsCollector
-from src.orchestrator import DataOrchestrator
+from src.metrics.ledger import RUN_STEPS_TABLE, RUNS_TABLE
+from src.metrics.writer import API_METRICS_TABLE
+from src.utils.row_hash import DELETED_AT_COLUMN
+from src.web.cache import create_cache, normalize
+from src.web.responses import json_response, register_compression
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -22,23 +26,8 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
 
-# Cache em memória (TTL 45s) para dashboard rápido
-_CACHE_TTL = 45
-_cache = {}  # key -> (timestamp, value)
-
-def _cached(key):
-    if key in _cache:
-        ts, val = _cache[key]
-        if time.time() - ts < _CACHE_TTL:
-            return val
-    return None
-
-def _set_cache(key, value):
-    _cache[key] = (time.time(), value)
-
-# Headers para o browser cachear respostas (dashboard rápido)
-def _cache_headers():
-    return {"Cache-Control": "public, max-age=45"}
+# Compressão só nas rotas com corpo grande (listagem de tabelas e métricas)
+register_compression(app, ("/api/tables/", "/api/metrics"))
 
 
 class _StubDbManager:
@@ -53,49 +42,85 @@ class _StubDbManager:
         return []
     def table_ref(self, table_name: str) -> str:
         return table_name
-    def create_table(self, table_name: str, schema: dict) -> bool:
+    def create_table(self, table_name: str, schema: dict, indexes=None) -> bool:
         return True
 
 
-# Inicializar: na Vercel NUNCA usar MySQL; localmente BigQuery primeiro, senão MySQL
-settings = Settings()
-gcp = settings.gcp
+# Inicialização preguiçosa (cold start rápido na Vercel): settings, cache e backend
+# (BigQuery/MySQL) só são criados na primeira requisição que precisa deles.
+# Na Vercel NUNCA usar MySQL; localmente BigQuery primeiro, senão MySQL.
 _vercel = os.environ.get("VERCEL") == "1"
+_init_lock = threading.Lock()
+_cache = None
+_backend = None  # (db_manager, use_bigquery)
+_version_ttl = None
+
 
 def _gcp_configured(gcp):
     return (gcp.GOOGLE_APPLICATION_CREDENTIALS or gcp.GOOGLE_APPLICATION_CREDENTIALS_JSON) and gcp.project_id and gcp.dataset_id
 
-if _vercel:
-    # Vercel é serverless: não há MySQL. Usar só BigQuery ou stub.
-    if _gcp_configured(gcp):
-        try:
-            db_manager = BigQueryManager(gcp)
-            _use_bigquery = True
-        except Exception as e:
-            logger.warning(
-                "BigQuery indisponível na Vercel (%s). Configure GOOGLE_APPLICATION_CREDENTIALS_JSON e Build step.",
-                e,
-            )
-            db_manager = _StubDbManager()
-            _use_bigquery = False
-    else:
+
+def _get_cache():
+    """Cache compartilhado entre workers (SQLite local por padrão; ver DASHBOARD_CACHE_BACKEND)."""
+    global _cache
+    if _cache is None:
+        with _init_lock:
+            if _cache is None:
+                from src.config import WebSettings
+                _cache = create_cache(WebSettings())
+    return _cache
+
+
+def _get_version_ttl() -> int:
+    global _version_ttl
+    if _version_ttl is None:
+        from src.config import WebSettings
+        _version_ttl = WebSettings().DASHBOARD_VERSION_TTL
+    return _version_ttl
+
+
+def _create_backend():
+    """Cria o gerenciador de dados do dashboard. Importa BigQuery/MySQL só quando necessário."""
+    from src.config import GcpSettings, DatabaseSettings
+    gcp = GcpSettings()
+
+    if _vercel:
+        # Vercel é serverless: não há MySQL. Usar só BigQuery ou stub.
+        if _gcp_configured(gcp):
+            try:
+                from src.bigquery import BigQueryManager
+                return BigQueryManager(gcp), True
+            except Exception as e:
+                logger.warning(
+                    "BigQuery indisponível na Vercel (%s). Configure GOOGLE_APPLICATION_CREDENTIALS_JSON e Build step.",
+                    e,
+                )
+                return _StubDbManager(), False
         logger.warning(
             "Na Vercel só BigQuery é suportado (MySQL não existe). "
             "Configure GCP_PROJECT_ID, BIGQUERY_DATASET e GOOGLE_APPLICATION_CREDENTIALS_JSON."
         )
-        db_manager = _StubDbManager()
-        _use_bigquery = False
-elif _gcp_configured(gcp):
-    try:
-        db_manager = BigQueryManager(gcp)
-        _use_bigquery = True
-    except Exception as e:
-        logger.warning(f"BigQuery indisponível ({e}), usando MySQL")
-        db_manager = DatabaseManager(settings.database)
-        _use_bigquery = False
-else:
-    db_manager = DatabaseManager(settings.database)
-    _use_bigquery = False
+        return _StubDbManager(), False
+
+    if _gcp_configured(gcp):
+        try:
+            from src.bigquery import BigQueryManager
+            return BigQueryManager(gcp), True
+        except Exception as e:
+            logger.warning(f"BigQuery indisponível ({e}), usando MySQL")
+    from src.database import DatabaseManager
+    return DatabaseManager(DatabaseSettings()), False
+
+
+def _get_backend():
+    """Retorna (db_manager, use_bigquery), criando o backend na primeira chamada."""
+    global _backend
+    if _backend is None:
+        with _init_lock:
+            if _backend is None:
+                _backend = _create_backend()
+    return _backend
+
 
 _executor = ThreadPoolExecutor(max_workers=20)
 TABLES_STATS = [
@@ -115,10 +140,12 @@ def index():
 def run_coleta():
     """Dispara a coleta Omie -> BigQuery. Síncrono; invalida cache ao terminar."""
     try:
-        orch = DataOrchestrator(settings)
+        from src.config import Settings
+        from src.orchestrator import DataOrchestrator
+        orch = DataOrchestrator(Settings())
         results = orch.run_collections(parallel=False)
         orch.cleanup()
-        _cache.clear()
+        _get_cache().clear()
         total = sum(r.get("records", 0) for r in results)
         return jsonify({
             "success": True,
@@ -133,89 +160,152 @@ def run_coleta():
         }), 500
 
 
-@app.route('/api/stats')
-def get_stats():
-    """Estatísticas gerais (cache 45s, contagens em paralelo). Use ?refresh=1 para ignorar cache."""
-    if not request.args.get("refresh"):
-        cached = _cached("stats")
-        if cached is not None:
-            return jsonify(cached), 200, _cache_headers()
+@app.route('/api/version')
+def get_version():
+    """Token de mudança dos dados (cache curto); a página refaz as outras consultas só quando ele muda."""
+    try:
+        ttl = _get_version_ttl()
+        version = _get_cache().get_or_set("version", _compute_version, ttl=ttl)
+        return json_response({'success': True, 'version': version}, max_age=ttl)
+    except Exception as e:
+        logger.error(f"Erro ao obter versão dos dados: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 
+def _compute_version() -> str:
+    """MAX(finished_at) e COUNT(*) de runs: mudam quando uma coleta termina de gravar o ledger."""
+    db_manager, use_bigquery = _get_backend()
+    tbl = db_manager.table_ref(RUNS_TABLE) if use_bigquery else RUNS_TABLE
     try:
-        stats = {}
+        r = db_manager.execute_query(f"SELECT MAX(finished_at) as ultima, COUNT(*) as total FROM {tbl}")
+    except Exception as e:
+        logger.warning(f"Erro ao ler versão em {RUNS_TABLE}: {str(e)}")
+        return "0"
+    if not r:
+        return "0"
+    return f"{r[0].get('ultima') or ''}|{r[0].get('total') or 0}"
 
-        def _count_one(table):
-            try:
-                if _use_bigquery:
-                    return table, db_manager.get_table_count(table)
-                r = db_manager.execute_query(f"SELECT COUNT(*) as total FROM {table}")
-                return table, (r[0]['total'] if r else 0)
-            except Exception as e:
-                logger.warning(f"Erro ao contar {table}: {str(e)}")
-                return table, 0
-
-        futures = {_executor.submit(_count_one, t): t for t in TABLES_STATS}
-        for fut in as_completed(futures):
-            table, count = fut.result()
-            stats[table] = count
-
-        stats['total_geral'] = sum(v for k, v in stats.items() if k != 'total_geral')
-        out = {'success': True, 'data': stats}
-        _set_cache("stats", out)
-        return jsonify(out), 200, _cache_headers()
+
+def _versioned(key: str) -> str:
+    """Chave de cache dos dados amarrada ao token atual: coleta nova -> chave nova."""
+    return f"{key}:{_get_cache().get_or_set('version', _compute_version, ttl=_get_version_ttl())}"
+
+
+def _compute_soft_delete_tables():
+    """Tabelas com a coluna deleted_at (exclusão lógica pela reconciliação)."""
+    db_manager, use_bigquery = _get_backend()
+    if use_bigquery:
+        query = (
+            f"SELECT table_name AS t FROM {db_manager.table_ref('INFORMATION_SCHEMA.COLUMNS')} "
+            f"WHERE column_name = '{DELETED_AT_COLUMN}'"
+        )
+    else:
+        query = (
+            "SELECT TABLE_NAME AS t FROM information_schema.COLUMNS "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND COLUMN_NAME = '{DELETED_AT_COLUMN}'"
+        )
+    try:
+        return sorted({r.get('t') for r in db_manager.execute_query(query) or []} - {None})
+    except Exception as e:
+        logger.warning(f"Erro ao listar tabelas com {DELETED_AT_COLUMN}: {str(e)}")
+        return []
+
+
+def _active_where(table: str) -> str:
+    """WHERE que deixa de fora as linhas excluídas na origem (deleted_at), se a tabela tem a coluna."""
+    tables = _get_cache().get_or_set(_versioned("soft_delete_tables"), _compute_soft_delete_tables)
+    return f" WHERE {DELETED_AT_COLUMN} IS NULL" if table in tables else ""
+
+
+@app.route('/api/stats')
+def get_stats():
+    """Estatísticas gerais (cache por versão dos dados, contagens em paralelo). Use ?refresh=1 para ignorar cache."""
+    try:
+        key = _versioned("stats")
+        if request.args.get("refresh"):
+            out = normalize(_compute_stats())  # mesmo corpo que a resposta vinda do cache
+            _get_cache().set(key, out)
+        else:
+            out = _get_cache().get_or_set(key, _compute_stats)
+        return json_response(out)
     except Exception as e:
         logger.error(f"Erro ao obter estatísticas: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/financial')
-def get_financial():
-    """Dados financeiros (cache 45s, duas queries em paralelo)."""
-    cached = _cached("financial")
-    if cached is not None:
-        return jsonify(cached), 200, _cache_headers()
+def _compute_stats():
+    db_manager, use_bigquery = _get_backend()
+    stats = {}
 
-    try:
-        financial_data = {}
-        tbl_cr = db_manager.table_ref("contas_receber") if _use_bigquery else "contas_receber"
-        tbl_cp = db_manager.table_ref("contas_pagar") if _use_bigquery else "contas_pagar"
+    def _count_one(table):
+        try:
+            where = _active_where(table)
+            if use_bigquery and not where:
+                return table, db_manager.get_table_count(table)
+            tbl = db_manager.table_ref(table) if use_bigquery else table
+            r = db_manager.execute_query(f"SELECT COUNT(*) as total FROM {tbl}{where}")
+            return table, (r[0]['total'] if r else 0)
+        except Exception as e:
+            logger.warning(f"Erro ao contar {table}: {str(e)}")
+            return table, 0
 
-        def _query_cr():
-            try:
-                r = db_manager.execute_query(f"""
-                    SELECT COUNT(*) as total, SUM(valor_documento) as total_valor,
-                           SUM(valor_pago) as total_pago, SUM(saldo) as total_saldo
-                    FROM {tbl_cr}
-                """)
-                return 'contas_receber', (r[0] if r else {})
-            except Exception as e:
-                logger.warning(f"Erro contas a receber: {str(e)}")
-                return 'contas_receber', {}
+    futures = {_executor.submit(_count_one, t): t for t in TABLES_STATS}
+    for fut in as_completed(futures):
+        table, count = fut.result()
+        stats[table] = count
 
-        def _query_cp():
-            try:
-                r = db_manager.execute_query(f"""
-                    SELECT COUNT(*) as total, SUM(valor_documento) as total_valor,
-                           SUM(valor_pago) as total_pago, SUM(saldo) as total_saldo
-                    FROM {tbl_cp}
-                """)
-                return 'contas_pagar', (r[0] if r else {})
-            except Exception as e:
-                logger.warning(f"Erro contas a pagar: {str(e)}")
-                return 'contas_pagar', {}
+    stats['total_geral'] = sum(v for k, v in stats.items() if k != 'total_geral')
+    return {'success': True, 'data': stats}
 
-        f1, f2 = _executor.submit(_query_cr), _executor.submit(_query_cp)
-        for k, v in [f1.result(), f2.result()]:
-            financial_data[k] = v
 
-        out = {'success': True, 'data': financial_data}
-        _set_cache("financial", out)
-        return jsonify(out), 200, _cache_headers()
+@app.route('/api/financial')
+def get_financial():
+    """Dados financeiros (cache por versão dos dados, duas queries em paralelo)."""
+    try:
+        out = _get_cache().get_or_set(_versioned("financial"), _compute_financial)
+        return json_response(out)
     except Exception as e:
         logger.error(f"Erro ao obter dados financeiros: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _compute_financial():
+    db_manager, use_bigquery = _get_backend()
+    financial_data = {}
+    tbl_cr = db_manager.table_ref("contas_receber") if use_bigquery else "contas_receber"
+    tbl_cp = db_manager.table_ref("contas_pagar") if use_bigquery else "contas_pagar"
+
+    def _query_cr():
+        try:
+            r = db_manager.execute_query(f"""
+                SELECT COUNT(*) as total, SUM(valor_documento) as total_valor,
+                       SUM(valor_pago) as total_pago, SUM(saldo) as total_saldo
+                FROM {tbl_cr}{_active_where('contas_receber')}
+            """)
+            return 'contas_receber', (r[0] if r else {})
+        except Exception as e:
+            logger.warning(f"Erro contas a receber: {str(e)}")
+            return 'contas_receber', {}
+
+    def _query_cp():
+        try:
+            r = db_manager.execute_query(f"""
+                SELECT COUNT(*) as total, SUM(valor_documento) as total_valor,
+                       SUM(valor_pago) as total_pago, SUM(saldo) as total_saldo
+                FROM {tbl_cp}{_active_where('contas_pagar')}
+            """)
+            return 'contas_pagar', (r[0] if r else {})
+        except Exception as e:
+            logger.warning(f"Erro contas a pagar: {str(e)}")
+            return 'contas_pagar', {}
+
+    f1, f2 = _executor.submit(_query_cr), _executor.submit(_query_cp)
+    for k, v in [f1.result(), f2.result()]:
+        financial_data[k] = v
+
+    return {'success': True, 'data': financial_data}
+
+
 @app.route('/api/tables/<table_name>')
 def get_table_data(table_name):
     """Retorna dados de uma tabela específica."""
@@ -236,12 +326,11 @@ def get_table_data(table_name):
             }), 400
         
         # Buscar dados (limitado a 50 para resposta rápida)
-        tbl = db_manager.table_ref(table_name) if _use_bigquery else table_name
-        data = db_manager.execute_query(f"SELECT * FROM {tbl} LIMIT 50")
+        db_manager, use_bigquery = _get_backend()
+        tbl = db_manager.table_ref(table_name) if use_bigquery else table_name
+        data = db_manager.execute_query(f"SELECT * FROM {tbl}{_active_where(table_name)} LIMIT 50")
 
-        resp = jsonify({'success': True, 'data': data, 'count': len(data)})
-        resp.headers["Cache-Control"] = "public, max-age=30"
-        return resp
+        return json_response({'success': True, 'data': data, 'count': len(data)}, max_age=30)
     except Exception as e:
         logger.error(f"Erro ao buscar dados da tabela {table_name}: {str(e)}")
         return jsonify({
@@ -252,97 +341,102 @@ def get_table_data(table_name):
 
 @app.route('/api/metrics')
 def get_metrics():
-    """Métricas de coleta (cache 45s)."""
-    cached = _cached("metrics")
-    if cached is not None:
-        return jsonify(cached), 200, _cache_headers()
-
+    """Métricas de coleta (cache por versão dos dados)."""
     try:
-        tbl = db_manager.table_ref("api_metrics") if _use_bigquery else "api_metrics"
-        try:
-            db_manager.create_table('api_metrics', {
-                'id': 'BIGINT PRIMARY KEY AUTO_INCREMENT',
-                'operation': 'VARCHAR(100)',
-                'duration': 'DECIMAL(10,2)',
-                'success': 'TINYINT(1)',
-                'records_count': 'INT',
-                'error_message': 'TEXT',
-                'created_at': 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'
-            })
-        except Exception:
-            pass
-
-        if _use_bigquery:
-            metrics = db_manager.execute_query(f"""
-                SELECT 
-                    operation,
-                    AVG(duration) as avg_duration,
-                    MIN(duration) as min_duration,
-                    MAX(duration) as max_duration,
-                    SUM(records_count) as total_records,
-                    SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as success_count,
-                    SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as error_count,
-                    MAX(created_at) as last_execution
-                FROM {tbl}
-                WHERE created_at >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 24 HOUR)
-                GROUP BY operation
-                ORDER BY last_execution DESC
-            """)
-            last_execution = db_manager.execute_query(f"""
-                SELECT 
-                    SUM(duration) as total_time,
-                    COUNT(*) as total_operations,
-                    SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful_operations,
-                    SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as failed_operations,
-                    SUM(records_count) as total_records,
-                    MAX(created_at) as last_run
-                FROM {tbl}
-                WHERE created_at = (SELECT MAX(created_at) FROM {tbl})
-            """)
-        else:
-            metrics = db_manager.execute_query("""
-                SELECT 
-                    operation,
-                    AVG(duration) as avg_duration,
-                    MIN(duration) as min_duration,
-                    MAX(duration) as max_duration,
-                    SUM(records_count) as total_records,
-                    SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as success_count,
-                    SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as error_count,
-                    MAX(created_at) as last_execution
-                FROM api_metrics
-                WHERE created_at >= DATE_SUB(NOW(), INTERVAL 24 HOUR)
-                GROUP BY operation
-                ORDER BY last_execution DESC
-            """)
-            last_execution = db_manager.execute_query("""
-                SELECT 
-                    SUM(duration) as total_time,
-                    COUNT(*) as total_operations,
-                    SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful_operations,
-                    SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as failed_operations,
-                    SUM(records_count) as total_records,
-                    MAX(created_at) as last_run
-                FROM api_metrics
-                WHERE created_at = (
-                    SELECT MAX(created_at) FROM api_metrics
-                )
-            """)
-        
-        out = {
-            'success': True,
-            'data': {
-                'operations': metrics or [],
-                'last_execution': last_execution[0] if last_execution else {}
-            }
-        }
-        _set_cache("metrics", out)
-        return jsonify(out), 200, _cache_headers()
+        out = _get_cache().get_or_set(_versioned("metrics"), _compute_metrics)
+        return json_response(out)
     except Exception as e:
         logger.error(f"Erro ao obter métricas: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _compute_metrics():
+    db_manager, use_bigquery = _get_backend()
+    runs = db_manager.table_ref(RUNS_TABLE) if use_bigquery else RUNS_TABLE
+    steps = db_manager.table_ref(RUN_STEPS_TABLE) if use_bigquery else RUN_STEPS_TABLE
+    api_metrics = db_manager.table_ref(API_METRICS_TABLE) if use_bigquery else API_METRICS_TABLE
+    # api_metrics e runs/run_steps são criadas pela coleta (RunLedger); antes da primeira coleta não há métricas
+    try:
+        return _query_metrics(db_manager, use_bigquery, api_metrics, runs, steps)
+    except Exception as e:
+        logger.warning(f"Métricas indisponíveis: {str(e)}")
+        return {'success': True, 'data': {'operations': [], 'last_execution': {}}}
+
+
+def _query_metrics(db_manager, use_bigquery: bool, api_metrics: str, runs: str, steps: str):
+    """
+    Operações das últimas 24h (api_metrics, uma linha por coleta), com o tempo médio de cada
+    fase vindo de run_steps, e a última execução (linha mais recente de runs, com os totais
+    gravados no fim da execução).
+    """
+    desde = (
+        "TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 24 HOUR)" if use_bigquery
+        else "UTC_TIMESTAMP() - INTERVAL 24 HOUR"
+    )
+    metrics = db_manager.execute_query(f"""
+        SELECT 
+            operation,
+            AVG(duration) as avg_duration,
+            MIN(duration) as min_duration,
+            MAX(duration) as max_duration,
+            SUM(records_count) as total_records,
+            SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as success_count,
+            SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) as error_count,
+            MAX(created_at) as last_execution
+        FROM {api_metrics}
+        WHERE created_at >= {desde}
+        GROUP BY operation
+        ORDER BY last_execution DESC
+    """) or []
+    desde_steps = (
+        "DATETIME_SUB(CURRENT_DATETIME(), INTERVAL 24 HOUR)" if use_bigquery
+        else "UTC_TIMESTAMP() - INTERVAL 24 HOUR"
+    )
+    fases = db_manager.execute_query(f"""
+        SELECT 
+            CONCAT(collector, '_collect') as operation,
+            AVG(api_time) as avg_api_time,
+            AVG(sleep_time) as avg_sleep_time,
+            AVG(transform_time) as avg_transform_time,
+            AVG(load_time) as avg_load_time,
+            SUM(pages) as total_pages
+        FROM {steps}
+        WHERE started_at >= {desde_steps}
+        GROUP BY collector
+    """) or []
+    por_operacao = {f['operation']: f for f in fases}
+    for op in metrics:
+        fase = por_operacao.get(op['operation'], {})
+        op.update({k: v for k, v in fase.items() if k != 'operation'})
+    last_execution = db_manager.execute_query(f"""
+        SELECT 
+            run_id,
+            mode,
+            window_start,
+            window_end,
+            duration as total_time,
+            steps as total_operations,
+            steps_ok as successful_operations,
+            steps_failed as failed_operations,
+            rows_inserted + rows_updated as total_records,
+            pages as total_pages,
+            api_bytes,
+            finished_at as last_run
+        FROM {runs}
+        ORDER BY started_at DESC
+        LIMIT 1
+    """)
+    
+    out = {
+        'success': True,
+        'data': {
+            'operations': metrics,
+            'last_execution': last_execution[0] if last_execution else {}
+        }
+    }
+    return out
+
+
 if __name__ == '__main__':
     print("="*80)
     print("DASHBOARD - Sistema de Coleta Omie")
@@ -0,0 +1,290 @@
+"""
+Cache do dashboard com backends plugáveis.
+- MemoryCache: dict por processo (comportamento antigo).
+- SQLiteCache: arquivo local compartilhado por todos os workers da máquina (gunicorn, instância Vercel),
+  sem serviço externo. Um único worker calcula cada chave; os demais aguardam o valor gravado.
+  Os valores são gravados em JSON (nunca pickle: o arquivo não pode virar execução de código) num
+  diretório privado do usuário (0700) por padrão.
+Ambos aplicam TTL e limite de entradas (remove as mais antigas ao exceder) e devolvem o valor
+já normalizado para JSON (datas em isoformat, Decimal em str) também no cálculo: a resposta é a
+mesma (corpo e ETag) com ou sem acerto no cache.
+"""
+import os
+import stat
+import getpass
+import sqlite3
+import tempfile
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Optional
+
+from src.utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de espera enquanto outro worker calcula a mesma chave
+_LEASE_POLL_INTERVAL = 0.05
+
+
+def _json_default(value: Any) -> Any:
+    """Tipos dos resultados de consulta (Decimal, datas) que o JSON não tem."""
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(value: Any) -> str:
+    return json_codec.dumps(value, default=_json_default)
+
+
+def normalize(value: Any) -> Any:
+    """O valor como sai do cache (ida e volta pelo JSON)."""
+    return json_codec.loads(_encode(value))
+
+
+class CacheBackend(ABC):
+    """Interface dos backends de cache do dashboard."""
+
+    def __init__(self, default_ttl: int = 45, max_entries: int = 256):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Retorna o valor se existir e não estiver expirado; senão None."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Grava o valor com TTL (segundos)."""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove uma chave."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove todas as chaves."""
+        pass
+
+    @abstractmethod
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        """
+        Retorna o valor em cache ou calcula com factory() e grava.
+        Chamadas concorrentes para a mesma chave calculam uma única vez.
+        Exceções de factory não são cacheadas.
+        """
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Cache em memória por processo (LRU + TTL)."""
+
+    def __init__(self, default_ttl: int = 45, max_entries: int = 256):
+        super().__init__(default_ttl, max_entries)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._store(key, normalize(value), ttl)
+
+    def _store(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            value = self.get(key)
+            if value is not None:
+                return value
+            value = normalize(factory())
+            self._store(key, value, ttl)
+            return value
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache em arquivo SQLite compartilhado entre processos da mesma máquina.
+    Usa WAL para leituras concorrentes e uma tabela de "leases" para que só um
+    processo calcule cada chave expirada (os demais aguardam o valor).
+    """
+
+    def __init__(self, path: str, default_ttl: int = 45, max_entries: int = 256, lease_timeout: float = 30.0):
+        super().__init__(default_ttl, max_entries)
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self._local = threading.local()
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_created ON cache (created_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json_codec.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Cache: valor inválido para '{key}' ({e}); descartando")
+            self.delete(key)
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._store(key, _encode(value), ttl)
+
+    def _store(self, key: str, data: str, ttl: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+            (key, data, now + ttl, now),
+        )
+        self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Remove expirados e, se exceder max_entries, as entradas mais antigas."""
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache")
+        conn.execute("DELETE FROM leases")
+
+    def _acquire_lease(self, key: str) -> bool:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO leases (key, expires_at) VALUES (?, ?)", (key, now + self.lease_timeout)
+        )
+        return cur.rowcount == 1
+
+    def _release_lease(self, key: str):
+        self._conn().execute("DELETE FROM leases WHERE key = ?", (key,))
+
+    def _compute(self, key: str, factory: Callable[[], Any], ttl: Optional[int]) -> Any:
+        """Calcula, grava e devolve o valor decodificado do que foi gravado (igual a um acerto)."""
+        data = _encode(factory())
+        self._store(key, data, ttl)
+        return json_codec.loads(data)
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+        deadline = time.time() + self.lease_timeout
+        while True:
+            if self._acquire_lease(key):
+                try:
+                    value = self.get(key)  # outro processo pode ter gravado entre o get e o lease
+                    if value is None:
+                        value = self._compute(key, factory, ttl)
+                    return value
+                finally:
+                    self._release_lease(key)
+            # Outro worker está calculando: aguarda o valor aparecer
+            time.sleep(_LEASE_POLL_INTERVAL)
+            value = self.get(key)
+            if value is not None:
+                return value
+            if time.time() >= deadline:
+                logger.warning(f"Cache: timeout aguardando cálculo de '{key}'; calculando localmente")
+                return self._compute(key, factory, ttl)
+
+
+def default_cache_path() -> str:
+    """
+    Arquivo do cache num diretório só do usuário (0700) dentro do temporário do sistema
+    (na Vercel só /tmp é gravável). Recusa o diretório se ele não for do usuário, for um
+    link ou tiver permissão para grupo/outros.
+    """
+    usuario = str(os.getuid()) if hasattr(os, "getuid") else getpass.getuser()
+    directory = os.path.join(tempfile.gettempdir(), f"omie_dashboard_{usuario}")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or (hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o077)):
+        raise PermissionError(f"diretório de cache inseguro: {directory}")
+    return os.path.join(directory, "dashboard_cache.sqlite3")
+
+
+def create_cache(web_settings) -> CacheBackend:
+    """Cria o backend de cache conforme WebSettings (DASHBOARD_CACHE_BACKEND)."""
+    backend = (web_settings.DASHBOARD_CACHE_BACKEND or "memory").strip().lower()
+    ttl = web_settings.DASHBOARD_CACHE_TTL
+    max_entries = web_settings.DASHBOARD_CACHE_MAX_ENTRIES
+    if backend == "sqlite":
+        path = web_settings.DASHBOARD_CACHE_PATH
+        try:
+            path = path or default_cache_path()
+            cache = SQLiteCache(path, default_ttl=ttl, max_entries=max_entries)
+            os.chmod(path, 0o600)
+            return cache
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Cache SQLite indisponível em '{path}' ({e}); usando cache em memória")
+    elif backend != "memory":
+        logger.warning(f"DASHBOARD_CACHE_BACKEND desconhecido: '{backend}'; usando cache em memória")
+    return MemoryCache(default_ttl=ttl, max_entries=max_entries)
@@ -0,0 +1,74 @@
+"""
+Respostas HTTP do dashboard: ETag (hash do conteúdo) com 304 Not Modified e compressão gzip/brotli.
+Brotli é opcional: usado só se o pacote `brotli` estiver instalado e o cliente aceitar `br`.
+"""
+import gzip
+import hashlib
+from typing import Any, Iterable
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli  # opcional
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+# Abaixo deste tamanho a compressão não compensa (cabeçalhos > ganho)
+MIN_COMPRESS_SIZE = 512
+
+
+def content_etag(body: bytes) -> str:
+    """Hash curto e estável do corpo da resposta (usado como ETag)."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def json_response(payload: Any, max_age: int = 45, status: int = 200) -> Response:
+    """
+    Serializa payload como JSON com ETag do conteúdo.
+    Se o cliente enviar If-None-Match com o mesmo hash, responde 304 sem corpo.
+    ETag fraco: a mesma entidade pode ser servida comprimida ou não.
+    """
+    body = current_app.json.dumps(payload).encode("utf-8")
+    resp = Response(body, status=status, mimetype="application/json")
+    resp.headers["Cache-Control"] = f"public, max-age={max_age}"
+    if status == 200:
+        resp.set_etag(content_etag(body), weak=True)
+        resp.make_conditional(request)
+    return resp
+
+
+def _choose_encoding(accept_encoding: str) -> str:
+    accepted = {p.split(";")[0].strip().lower() for p in accept_encoding.split(",") if p.strip()}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return ""
+
+
+def register_compression(app: Flask, path_prefixes: Iterable[str]):
+    """Comprime (br/gzip) respostas 200 das rotas cujo path começa com um dos prefixos."""
+    prefixes = tuple(path_prefixes)
+
+    @app.after_request
+    def _compress(response: Response) -> Response:
+        if not request.path.startswith(prefixes):
+            return response
+        if response.status_code != 200 or response.direct_passthrough or "Content-Encoding" in response.headers:
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = _choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if not encoding:
+            return response
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=5)
+        else:
+            compressed = gzip.compress(data, compresslevel=6)
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    return _compress
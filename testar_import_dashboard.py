@@ -0,0 +1,102 @@
+"""
+Verifica o tempo de import a frio do dashboard (src.app), que define o cold start na Vercel.
+Falha (exit 1) se o import passar do orçamento ou se carregar módulos pesados
+(BigQuery, MySQL, orquestrador/coletores) que devem ser importados só sob demanda.
+
+Uso: python testar_import_dashboard.py [orcamento_em_segundos]
+     (ou IMPORT_BUDGET_SECONDS no ambiente; padrão 0.8s)
+"""
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_SECONDS = 0.8
+RUNS = 3
+MODULO = "src.app"
+# Módulos que NÃO podem ser carregados no import do dashboard
+MODULOS_PESADOS = [
+    "google.cloud.bigquery",
+    "mysql.connector",
+    "src.orchestrator",
+    "src.collectors",
+]
+
+_PROBE = (
+    "import sys, time\n"
+    "t = time.perf_counter()\n"
+    f"import {MODULO}\n"
+    "elapsed = time.perf_counter() - t\n"
+    f"pesados = [m for m in {MODULOS_PESADOS!r} if m in sys.modules]\n"
+    "print(elapsed)\n"
+    "print('pesados=' + ','.join(pesados))\n"
+)
+
+
+def medir_import() -> tuple:
+    """Executa o import em um processo novo (frio) e retorna (segundos, módulos pesados carregados)."""
+    env = dict(os.environ, VERCEL="1")  # mesmo caminho do deploy serverless
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {MODULO}:\n{out.stderr}")
+    linhas = out.stdout.strip().splitlines()
+    pesados = linhas[-1][len("pesados="):]
+    return float(linhas[-2]), [m for m in pesados.split(",") if m]
+
+
+def top_imports(limit: int = 10) -> list:
+    """Lista os módulos mais lentos (python -X importtime), para diagnóstico."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULO}"],
+        capture_output=True, text=True, env=dict(os.environ, VERCEL="1"),
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            rows.append((int(parts[1]), parts[2].rstrip()))
+        except ValueError:
+            continue
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main() -> int:
+    budget = float(
+        sys.argv[1] if len(sys.argv) > 1 else os.environ.get("IMPORT_BUDGET_SECONDS", DEFAULT_BUDGET_SECONDS)
+    )
+    tempos = []
+    pesados = []
+    for _ in range(RUNS):
+        elapsed, carregados = medir_import()
+        tempos.append(elapsed)
+        pesados = carregados
+    melhor = min(tempos)
+
+    print("=" * 80)
+    print(f"IMPORT A FRIO: {MODULO}")
+    print("=" * 80)
+    print(f"Tempos: {', '.join(f'{t:.3f}s' for t in tempos)} | melhor: {melhor:.3f}s | orçamento: {budget:.3f}s")
+    print("\nMódulos mais lentos (acumulado):")
+    for micros, nome in top_imports():
+        print(f"  {micros / 1e6:.3f}s {nome}")
+
+    ok = True
+    if melhor > budget:
+        print(f"\n[ERRO] Import de {MODULO} excedeu o orçamento ({melhor:.3f}s > {budget:.3f}s)")
+        ok = False
+    if pesados:
+        print(f"\n[ERRO] Módulos pesados carregados no import: {', '.join(pesados)}")
+        ok = False
+    if ok:
+        print("\n[OK] Import dentro do orçamento")
+    print("=" * 80)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
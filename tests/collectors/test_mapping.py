@@ -0,0 +1,193 @@
+"""
+Paridade do mapeamento declarativo (src.collectors.mapping) com os transform_data escritos à
+mão que ele substituiu em OrdemServico, Servicos e ContasDRE. As funções _legacy_* são o
+mapeamento por registro das versões anteriores, copiado sem alterações de lógica.
+"""
+from src.collectors.contas_dre import ContasDRECollector
+from src.collectors.ordem_servico import OrdemServicoCollector
+from src.collectors.servicos import ServicosCollector
+
+
+def _legacy_os(item):
+    cabecalho = item.get("Cabecalho", {})
+    info_cadastro = item.get("InfoCadastro", {})
+    codigo = (
+        cabecalho.get("nCodOS") or cabecalho.get("nIdPed") or item.get("nCodOS") or item.get("nIdPed")
+        or item.get("codigo_os") or item.get("codigo") or ""
+    )
+    numero_os = cabecalho.get("cNumOS") or cabecalho.get("cNumPedido") or item.get("cNumOS") or item.get("cNumPedido") or ""
+    mapped_item = {
+        "codigo_os": str(codigo) if codigo else "",
+        "codigo_os_integracao": str(
+            cabecalho.get("cCodIntOS") or item.get("cCodIntOS") or item.get("codigo_os_integracao")
+            or item.get("codigo_integracao") or ""
+        ),
+        "codigo_cliente": str(
+            cabecalho.get("nCodCli") or cabecalho.get("nCodCliente") or item.get("nCodCli")
+            or item.get("nCodCliente") or item.get("codigo_cliente") or ""
+        ),
+        "data_previsao": cabecalho.get("dDtPrevisao") or item.get("dDtPrevisao") or item.get("data_previsao") or None,
+        "data_emissao": (
+            info_cadastro.get("dDtInc") or cabecalho.get("dDtEmissao") or item.get("dDtEmissao")
+            or item.get("data_emissao") or None
+        ),
+        "data_fechamento": (
+            info_cadastro.get("dDtFat") or cabecalho.get("dDtFechamento") or item.get("dDtFechamento")
+            or item.get("data_fechamento") or None
+        ),
+        "valor_total": float(
+            cabecalho.get("nValorTot") or cabecalho.get("nValorTotal") or item.get("nValorTotal")
+            or item.get("valor_total") or 0
+        ),
+        "valor_desconto": float(
+            cabecalho.get("nValorDesconto") or item.get("nValorDesconto") or item.get("valor_desconto") or 0
+        ),
+        "valor_liquido": float(
+            cabecalho.get("nValorLiquido") or item.get("nValorLiquido") or item.get("valor_liquido") or 0
+        ),
+        "status": str(
+            cabecalho.get("cEtapa") or cabecalho.get("cStatus") or item.get("cStatus") or item.get("status") or ""
+        ),
+        "numero_pedido": str(
+            numero_os or cabecalho.get("cNumPedido") or item.get("cNumPedido") or item.get("numero_pedido") or ""
+        ),
+        "observacao": str(
+            item.get("InformacoesAdicionais", {}).get("cDadosAdicNF") or item.get("cObservacao")
+            or item.get("observacao") or ""
+        ),
+        "codigo_projeto": str(
+            item.get("InformacoesAdicionais", {}).get("nCodProj") or item.get("nCodProjeto")
+            or item.get("codigo_projeto") or ""
+        ),
+    }
+    mapped_item = {k: v for k, v in mapped_item.items() if v or k in ["codigo_os"]}
+    if mapped_item.get("codigo_os") or mapped_item.get("numero_pedido"):
+        return mapped_item
+    return None
+
+
+def _legacy_servico(item):
+    codigo = item.get("nCodServico") or item.get("codigo_servico") or item.get("codigo") or item.get("nCodigo") or ""
+    mapped_item = {
+        "codigo_servico": str(codigo) if codigo else "",
+        "codigo_servico_integracao": str(
+            item.get("cCodIntServico") or item.get("codigo_servico_integracao") or item.get("codigo_integracao")
+            or item.get("cCodInt") or ""
+        ),
+        "descricao": str(item.get("cDescricao") or item.get("descricao") or item.get("cNome") or ""),
+        "valor_unitario": float(item.get("nValorUnitario") or item.get("valor_unitario") or item.get("nValor") or 0),
+        "categoria": str(item.get("cCategoria") or item.get("categoria") or ""),
+        "inativo": str(item.get("cInativo") or item.get("inativo") or item.get("cAtivo") or "N"),
+        "data_cadastro": item.get("dDtInc") or item.get("data_cadastro") or item.get("dDataInc") or None,
+        "data_alteracao": item.get("dDtAlt") or item.get("data_alteracao") or item.get("dDataAlt") or None,
+    }
+    mapped_item = {k: v for k, v in mapped_item.items() if v or k in ["codigo_servico"]}
+    if mapped_item.get("codigo_servico") or mapped_item.get("descricao"):
+        return mapped_item
+    return None
+
+
+def _legacy_dre(item):
+    mapped_item = {
+        "codigo_conta_dre": str(item.get("codigoDRE") or item.get("codigo_conta_dre") or ""),
+        "codigo_conta_dre_integracao": str(item.get("codigoDRE") or item.get("codigo_conta_dre_integracao") or ""),
+        "descricao": str(item.get("descricaoDRE") or item.get("descricao") or ""),
+        "tipo": str(item.get("sinalDRE") or item.get("tipo") or ""),
+        "nivel": int(item.get("nivelDRE") or item.get("nivel") or 0) if (item.get("nivelDRE") or item.get("nivel")) else 0,
+        "conta_pai": "",
+        "natureza": str(item.get("totalizaDRE") or item.get("natureza") or ""),
+        "inativo": str("S" if item.get("naoExibirDRE") == "S" else "N" or item.get("inativo") or "N"),
+        "data_cadastro": None,
+        "data_alteracao": None,
+    }
+    mapped_item = {k: v for k, v in mapped_item.items() if v or k in ["codigo_conta_dre"]}
+    if mapped_item.get("codigo_conta_dre") or mapped_item.get("descricao"):
+        return mapped_item
+    return None
+
+
+def _legacy(fn, items):
+    return [m for m in (fn(i) for i in items) if m is not None]
+
+
+OS_ITENS = [
+    {
+        "Cabecalho": {"nCodOS": 101, "cNumOS": "OS-1", "nCodCli": 7, "dDtPrevisao": "10/01/2025",
+                      "nValorTotal": "150.5", "cEtapa": "20"},
+        "InfoCadastro": {"dDtInc": "02/01/2025", "dDtFat": ""},
+        "InformacoesAdicionais": {"cDadosAdicNF": "obs", "nCodProj": 3},
+    },
+    {
+        "Cabecalho": {"nIdPed": 102, "cNumPedido": "P-2", "nCodCliente": 8, "dDtEmissao": "03/01/2025",
+                      "nValorTot": 99, "nValorDesconto": 1.5, "cStatus": "F"},
+        "InfoCadastro": {},
+        "cObservacao": "solta",
+    },
+    {"nCodOS": "103", "cNumOS": "OS-3", "dDtEmissao": "04/01/2025", "nValorLiquido": "10", "status": "A",
+     "nCodProjeto": 9, "codigo_integracao": "INT-3"},
+    {"codigo": 104, "dDtFechamento": "05/01/2025", "valor_total": 0},
+    {"Cabecalho": {"cCodIntOS": "sem-codigo"}},  # sem código nem número: ignorado
+    {"Cabecalho": {"cNumPedido": "P-6"}, "InfoCadastro": {"dDtFat": "06/01/2025"}},
+]
+
+SERVICOS_ITENS = [
+    {"nCodServico": 1, "cCodIntServico": "S1", "cDescricao": "Instalação", "nValorUnitario": "120.00",
+     "cCategoria": "1.01", "cInativo": "S", "dDtInc": "01/01/2025", "dDtAlt": "02/01/2025"},
+    {"codigo": "2", "cNome": "Manutenção", "nValor": 50, "cAtivo": "N", "dDataInc": "03/01/2025"},
+    {"nCodigo": 3, "codigo_integracao": "S3", "descricao": "Suporte", "valor_unitario": 0,
+     "data_alteracao": "04/01/2025"},
+    {"cDescricao": "Sem código"},
+    {"cCategoria": "1.02"},  # sem código nem descrição: ignorado
+]
+
+DRE_ITENS = [
+    {"codigoDRE": "1.01", "descricaoDRE": "Receita", "nivelDRE": 1, "sinalDRE": "+", "totalizaDRE": "S",
+     "naoExibirDRE": "N"},
+    {"codigoDRE": "1.02", "descricaoDRE": "Deduções", "nivelDRE": "2", "sinalDRE": "-", "naoExibirDRE": "S"},
+    {"codigo_conta_dre": "2", "descricao": "Custos", "nivel": 0, "tipo": "-", "natureza": "D"},
+    {"nivelDRE": 3},  # sem código nem descrição: ignorado
+]
+
+
+def test_ordem_servico_paridade():
+    collector = OrdemServicoCollector(None)
+    assert collector.transform_data({"osCadastro": OS_ITENS}) == _legacy(_legacy_os, OS_ITENS)
+
+
+def test_ordem_servico_wrapper_alternativo():
+    collector = OrdemServicoCollector(None)
+    resposta = {"osListarResponse": {"listaOS": OS_ITENS}}
+    assert collector.transform_data(resposta) == _legacy(_legacy_os, OS_ITENS)
+
+
+def test_servicos_paridade():
+    collector = ServicosCollector(None)
+    resposta = {"listaServicosCadastro": SERVICOS_ITENS}
+    assert collector.transform_data(resposta) == _legacy(_legacy_servico, SERVICOS_ITENS)
+
+
+def test_contas_dre_paridade():
+    collector = ContasDRECollector(None)
+    resposta = {"dreCadastroListResponse": {"dreLista": DRE_ITENS}}
+    assert collector.transform_data(resposta) == _legacy(_legacy_dre, DRE_ITENS)
+
+
+def test_variante_ausente_na_primeira_pagina():
+    """Caminho de maior prioridade vazio na página 1 continua valendo nas seguintes."""
+    collector = OrdemServicoCollector(None)
+    pagina1 = [{"Cabecalho": {"nCodOS": 1, "dDtEmissao": "01/01/2025"}, "InfoCadastro": {}}]
+    pagina2 = [{"Cabecalho": {"nCodOS": 2, "dDtEmissao": "05/05/2025"}, "InfoCadastro": {"dDtInc": "02/02/2025"}}]
+    assert collector.transform_data({"osCadastro": pagina1}) == _legacy(_legacy_os, pagina1)
+    mapeado = collector.transform_data({"osCadastro": pagina2})
+    assert mapeado == _legacy(_legacy_os, pagina2)
+    assert mapeado[0]["data_emissao"] == "02/02/2025"
+    assert OrdemServicoCollector(None).transform_data({"osCadastro": pagina2}) == mapeado
+
+
+def test_mesmo_registro_igual_em_qualquer_pagina():
+    collector = ServicosCollector(None)
+    paginas = [SERVICOS_ITENS[1:], SERVICOS_ITENS[:1], SERVICOS_ITENS]
+    esperado = {id(i): _legacy_servico(i) for i in SERVICOS_ITENS}
+    for pagina in paginas:
+        mapeados = collector.transform_data({"listaServicosCadastro": pagina})
+        assert mapeados == [esperado[id(i)] for i in pagina if esperado[id(i)] is not None]